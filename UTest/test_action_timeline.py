@@ -0,0 +1,46 @@
+import os
+import unittest
+import pandas as pd
+
+from action_handler import ActionHandler
+from action_timeline import ActionTimeline
+from data_handler import DataHandler
+from goal_store import GoalStore
+
+STUDY_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_study')
+
+
+class TestActionTimeline(unittest.TestCase):
+
+    def assert_same_as_dataframe(self, df_actions, is_assembly, hand):
+        timeline = ActionTimeline(df_actions, is_assembly, hand)
+        action_handler = ActionHandler(DataHandler(GoalStore([], []), True), (is_assembly, hand))
+
+        self.assertEqual(len(timeline), len(df_actions))
+        for index in range(len(df_actions)):
+            self.assertEqual(timeline.action(index), action_handler.convert_action(df_actions.iloc[index]))
+
+            # first relevant action of the tracked hand at or after index
+            expected = next((i for i in range(index, len(df_actions)) if df_actions['hand'][i] == hand and
+                             df_actions['action_id'][i].split('_')[0] == ('pick' if is_assembly else 'place')), -1)
+            self.assertEqual(timeline.next_relevant[index], expected)
+
+    def test_assemble(self):
+        df_actions = pd.read_csv(os.path.join(STUDY_FOLDER, 'assemble_actions', '41212_2_168.csv'))
+        for hand in ('right', 'left'):
+            with self.subTest(hand=hand):
+                self.assert_same_as_dataframe(df_actions, True, hand)
+
+    def test_dismantle(self):
+        folder = os.path.join(STUDY_FOLDER, 'dismantle_actions')
+        df_actions = pd.read_csv(os.path.join(folder, sorted(os.listdir(folder))[0]))
+        self.assert_same_as_dataframe(df_actions, False, 'right')
+
+    def test_empty(self):
+        timeline = ActionTimeline(pd.read_csv(os.path.join(STUDY_FOLDER, '..', 'action_empty.csv')), True, 'right')
+        self.assertEqual(len(timeline), 0)
+        self.assertEqual(timeline.next_relevant.tolist(), [-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
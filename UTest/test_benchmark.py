@@ -0,0 +1,29 @@
+import unittest
+
+from utilities.benchmark import build_cases, run_case, compare
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run_case(self):
+        cases = build_cases(goal_counts=(10,), noise_reducers=((2, 10),), frames=60)
+        self.assertEqual([case.name for case in cases],
+                         ['synthetic_g10_nr2_10', 'recorded_config1', 'study_41212_2_168_db0', 'study_41212_2_168_db1'])
+
+        result = run_case(cases[0])
+        self.assertEqual(result['frames'], 58)  # the schedule starts one time step after the first row
+        self.assertGreater(result['fps'], 0)
+        self.assertLessEqual(result['p50_us'], result['p99_us'])
+
+    def test_compare(self):
+        baseline = {'a': {'p50_us': 100.0, 'p90_us': 200.0, 'p99_us': 300.0, 'fps': 1000.0}}
+        faster = {'a': {'p50_us': 90.0, 'p90_us': 210.0, 'p99_us': 300.0, 'fps': 1100.0}}
+        slower = {'a': {'p50_us': 130.0, 'p90_us': 200.0, 'p99_us': 300.0, 'fps': 800.0}}
+
+        self.assertEqual(compare(faster, baseline, 0.2), [])
+        self.assertEqual(compare(slower, baseline, 0.2), ['a: p50_us 100.0 -> 130.0', 'a: fps 1000.0 -> 800.0'])
+        self.assertEqual(compare({'b': slower['a']}, baseline, 0.2), [])  # not in baseline
+
+
+if __name__ == '__main__':
+    unittest.main()
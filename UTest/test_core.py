@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+
+from core import predict
+from main import get_params
+from replay import replay
+
+ROOT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_FOLDER = os.path.join(ROOT_FOLDER, 'data')
+
+
+class TestCore(unittest.TestCase):
+
+    def test_no_heavy_imports(self):
+        code = "import core, sys; print([m for m in ('pandas', 'matplotlib', 'scipy', 'numba') if m in sys.modules])"
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_FOLDER, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+    def test_same_as_replay(self):
+        path_goals = os.path.join(DATA_FOLDER, 'test_data_recorded', 'recorded_goals', 'goal_config1.csv')
+        path_trajectories = os.path.join(DATA_FOLDER, 'test_data_recorded', 'recorded_trajectories',
+                                         'configuration1', '10_config1_target2.csv')
+        df_trajectories = pd.read_csv(path_trajectories)
+        expected = replay(pd.read_csv(path_goals), df_trajectories, params=get_params(df_trajectories))
+        results = list(predict(path_goals, path_trajectories))
+
+        self.assertEqual([result.time for result in results], expected.time.tolist())
+        for i, result in enumerate(results):
+            # the reader rounds the numbers correctly, pandas can differ in the last digit
+            np.testing.assert_allclose(result.probability_percent(), expected.probability[i][expected.in_result[i]],
+                                       rtol=0, atol=0.01 + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
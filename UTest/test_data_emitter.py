@@ -0,0 +1,58 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+from data_emitter import DataEmitter, frame_schedule
+from main import get_params
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+def linear_schedule(timestamps, start_time, end_time, time_step):
+    """ Rows of the frames found by scanning the timestamps at every time step. """
+    rows = []
+    curr_time, curr_index = start_time, 0
+    while curr_time < end_time - time_step and curr_index < len(timestamps):
+        curr_time += time_step
+        same_data = True
+        for index in range(curr_index, len(timestamps)):
+            if timestamps[index] > curr_time:
+                break
+            curr_index = index + 1
+            same_data = False
+        if not same_data:
+            rows.append(curr_index - 1)
+    return rows
+
+
+class TestDataEmitter(unittest.TestCase):
+
+    def test_frame_schedule(self):
+        rng = np.random.default_rng(3)
+        timestamps = np.cumsum(rng.integers(0, 40, 500))
+        timestamps[100:110] = timestamps[100:110][::-1]  # unordered rows
+        for time_step in (1, 17, 100):
+            self.assertEqual(frame_schedule(timestamps, timestamps[0] - 5, timestamps[-1] + 100, time_step).tolist(),
+                             linear_schedule(timestamps.tolist(), timestamps[0] - 5, timestamps[-1] + 100, time_step))
+
+    def test_frames_with_noise(self):
+        df_trajectories = pd.read_csv(os.path.join(DATA_FOLDER, 'test_data_generated', 'test_trajectory',
+                                                   '3_4_2_11.csv'))
+        params = list(get_params(df_trajectories)['DATA_EMITTER_PARAMS'])
+        params[1] = 0.01
+
+        np.random.seed(11)
+        frames = list(DataEmitter(None, df_trajectories, None, tuple(params)).frames())
+
+        # one noise draw per frame in emission order
+        np.random.seed(11)
+        rows = linear_schedule(df_trajectories['time'].tolist(), params[2], params[3], params[4])
+        self.assertEqual([data[0] for data in frames], df_trajectories['time'].iloc[rows].tolist())
+        for data, row in zip(frames, rows):
+            expected = df_trajectories[['x', 'y', 'z']].iloc[row].to_numpy() + np.random.normal(0.0, 0.01, 3)
+            np.testing.assert_array_equal(data[1], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
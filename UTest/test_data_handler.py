@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+
+from data_handler import FrameResult, calculate_uncategorized_probability, calculate_top3, calculate_over_60
+
+
+def make_result(probabilities, distances):
+    size = len(probabilities)
+    return FrameResult(time=100, hand_position=np.array([0.1, 0.2, 0.3]), goal_ids=np.arange(1, size + 1),
+                       positions=np.zeros((size, 3)), probability=np.array(probabilities, dtype=float),
+                       distance=np.array(distances, dtype=float), sample_quantity=np.arange(size), actions=[],
+                       future_action=None)
+
+
+class TestFrameResult(unittest.TestCase):
+
+    def assert_same_as_dict(self, result):
+        result_dict = result.to_dict()
+        uncat_prob = calculate_uncategorized_probability(result_dict["goals"])
+        top_3 = calculate_top3(result_dict["goals"], uncat_prob)
+
+        self.assertEqual(result.uncat_prob(), uncat_prob)
+        self.assertEqual(result.top_k(3), top_3)
+        self.assertEqual(result.over_60(), calculate_over_60(top_3))
+        self.assertEqual(result_dict["top_3"], top_3)
+
+    def test_random(self):
+        rng = np.random.default_rng(7)
+        for size in (0, 1, 2, 3, 4, 10, 50):
+            for _ in range(20):
+                probabilities = rng.dirichlet(np.ones(size + 1))[:size] if size else []
+                self.assert_same_as_dict(make_result(probabilities, rng.uniform(0.0, 1.0, size)))
+
+    def test_ties(self):
+        # goals with the same probability keep their order, uncategorized comes after them
+        self.assert_same_as_dict(make_result([0.2, 0.3, 0.2, 0.3], [0.5, 0.4, 0.3, 0.2]))
+        self.assert_same_as_dict(make_result([0.1, 0.1, 0.1, 0.1, 0.1], [0.5, 0.4, 0.3, 0.2, 0.1]))
+        self.assert_same_as_dict(make_result([0.0, 0.25, 0.0, 0.25], [0.5, 0.4, 0.3, 0.2]))
+        self.assert_same_as_dict(make_result([0.5, 0.0, 0.25], [0.5, 0.4, 0.3]))
+
+    def test_over_60(self):
+        result = make_result([0.05, 0.7, 0.1], [0.5, 0.123, 0.3])
+        self.assertEqual(result.over_60(), ("2", 70.0, 0.12))
+
+
+if __name__ == '__main__':
+    unittest.main()
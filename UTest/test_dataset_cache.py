@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from dataset_cache import cache_path, read_columns, read_csv
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class TestDatasetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_folder = os.path.join(self.temp_dir.name, 'cache')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_same_as_read_csv(self):
+        for path in (os.path.join(DATA_FOLDER, 'test_data_study', 'goals.csv'),
+                     os.path.join(DATA_FOLDER, 'test_data_study', 'assemble_actions', '41212_2_168.csv'),
+                     os.path.join(DATA_FOLDER, 'test_data_generated', 'test_trajectory', '3_4_2_11.csv'),
+                     os.path.join(DATA_FOLDER, 'action_empty.csv')):
+            with self.subTest(path=path):
+                expected = pd.read_csv(path)
+                pd.testing.assert_frame_equal(read_csv(path, self.cache_folder), expected)  # parsed and cached
+                self.assertTrue(os.path.isdir(cache_path(path, self.cache_folder)))
+                pd.testing.assert_frame_equal(read_csv(path, self.cache_folder), expected)  # loaded from cache
+
+    def test_read_columns(self):
+        path = os.path.join(DATA_FOLDER, 'test_data_generated', 'test_trajectory', '3_4_2_11.csv')
+        expected = pd.read_csv(path, float_precision='round_trip')
+        for _ in range(2):  # parsed and cached, loaded from cache
+            columns = read_columns(path, self.cache_folder)
+            pd.testing.assert_frame_equal(pd.DataFrame(columns), expected)
+
+        with self.assertRaises(ValueError):
+            read_columns(os.path.join(DATA_FOLDER, 'test_data_study', 'assemble_actions', '41212_2_168.csv'), None)
+
+    def test_modified_file(self):
+        path = os.path.join(self.temp_dir.name, 'goals.csv')
+        pd.DataFrame({'ID': [1, 2], 'x': [0.1, 0.2]}).to_csv(path, index=False)
+        self.assertEqual(read_csv(path, self.cache_folder)['x'].tolist(), [0.1, 0.2])
+
+        pd.DataFrame({'ID': [1, 2, 3], 'x': [0.1, 0.2, 0.3]}).to_csv(path, index=False)
+        os.utime(path, ns=(0, 10 ** 9))
+        self.assertEqual(read_csv(path, self.cache_folder)['x'].tolist(), [0.1, 0.2, 0.3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from frame_buffer import FrameRingBuffer
+from main import get_params
+
+STUDY_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_study')
+
+
+class TestFrameBuffer(unittest.TestCase):
+
+    def test_ring(self):
+        frame_buffer = FrameRingBuffer(capacity=3, max_actions=2)
+        for timestamp in range(3):
+            self.assertTrue(frame_buffer.write(timestamp, np.full(3, float(timestamp)), [timestamp] * timestamp))
+        self.assertFalse(frame_buffer.write(3, np.zeros(3)))  # full
+
+        view = frame_buffer.read(2)
+        self.assertEqual(view.time.tolist(), [0, 1])
+        self.assertEqual(view.action_count.tolist(), [0, 1])
+        frame_buffer.release(len(view))
+
+        # the batch wraps around the end of the ring
+        self.assertEqual(frame_buffer.write_batch(np.array([3, 4, 5]), np.ones((3, 3))), 2)
+        self.assertEqual(frame_buffer.read().time.tolist(), [2])
+        frame_buffer.close()
+        self.assertEqual([view.time.tolist() for view in frame_buffer.batches()], [[2], [3, 4]])
+        self.assertEqual(len(frame_buffer), 0)
+
+    def test_validation(self):
+        frame_buffer = FrameRingBuffer(capacity=2, max_actions=1)
+        for data in [(1.0, np.zeros(3), ()), (1, [0.0, 0.0, 0.0], ()), (1, np.zeros(3, dtype=int), ()),
+                     (1, np.zeros(4), ()), (1, np.zeros(3), (1, 2)), (1, np.zeros(3), (-1,))]:
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                frame_buffer.write(*data)
+        self.assertEqual(len(frame_buffer), 0)
+
+    def test_failed_producer(self):
+        # a frame with more actions than slots stops the producer, the consumer gets the frames before and an error
+        frames = [[0, np.zeros(3)], [17, np.ones(3), *range(17)]]
+        df_trajectories = pd.DataFrame({'time': [0, 17], 'x': [0.0, 1.0], 'y': [0.0, 1.0], 'z': [0.0, 1.0]})
+        data_emitter = DataEmitter(None, df_trajectories, None, get_params(df_trajectories)['DATA_EMITTER_PARAMS'])
+        frame_buffer = FrameRingBuffer(capacity=4)
+
+        with mock.patch.object(data_emitter, 'frames', return_value=iter(frames)), self.assertRaises(ValueError):
+            data_emitter.emit_to_buffer(frame_buffer)
+        self.assertTrue(frame_buffer.closed and frame_buffer.failed)
+
+        times = []
+        with self.assertRaises(RuntimeError):
+            for view in frame_buffer.batches():
+                times += view.time.tolist()
+        self.assertEqual(times, [0])
+
+    def test_same_as_process_data(self):
+        df_goals = pd.read_csv(os.path.join(STUDY_FOLDER, 'goals.csv'))
+        df_trajectories = pd.read_csv(os.path.join(STUDY_FOLDER, 'assemble_right_hand', '41212_2_168_r.csv'))
+        df_actions = pd.read_csv(os.path.join(STUDY_FOLDER, 'assemble_actions', '41212_2_168.csv'))
+        params = get_params(df_trajectories, use_db=True)
+        emitter_params = params['DATA_EMITTER_PARAMS'][:5] + (0.0,) + params['DATA_EMITTER_PARAMS'][6:]
+
+        def new_controller(data_emitter):
+            return Controller(df_goals, True, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                              params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'],
+                              data_emitter.action_timeline)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            data_emitter = DataEmitter(None, df_trajectories, df_actions, emitter_params)
+            controller = new_controller(data_emitter)
+            expected = [result for result in map(controller.process_data, data_emitter.frames()) if result is not None]
+
+            # a small ring, so the producer waits for the consumer and the views wrap around
+            data_emitter = DataEmitter(None, df_trajectories, df_actions, emitter_params)
+            controller = new_controller(data_emitter)
+            frame_buffer = FrameRingBuffer(capacity=50)
+            producer = threading.Thread(target=data_emitter.emit_to_buffer, args=(frame_buffer,))
+            producer.start()
+            results = [result for view in frame_buffer.batches(max_frames=16)
+                       for result in controller.process_view(view)]
+            producer.join()
+
+        self.assertEqual(results, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
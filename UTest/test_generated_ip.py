@@ -1,9 +1,18 @@
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 from colorama import Fore, Style
 
-from main import Main
+from dataset_cache import read_csv
+from main import Main, get_params
+from replay import ReplayResult, replay
+from result_sinks import ListSink
+from utilities.result_summarizer import ResultSink, make_record
+
+# goal sets loaded by a worker process, reused for all of its trajectories
+_goal_cache = {}
 
 
 class TestIntentionRecognition:
@@ -12,16 +21,22 @@ class TestIntentionRecognition:
     are stored in a specified log folder.
     """
 
-    def __init__(self, goals_folder, trajectories_folder, logs_folder):
+    def __init__(self, goals_folder, trajectories_folder, logs_folder, workers=1, results_file=None):
         """
         Parameters:
             goals_folder (str): Path to the folder containing the goal files to be tested.
             trajectories_folder (str): Path to the folder containing the trajectory files associated with the goals.
             logs_folder (str): Path to the folder where the test results will be stored as logs.
+            workers (int): Number of worker processes. 1 runs the tests one by one in this process.
+            results_file (str): Path of a JSON Lines file for the structured results (see ResultSink). None to only
+                write the logs.
         """
         self.goals_folder = goals_folder
         self.trajectories_folder = trajectories_folder
         self.logs_folder = logs_folder
+        self.workers = workers
+        self.results_file = results_file
+        self.result_sink = None
         self.logger = None
 
     def find_trajectories_for_goal(self, goal_prefix):
@@ -45,6 +60,22 @@ class TestIntentionRecognition:
     def run_test(self):
         """ Executes tests for each goal and its associated trajectories. """
 
+        if self.results_file is not None:
+            self.result_sink = ResultSink(self.results_file)
+
+        try:
+            if self.workers > 1:
+                self.run_test_parallel()
+            else:
+                self.run_test_sequential()
+        finally:
+            if self.result_sink is not None:
+                self.result_sink.close()
+                self.result_sink = None
+
+    def run_test_sequential(self):
+        """ Executes the tests one by one in this process. """
+
         # Iterate through all goals in the goals folder
         for goal_file in os.listdir(self.goals_folder):
             goal_prefix = os.path.splitext(goal_file)[0]  # file name without extension
@@ -62,6 +93,39 @@ class TestIntentionRecognition:
             else:
                 print(f"No trajectories found for goal {goal_file}")
 
+    def run_test_parallel(self):
+        """
+        Executes the same tests as run_test on a pool of worker processes. The results are logged by this process in
+        the same order as run_test, so the log files are identical.
+        """
+        goal_prefixes, goal_paths, trajectory_paths = [], [], []
+        for goal_file in os.listdir(self.goals_folder):
+            goal_prefix = os.path.splitext(goal_file)[0]  # file name without extension
+            goal_path = os.path.join(self.goals_folder, goal_file)
+            trajectories = self.find_trajectories_for_goal(goal_prefix)  # all corresponding trajectories
+
+            if not trajectories:
+                print(f"No trajectories found for goal {goal_file}")
+
+            for trajectory_path in trajectories:
+                goal_prefixes.append(goal_prefix)
+                goal_paths.append(goal_path)
+                trajectory_paths.append(trajectory_path)
+
+        # jobs of a goal stay together, so a worker reads each goal set only once
+        chunksize = max(1, len(trajectory_paths) // (self.workers * 4))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            evaluations = executor.map(run_replay_test, goal_paths, trajectory_paths, chunksize=chunksize)
+
+            curr_prefix = None
+            for goal_prefix, (evaluation, time_range) in zip(goal_prefixes, evaluations):
+                if goal_prefix != curr_prefix:
+                    # Set up a log file for recording results for this goal
+                    self.setup_logging(os.path.join(self.logs_folder, f"{goal_prefix}_results.log"))
+                    curr_prefix = goal_prefix
+
+                self.log_result(*evaluation, time_range=time_range)
+
     def run_individual_test(self, goal_path, trajectory_path):
         """
         Executes a test for a given goal and trajectory.
@@ -71,7 +135,7 @@ class TestIntentionRecognition:
             trajectory_path (str): The file path to the trajectory corresponding to the goal.
         """
         main_instance = Main(goal_path, trajectory_path)
-        processed_data = main_instance.run()
+        processed_data = main_instance.run(ListSink()).results
 
         # Extract test ID from trajectory file name
         test_id = get_filename_without_extension(trajectory_path)
@@ -123,35 +187,22 @@ class TestIntentionRecognition:
                 sample_sizes[-1].append(data["sample_quantity"])
                 distances[-1].append(data["distance"])
 
-        # setup passing criteria for test results
-        highest_probability = max(probabilities_target, default=0.0)  # highest probability of target
-        prob_60_reached = False  # target reached 60% probability
-        distance_60 = sample_size_60 = time_60 = None  # distance, sample size and timestamp at 60% probability
-
-        target_counter = other_counter = 0
-        for i, prob in enumerate(probabilities_target):
-            # check for each measurement if the target or another goal had the highest probability
-            if (probabilities_other[i] and max(probabilities_other[i]) > prob) or uncategorized[i] > prob:
-                other_counter += 1
-            else:
-                target_counter += 1
+        # probability of the best other goal, sample size and distance of the target for each measurement
+        probabilities_other_max = [max(p, default=-np.inf) for p in probabilities_other]
+        sample_sizes_target = [s[target_index] if len(s) > target_index else 0 for s in sample_sizes]
+        distances_target = [d[target_index] if len(d) > target_index else None for d in distances]
 
-            # passing conditions. Save data at first time reaching 60% with sample size greater then 9
-            if prob >= 60.0 and not prob_60_reached and sample_sizes[i][target_index] > 9:
-                prob_60_reached = True
-                distance_60 = distances[i][target_index]
-                sample_size_60 = sample_sizes[i][target_index]
-                time_60 = timestamps[i]
-
-        # Determine status and color
-        status, color = determine_status(prob_60_reached, distance_60, target_counter, other_counter)
+        evaluation = evaluate_probabilities(timestamps, probabilities_target, probabilities_other_max, uncategorized,
+                                            sample_sizes_target, distances_target)
 
         # Log the result
-        self.log_result(test_id, highest_probability, time_60, sample_size_60, distance_60, status, color)
+        self.log_result(test_id, *evaluation, time_range=(timestamps[0], timestamps[-1]) if timestamps else None)
 
-    def log_result(self, trajectory_file, highest_probability, time_60, sample_size_60, distance_60, status, color):
+    def log_result(self, trajectory_file, highest_probability, time_60, sample_size_60, distance_60, status, color,
+                   time_range=None):
         """
-        Logs and prints the results of a test, including relevant metrics and status.
+        Logs and prints the results of a test, including relevant metrics and status. The result is also written to
+        the result sink when results_file is given.
 
         Parameters:
             trajectory_file (str): The name or path of the trajectory file being logged.
@@ -161,7 +212,12 @@ class TestIntentionRecognition:
             distance_60 (float): The distance measured at the 60% threshold.
             status (str): The status of the test ('Success','Pass1', 'Pass2, 'Failure').
             color (str): The color code used to print the message to the console.
+            time_range (tuple): First and last timestamp with a result. None if there was no result.
         """
+        if self.result_sink is not None:
+            self.result_sink.write(make_record(trajectory_file, highest_probability, time_60, sample_size_60,
+                                               distance_60, status, time_range))
+
         log_message = (
             f"Result: {status} | Test_ID: {trajectory_file} | "
             f"Highest Probability: {highest_probability} | "
@@ -187,6 +243,93 @@ class TestIntentionRecognition:
         self.logger.addHandler(file_handler)
 
 
+def run_replay_test(goal_path, trajectory_path):
+    """
+    Executes a test for a given goal and trajectory with replay in a worker process.
+
+    Returns:
+        tuple: The test id followed by the evaluation of evaluate_probabilities, and the first and last timestamp with
+            a result (None if there was no result).
+    """
+    df_goals = _goal_cache.get(goal_path)
+    if df_goals is None:
+        df_goals = _goal_cache[goal_path] = read_csv(goal_path)
+
+    df_trajectories = read_csv(trajectory_path)
+    result = replay(df_goals, df_trajectories, None, get_params(df_trajectories))
+
+    # Extract test ID and target ID from trajectory file name
+    test_id = get_filename_without_extension(trajectory_path)
+    target_index = int(test_id.split('_')[2]) - 1
+
+    time_range = (int(result.time[0]), int(result.time[-1])) if len(result.time) else None
+    return (test_id,) + evaluate_replay_result(result, target_index), time_range
+
+
+def evaluate_replay_result(result: ReplayResult, target_index):
+    """
+    Evaluates the results of a replay in the same way as TestIntentionRecognition.evaluate_results.
+
+    Parameters:
+        result (ReplayResult): The results of the replay.
+        target_index (int): The index indicating the specific target that is being reached.
+
+    Returns:
+        tuple: The evaluation of evaluate_probabilities.
+    """
+    target_column = result.goal_column(target_index + 1)
+    is_other = result.in_result.copy()
+    is_other[:, target_column] = False
+
+    probabilities_other_max = np.where(is_other, result.probability, -np.inf).max(axis=1, initial=-np.inf)
+    return evaluate_probabilities(result.time, result.probability[:, target_column], probabilities_other_max,
+                                  result.uncat_prob, result.sample_quantity[:, target_column],
+                                  result.distance[:, target_column])
+
+
+def evaluate_probabilities(timestamps, probabilities_target, probabilities_other_max, uncategorized,
+                           sample_sizes_target, distances_target):
+    """
+    Applies the passing criteria to the probabilities of a test.
+
+    Parameters:
+        timestamps (list): Timestamp of each measurement.
+        probabilities_target (list): Probability of the target for each measurement.
+        probabilities_other_max (list): Highest probability of the other goals for each measurement.
+        uncategorized (list): Probability of uncategorized goal for each measurement.
+        sample_sizes_target (list): Sample size of the target for each measurement.
+        distances_target (list): Distance from the target to observed hand wrist for each measurement.
+
+    Returns:
+        tuple: highest probability, timestamp, sample size and distance at 60% probability, status and color.
+    """
+    probabilities_target = np.asarray(probabilities_target, dtype=float)
+    count = len(probabilities_target)
+
+    # setup passing criteria for test results
+    highest_probability = float(probabilities_target.max()) if count else 0.0  # highest probability of target
+    distance_60 = sample_size_60 = time_60 = None  # distance, sample size and timestamp at 60% probability
+
+    # check for each measurement if the target or another goal had the highest probability
+    other_preferred = ((np.asarray(probabilities_other_max[:count], dtype=float) > probabilities_target) |
+                       (np.asarray(uncategorized[:count], dtype=float) > probabilities_target))
+    other_counter = int(np.count_nonzero(other_preferred))
+    target_counter = count - other_counter
+
+    # passing conditions. Save data at first time reaching 60% with sample size greater then 9
+    reached = (probabilities_target >= 60.0) & (np.asarray(sample_sizes_target[:count]) > 9)
+    prob_60_reached = bool(reached.any())  # target reached 60% probability
+    if prob_60_reached:
+        i = int(np.argmax(reached))
+        distance_60 = float(distances_target[i])
+        sample_size_60 = int(sample_sizes_target[i])
+        time_60 = int(timestamps[i])
+
+    # Determine status and color
+    status, color = determine_status(prob_60_reached, distance_60, target_counter, other_counter)
+    return highest_probability, time_60, sample_size_60, distance_60, status, color
+
+
 def get_filename_without_extension(path):
     return os.path.splitext(os.path.basename(path))[0]
 
@@ -228,5 +371,6 @@ if __name__ == "__main__":
     trajectories_folder = r'../data/test_data_generated/test_trajectory'
     logs_folder = r'../data/test_data_generated/result_g'
 
-    test = TestIntentionRecognition(goals_folder, trajectories_folder, logs_folder)
+    test = TestIntentionRecognition(goals_folder, trajectories_folder, logs_folder, workers=os.cpu_count() or 1,
+                                    results_file=os.path.join(logs_folder, 'results.jsonl'))
     test.run_test()
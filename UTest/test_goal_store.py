@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+
+from goal_store import GoalStore
+
+
+class TestGoalStore(unittest.TestCase):
+
+    def setUp(self):
+        goal_data = [(number, np.array([0.1 * number, 0.0, 0.03])) for number in (3, 5, 8, 9)]
+        self.store = GoalStore.from_goal_data(goal_data)
+
+    def test_remove(self):
+        self.assertTrue(self.store.remove(5))
+        self.assertFalse(self.store.remove(5))  # already removed
+        self.assertFalse(self.store.remove(42))  # unknown goal
+        self.assertEqual(self.store.num[self.store.get_rows(False)].tolist(), [3, 8, 9])
+        self.assertEqual(self.store.count_possible(), 3)
+
+    def test_reduce_and_reset_possible(self):
+        self.store.remove(8)
+        self.store.reduce_possible([9, 8, 3, 42])
+        self.assertEqual(self.store.num[self.store.get_rows(True)].tolist(), [3, 9])
+
+        self.store.reset_possible()
+        self.assertEqual(self.store.num[self.store.get_rows(True)].tolist(), [3, 5, 9])
+
+    def test_to_dict(self):
+        self.store.prob[1] = 0.123456
+        self.store.sq[1] = 4
+        goals_dict = self.store.to_dict(self.store.get_rows(False))
+        self.assertEqual(list(goals_dict.keys()), [3, 5, 8, 9])
+        self.assertEqual(goals_dict[5], {"position": [0.5, 0.0, 0.03], "probability": 12.35, "distance": 10000.0,
+                                         "sample_quantity": 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from instrumentation import Instrumentation, RollingHistogram, STAGES
+from main import get_params
+
+GENERATED_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_generated')
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_rolling_histogram(self):
+        histogram = RollingHistogram(100)
+        for value in range(1000, 0, -1):
+            histogram.add(value * 1000)
+
+        # only the last 100 values (100 ... 1 us) are in the buffer, the maximum is kept
+        self.assertEqual(histogram.summary(), {'count': 1000, 'p50_us': 50.5, 'p95_us': 95.0, 'p99_us': 99.0,
+                                               'max_us': 1000.0})
+        self.assertEqual(RollingHistogram(10).summary()['count'], 0)
+
+    def test_controller(self):
+        df_goals = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_goal', '3_4.csv'))
+        df_trajectories = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_trajectory', '3_4_2_11.csv'))
+        params = get_params(df_trajectories)
+
+        instrumentation = Instrumentation()
+        results = []
+        for timer in (None, instrumentation):
+            data_emitter = DataEmitter(None, df_trajectories, None, params['DATA_EMITTER_PARAMS'], timer)
+            controller = Controller(df_goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                    params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'], None, timer)
+            frames = list(data_emitter.frames())
+            for data in frames:
+                if timer is not None:
+                    timer.stamp_emitted(data[0])
+            results.append([r for r in map(controller.process_data, frames) if r is not None])
+
+        self.assertEqual(results[0], results[1])
+
+        summary = instrumentation.summary()
+        self.assertEqual(summary['total']['count'], len(frames))
+        self.assertEqual(summary['queue']['count'], len(frames))
+        self.assertEqual(summary['end_to_end']['count'], len(results[1]))
+        self.assertEqual(summary['get_result']['count'], len(results[1]))
+        self.assertEqual(set(summary), set(STAGES) | {'total', 'queue', 'end_to_end'})
+        self.assertEqual(instrumentation.emitted, {})  # all stamps are consumed
+        self.assertTrue(all(np.isfinite(s['p99_us']) for s in summary.values()))
+
+    def test_bad_data(self):
+        df_goals = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_goal', '3_4.csv'))
+        df_trajectories = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_trajectory', '3_4_2_11.csv'))
+        params = get_params(df_trajectories)
+
+        instrumentation = Instrumentation()
+        controller = Controller(df_goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'], None, instrumentation)
+        self.assertIsNone(controller.process_data([]))
+        self.assertIsNone(controller.process_data_compact([]))
+        self.assertEqual(instrumentation.summary(), {})  # no stage has been timed
+
+
+if __name__ == '__main__':
+    unittest.main()
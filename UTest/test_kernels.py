@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from kernels import NUMBA_AVAILABLE, GoalUpdateKernel, select_kernel
+from main import get_params
+from replay import replay
+from utilities.benchmark import synthetic_goals, synthetic_trajectory
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class TestKernels(unittest.TestCase):
+
+    def assert_backends_agree(self, df_goals, df_trajectories, df_actions=None, **params):
+        """ The kernel (compiled when Numba is installed, plain Python otherwise) gives the results of NumPy. """
+        params = {**get_params(df_trajectories, df_actions is not None), **params}
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = replay(df_goals, df_trajectories, df_actions, params)
+            with mock.patch('controller.select_kernel', return_value=GoalUpdateKernel(jit=NUMBA_AVAILABLE)):
+                result = replay(df_goals, df_trajectories, df_actions, params)
+
+        # the results are rounded, in float32 the kernel (float64 arithmetic) can round to the next step
+        tolerance = 0.01 + 1e-6 if params.get('PRECISION') == 'float32' else 1e-9
+        self.assertGreater(len(result), 0)
+        np.testing.assert_array_equal(result.time, expected.time)
+        np.testing.assert_array_equal(result.sample_quantity, expected.sample_quantity)
+        np.testing.assert_allclose(result.probability, expected.probability, rtol=0, atol=tolerance)
+        np.testing.assert_allclose(result.distance, expected.distance, rtol=0, atol=tolerance)
+
+    def test_generated(self):
+        folder = os.path.join(DATA_FOLDER, 'test_data_generated')
+        df_trajectories = pd.read_csv(os.path.join(folder, 'test_trajectory', '3_4_2_11.csv'))
+        self.assert_backends_agree(pd.read_csv(os.path.join(folder, 'test_goal', '3_4.csv')), df_trajectories)
+
+    def test_study_with_actions(self):
+        folder = os.path.join(DATA_FOLDER, 'test_data_study')
+        self.assert_backends_agree(pd.read_csv(os.path.join(folder, 'goals.csv')),
+                                   pd.read_csv(os.path.join(folder, 'assemble_right_hand', '41212_2_168_r.csv')),
+                                   pd.read_csv(os.path.join(folder, 'assemble_actions', '41212_2_168.csv')))
+
+    def test_float32_and_culling(self):
+        rng = np.random.default_rng(0)
+        df_goals = synthetic_goals(200, rng)
+        df_trajectories = synthetic_trajectory(df_goals[['x', 'y', 'z']].to_numpy()[0], 120, rng)
+        self.assert_backends_agree(df_goals, df_trajectories, PRECISION='float32')
+        self.assert_backends_agree(df_goals, df_trajectories, CULLING_PARAMS=(0.3, np.pi / 6))
+
+    def test_select_kernel(self):
+        self.assertIsNone(select_kernel('numpy'))
+        self.assertEqual(select_kernel('numba') is not None, NUMBA_AVAILABLE)
+        with self.assertRaises(ValueError):
+            select_kernel('cuda')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import socket
+import unittest
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from live_ingest import encode_frames, decode_frames, DatagramSource, StreamSource, open_udp_source, process_batches
+from main import get_params
+
+GENERATED_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_generated')
+
+
+class TestLiveIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.df_goals = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_goal', '3_4.csv'))
+        df_trajectories = pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_trajectory', '3_4_2_11.csv'))
+        self.params = get_params(df_trajectories)
+
+        frames = list(DataEmitter(None, df_trajectories, None, self.params['DATA_EMITTER_PARAMS']).frames())
+        self.timestamps = np.array([data[0] for data in frames])
+        self.points = np.array([data[1] for data in frames])
+
+        controller = self.new_controller()
+        self.expected = [result for result in map(controller.process_data, frames) if result is not None]
+
+    def new_controller(self):
+        return Controller(self.df_goals, False, self.params['NOISE_REDUCER_PARAMS'], self.params['MODEL_PARAMS'],
+                          self.params['PROBABILITY_PARAMS'], self.params['ACTION_HANDLER_PARAMS'])
+
+    def test_encode_decode(self):
+        frames = decode_frames(encode_frames(self.timestamps, self.points) + b'\x00' * 5)
+        self.assertEqual(frames['time'].tolist(), self.timestamps.tolist())
+        np.testing.assert_array_equal(np.stack([frames['x'], frames['y'], frames['z']], axis=1), self.points)
+
+    def test_stream(self):
+        payload = encode_frames(self.timestamps, self.points)
+
+        async def send(_, writer):
+            for start in range(0, len(payload), 100):  # chunks that split records
+                writer.write(payload[start:start + 100])
+                await writer.drain()
+            writer.close()
+
+        async def receive():
+            server = await asyncio.start_server(send, '127.0.0.1', 0)
+            async with server:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                results = [result async for result in process_batches(self.new_controller(),
+                                                                      StreamSource(reader, batch_size=16))]
+                writer.close()
+                return results
+
+        self.assertEqual(asyncio.run(receive()), self.expected)
+
+    def test_udp(self):
+        async def run():
+            source = await open_udp_source('127.0.0.1', 0, max_batches=len(self.timestamps))
+            address = source.transport.get_extra_info('sockname')
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+                for start in range(0, len(self.timestamps), 20):
+                    sender.sendto(encode_frames(self.timestamps[start:start + 20], self.points[start:start + 20]),
+                                  address)
+                sender.sendto(b'', address)  # end of stream
+
+            results = [result async for result in process_batches(self.new_controller(), source)]
+            source.close()
+            return results, source.dropped
+
+        results, dropped = asyncio.run(run())
+        self.assertEqual(dropped, 0)
+        self.assertEqual(results, self.expected)
+
+    def test_udp_late_datagrams(self):
+        async def run():
+            source = DatagramSource(max_batches=1)
+            source.datagram_received(encode_frames(self.timestamps[:2], self.points[:2]), None)
+            source.datagram_received(b'', None)  # end of stream
+            # datagrams and the loss of the connection after the end neither evict the end nor raise
+            source.datagram_received(encode_frames(self.timestamps[2:5], self.points[2:5]), None)
+            source.connection_lost(None)
+            return [batch async for batch in source], source.dropped
+
+        batches, dropped = asyncio.run(run())
+        self.assertEqual([batch['time'].tolist() for batch in batches], [self.timestamps[:2].tolist()])
+        self.assertEqual(dropped, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from multi_session import MultiSessionController
+
+GENERATED_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_generated')
+
+
+class TestMultiSessionController(unittest.TestCase):
+
+    def setUp(self):
+        tests = [('1_3', '1_3_1_01'), ('3_7', '3_7_3_12'), ('4_2', '4_2_3_20')]
+        self.df_goals = [pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_goal', f'{goal}.csv')) for goal, _ in tests]
+        self.trajectories = [pd.read_csv(os.path.join(GENERATED_FOLDER, 'test_trajectory', f'{trajectory}.csv'))
+                             for _, trajectory in tests]
+
+    def assert_same_as_controllers(self, NOISE_REDUCER_PARAMS):
+        MODEL_PARAMS, PROBABILITY_PARAMS = (0.01, 0.15), (0.005, 0.85, 4.0)
+        controllers = [Controller(df, False, NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS, (True, 'right'))
+                       for df in self.df_goals]
+        multi = MultiSessionController(self.df_goals, NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS)
+        rng = np.random.default_rng(5)
+
+        compared = 0
+        for step in range(0, 1000, 7):
+            # sessions receive measurements at different times
+            sessions = np.flatnonzero(rng.random(len(controllers)) < 0.7)
+            points = [self.trajectories[s][['x', 'y', 'z']].iloc[step].to_numpy(dtype=float) for s in sessions]
+            timestamps = [int(self.trajectories[s]['time'].iloc[step]) for s in sessions]
+
+            result = multi.step(sessions, np.array(timestamps), np.array(points).reshape(-1, 3))
+            calculated = {} if result is None else {int(s): i for i, s in enumerate(result.sessions)}
+
+            for k, s in enumerate(sessions):
+                expected = controllers[s].process_data([timestamps[k], points[k]])
+                self.assertEqual(expected is None, s not in calculated)
+                if expected is None:
+                    continue
+
+                actual = result.to_dict(calculated[s])
+                self.assertEqual(actual["time"], expected["time"])
+                self.assertEqual(list(actual["goals"].keys()), list(expected["goals"].keys()))
+                for goal_id, goal in expected["goals"].items():
+                    self.assertAlmostEqual(actual["goals"][goal_id]["probability"], goal["probability"], delta=0.011)
+                    self.assertAlmostEqual(actual["goals"][goal_id]["distance"], goal["distance"], delta=0.011)
+                    self.assertEqual(actual["goals"][goal_id]["sample_quantity"], goal["sample_quantity"])
+                compared += 1
+
+        self.assertGreater(compared, 50)
+
+    def test_weighted_moving_average(self):
+        self.assert_same_as_controllers((2, 10))
+
+    def test_simple_moving_average(self):
+        self.assert_same_as_controllers((1, 5))
+
+    def test_exponential_moving_average(self):
+        self.assert_same_as_controllers((3, 0.3))
+
+    def test_without_noise_reducer(self):
+        self.assert_same_as_controllers((0, 0))
+
+    def test_remove_goal(self):
+        multi = MultiSessionController(self.df_goals, (0, 0), (0.01, 0.15), (0.005, 0.85, 4.0))
+        goal_id = int(self.df_goals[1]['ID'].iloc[0])
+        self.assertTrue(multi.remove_goal(1, goal_id))
+        self.assertFalse(multi.remove_goal(1, goal_id))
+        self.assertTrue(multi.goal_valid[0].sum() == len(self.df_goals[0]))
+
+    def test_float32_precision(self):
+        params = ((2, 10), (0.01, 0.15), (0.005, 0.85, 4.0))
+        multi = MultiSessionController(self.df_goals, *params)
+        multi_float32 = MultiSessionController(self.df_goals, *params, precision='float32')
+        sessions = np.arange(len(self.df_goals))
+
+        for step in range(0, 1000, 7):
+            points = np.array([trajectory[['x', 'y', 'z']].iloc[step].to_numpy(dtype=float)
+                               for trajectory in self.trajectories])
+            expected = multi.step(sessions, np.full(len(sessions), step), points)
+            result = multi_float32.step(sessions, np.full(len(sessions), step), points)
+
+            self.assertEqual(expected is None, result is None)
+            if expected is not None:
+                self.assertEqual(result.probability.dtype, np.float32)
+                np.testing.assert_allclose(result.probability, expected.probability, rtol=0, atol=1e-4)
+
+        with self.assertRaises(ValueError):
+            MultiSessionController(self.df_goals, *params, precision='float16')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+
+from noise_reducer import SimpleMovingAverage, WeightedMovingAverage, ExponentialMovingAverage
+
+
+def direct_wma(points, window_size):
+    """ Weighted moving average over the window of each point, divided by the weight sum of a full window. """
+    weights = np.arange(1, window_size + 1)
+    result = []
+    for i in range(len(points)):
+        window = points[max(0, i + 1 - window_size):i + 1]
+        result.append(weights[window_size - len(window):] @ window / weights.sum())
+    return np.array(result)
+
+
+class TestNoiseReducer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.points = np.cumsum(rng.normal(0.0, 0.01, (2000, 3)), axis=0) + np.array([0.3, -0.4, 0.05])
+
+    def sequential(self, reducer):
+        result = []
+        for point in self.points:
+            reducer.add(point)
+            result.append(reducer.get())
+        return np.array(result)
+
+    def test_incremental_wma(self):
+        for window_size in (1, 2, 10, 25):
+            with self.subTest(window_size=window_size):
+                np.testing.assert_allclose(self.sequential(WeightedMovingAverage(window_size)),
+                                           direct_wma(self.points, window_size), rtol=0, atol=1e-13)
+
+    def test_filter(self):
+        for reducer in (SimpleMovingAverage(1), SimpleMovingAverage(25), WeightedMovingAverage(1),
+                        WeightedMovingAverage(25), ExponentialMovingAverage(0.0), ExponentialMovingAverage(0.3),
+                        ExponentialMovingAverage(1.0)):
+            with self.subTest(reducer=type(reducer).__name__):
+                np.testing.assert_allclose(reducer.filter(self.points), self.sequential(reducer), rtol=0, atol=1e-12)
+
+        self.assertEqual(WeightedMovingAverage(25).filter(np.zeros((0, 3))).shape, (0, 3))
+        self.assertEqual(ExponentialMovingAverage(0.5).filter(np.zeros((0, 3))).shape, (0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import contextlib
+import io
+import unittest
+import numpy as np
+
+from UTest.test_generated_ip import evaluate_replay_result
+from dataset_cache import read_csv
+from main import get_params
+from replay import ReplayResult, replay
+from utilities.parameter_sweep import (DEFAULT_SPACE, grid_search, load_trials, random_search, record_trial, run_unit,
+                                       sweep)
+
+
+class TestParameterSweep(unittest.TestCase):
+
+    def test_search_space(self):
+        configs = grid_search(DEFAULT_SPACE)
+        self.assertEqual(len(configs), 5 * 4 * 3)
+        self.assertIn(((2, 25), (0.01, 0.15), (0.005, 0.85, 4.0)), configs)
+
+        chosen = random_search(DEFAULT_SPACE, 7, seed=1)
+        self.assertEqual(len(set(chosen)), 7)
+        self.assertTrue(set(chosen) <= set(configs))
+
+    def assert_same_as_replay(self, trial, settings):
+        """ The shared evaluation of run_unit gives the same evaluations as a replay of each configuration. """
+        df_goals, df_trajectories = read_csv(trial.path_goals), read_csv(trial.path_trajectories)
+        df_actions = read_csv(trial.path_actions) if trial.path_actions is not None else None
+        recording = record_trial(trial)
+
+        noise, models, probabilities = settings
+        evaluations = run_unit(trial, noise, models, probabilities)
+        self.assertEqual(len(evaluations), len(models) * len(probabilities))
+
+        for (model, probability), evaluation in evaluations.items():
+            params = get_params(df_trajectories, df_actions is not None, trial.is_assemble, trial.hand)
+            params.update(NOISE_REDUCER_PARAMS=noise, MODEL_PARAMS=model, PROBABILITY_PARAMS=probability)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = replay(df_goals, df_trajectories, df_actions, params)
+
+            with self.subTest(model=model, probability=probability):
+                if trial.target is not None:
+                    self.assertEqual(evaluation, [evaluate_replay_result(result, trial.target - 1)])
+                else:
+                    self.assertGreater(len(evaluation), 1)  # one evaluation for each future target
+                    # evaluations can contain NaN, which assert_equal treats as equal
+                    np.testing.assert_equal(evaluation, self.evaluate_segments(recording, result))
+
+    @staticmethod
+    def evaluate_segments(recording, result):
+        """ Evaluates each segment of a replay result with the same future target on its own. """
+        frames = np.searchsorted(recording.time, result.time)
+        np.testing.assert_array_equal(recording.time[frames], result.time)
+        targets = recording.future_target[frames]
+
+        evaluations = []
+        start = 0
+        for end in list(np.flatnonzero(np.diff(targets)) + 1) + [len(targets)]:
+            target = int(targets[start])
+            if target in result.goal_ids:
+                rows = slice(start, end)
+                segment = ReplayResult(result.time[rows], result.hand_position[rows], result.goal_ids,
+                                       result.in_result[rows], result.probability[rows], result.distance[rows],
+                                       result.sample_quantity[rows], result.uncat_prob[rows])
+                evaluations.append(evaluate_replay_result(segment, target - 1))
+            start = end
+        return evaluations
+
+    def test_generated(self):
+        trial = next(t for t in load_trials('generated') if t.name == '3_4_2_11')
+        self.assert_same_as_replay(trial, ((2, 10), [(0.01, 0.15), (0.025, 0.0)],
+                                           [(0.005, 0.85, 0.25), (0.005, 0.85, 4.0)]))
+
+    def test_study(self):
+        trial = next(t for t in load_trials('study') if t.name == 'assemble_41212_2_168_r')
+        self.assert_same_as_replay(trial, ((2, 25), [(0.01, 0.15)], [(0.005, 0.85, 4.0)]))
+
+    def test_sweep(self):
+        trials = load_trials('recorded', limit=3)
+        configs = [((2, 25), (0.01, 0.15), (0.005, 0.85, 4.0)), ((0, 0), (0.01, 0.15), (0.005, 0.85, 4.0))]
+        table = sweep(trials, configs)
+
+        self.assertEqual(table['rank'].tolist(), [1, 2])
+        self.assertEqual(set(table['NOISE_REDUCER_PARAMS']), {(2, 25), (0, 0)})
+        self.assertTrue((table[['Success', 'Pass1', 'Pass2', 'Failure']].sum(axis=1) == 3).all())
+        self.assertTrue(np.all(np.diff(table['Success']) <= 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
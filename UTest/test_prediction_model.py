@@ -1,6 +1,8 @@
 import unittest
 import numpy as np
-from prediction_model import calc_angle, calc_hand_towards_goal
+from goal import calc_poly, norm_vector
+from prediction_model import (calc_angle, calc_hand_towards_goal, calc_mats, calc_prediction_batch, calc_progression,
+                              point_direction)
 
 
 class TestCalcAngle(unittest.TestCase):
@@ -89,5 +91,36 @@ class TestCalcHandTowardsGoal(unittest.TestCase):
                 self.assertEqual(result, expected)
 
 
+class TestCalcPredictionBatch(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.goal_positions = rng.uniform(-1.0, 1.0, (50, 3))
+        self.prev_p = np.array([0.6, 0.0, 0.03])
+        self.curr_p = np.array([0.58, 0.01, 0.04])
+        self.prev_dp = point_direction(np.array([0.61, -0.01, 0.03]), self.prev_p)
+        self.curr_dp = point_direction(self.prev_p, self.curr_p)
+        self.min_prog = 0.15
+
+    def test_same_results_as_per_goal(self):
+        batch = calc_prediction_batch(self.prev_p, self.curr_p, self.prev_dp, self.curr_dp, self.goal_positions,
+                                      self.min_prog)
+
+        for i, pos in enumerate(self.goal_positions):
+            with self.subTest(i=i):
+                mat, dmat = calc_mats(self.prev_p, self.prev_dp, pos)
+                progression = max(calc_progression(self.prev_p, self.curr_p, pos), self.min_prog)
+                ppt = calc_poly(mat, progression)
+                dppt = norm_vector(calc_poly(dmat, progression))
+
+                self.assertAlmostEqual(batch.dist[i], np.linalg.norm(self.curr_p - pos))
+                np.testing.assert_allclose(batch.mat[i], mat)
+                np.testing.assert_allclose(batch.dmat[i], dmat)
+                np.testing.assert_allclose(batch.ppt[i], ppt)
+                np.testing.assert_allclose(batch.dppt[i], dppt)
+                self.assertAlmostEqual(batch.angle[i], calc_angle(dppt, self.curr_dp))
+                self.assertEqual(batch.hand_towards_goal[i], calc_hand_towards_goal(pos, self.curr_p, self.curr_dp))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+from scipy import stats
+
+from goal import Goal
+from probability_evaluator import calc_log_probabilities, calc_probabilities, calc_sd, dist_cost_function, norm_pdf
+
+
+class TestNormPdf(unittest.TestCase):
+
+    def test_same_as_scipy(self):
+        angles = np.linspace(0, np.pi, 25)
+        for sd in (np.sqrt(0.005), 0.3, np.sqrt(0.85)):
+            with self.subTest(sd=sd):
+                np.testing.assert_allclose(norm_pdf(angles, sd), stats.norm.pdf(angles, 0, sd), rtol=1e-14)
+
+
+class TestCalcProbabilities(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.goals = [Goal(i, rng.uniform(-1.0, 1.0, 3)) for i in range(40)]
+        self.params = (0.005, 0.85, 4.0)
+        self.rng = rng
+
+    def update_per_goal(self):
+        """ Reference implementation with one update per goal. """
+        sd = calc_sd([g.angle for g in self.goals], self.params[0], self.params[1])
+        for g in self.goals:
+            g.update_probability(stats.norm.pdf(g.angle, 0, sd))
+        dist_cost_function(self.goals, self.params[2])
+        norm_divisor = max(1, sum(g.prob for g in self.goals))
+        for g in self.goals:
+            g.divide_probability(norm_divisor)
+
+    def test_same_results_as_per_goal(self):
+        probabilities = np.zeros(len(self.goals))
+        sample_quantities = np.zeros(len(self.goals), dtype=int)
+
+        for step in range(30):
+            # narrow angles around few goals to cover reset, begin and update
+            for g in self.goals:
+                g.angle = self.rng.uniform(0, 0.3) if g.num % 4 == 0 else self.rng.uniform(0, np.pi)
+                g.hand_towards_goal = bool(self.rng.random() > 0.1)
+                g.dist = self.rng.uniform(0.05, 1.0)
+
+            probabilities, sample_quantities = calc_probabilities(
+                np.array([g.angle for g in self.goals]), np.array([g.hand_towards_goal for g in self.goals]),
+                np.array([g.dist for g in self.goals]), probabilities, sample_quantities, *self.params)
+            self.update_per_goal()
+
+            with self.subTest(step=step):
+                np.testing.assert_allclose(probabilities, [g.prob for g in self.goals], rtol=1e-12, atol=1e-300)
+                np.testing.assert_array_equal(sample_quantities, [g.sq for g in self.goals])
+
+
+class TestCalcLogProbabilities(unittest.TestCase):
+
+    def test_same_results_as_calc_probabilities(self):
+        rng = np.random.default_rng(4)
+        size = 40
+        params = (0.005, 0.85, 4.0)
+        probabilities = np.zeros(size)
+        sample_quantities = np.zeros(size, dtype=int)
+        log_probabilities = np.full(size, -np.inf)
+        log_sample_quantities = np.zeros(size, dtype=int)
+
+        for step in range(30):
+            angles = np.where(np.arange(size) % 4 == 0, rng.uniform(0, 0.3, size), rng.uniform(0, np.pi, size))
+            hand_towards_goal = rng.random(size) > 0.1
+            distances = rng.uniform(0.05, 1.0, size)
+
+            probabilities, sample_quantities = calc_probabilities(angles, hand_towards_goal, distances, probabilities,
+                                                                  sample_quantities, *params)
+            log_probabilities, log_sample_quantities = calc_log_probabilities(
+                angles, hand_towards_goal, distances, log_probabilities, log_sample_quantities, *params)
+
+            with self.subTest(step=step):
+                np.testing.assert_allclose(np.exp(log_probabilities), probabilities, rtol=1e-9, atol=1e-300)
+                np.testing.assert_array_equal(log_sample_quantities, sample_quantities)
+
+    def test_keeps_float32(self):
+        angles = np.linspace(0, np.pi, 8, dtype=np.float32)
+        log_probabilities, _ = calc_log_probabilities(angles, np.ones(8, dtype=bool), np.full(8, 0.5, np.float32),
+                                                      np.full(8, -np.inf, np.float32), np.zeros(8, dtype=int),
+                                                      0.005, 0.85, 4.0)
+        self.assertEqual(log_probabilities.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
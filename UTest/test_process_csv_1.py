@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from dataset_cache import load_cache
+from utilities.process_csv_1 import clean_tracking, merge_runs, parse_time, RECORD_DTYPE
+
+
+class TestProcessCsv(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.time = rng.permutation(np.repeat(np.arange(1000, 1500), 2))  # unordered with duplicates
+        self.hands = rng.choice(['right', 'left'], len(self.time))
+        self.positions = rng.uniform(-1.0, 1.0, (len(self.time), 3)).astype(np.float32)
+
+        lines = [f'{t},tracker,{hand},{x},{y},{z}' for t, hand, (x, y, z) in zip(self.time, self.hands, self.positions)]
+        lines[3] += ',0.5,7'  # more fields than columns are ignored
+        bad_lines = ['x1,tracker,right,0.1,0.2,0.3', '-5,tracker,left,0.1,0.2,0.3', '12.5,tracker,left,0.1,0.2,0.3',
+                     '13,tracker,right,0.1,abc,0.3', '14,tracker,right,0.1,0.2', '15,tracker,head,0.1,0.2,0.3']
+        for position, line in zip((0, 50, 300, 301, 700, 999), bad_lines):
+            lines.insert(position, line)
+        self.path = os.path.join(self.folder.name, 'hand_tracking.csv')
+        with open(self.path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def expected(self, hand):
+        keep = self.hands == hand
+        order = np.argsort(self.time[keep], kind='stable')
+        return self.time[keep][order], self.positions[keep][order]
+
+    def test_csv(self):
+        output = os.path.join(self.folder.name, 'processed')
+        report = clean_tracking(self.path, output, chunk_size=97, merge_records=40)
+
+        self.assertEqual(report.rows, len(self.time) + 6)
+        self.assertEqual(report.bad, {'time': 3, 'position': 2, 'hand': 1})
+        self.assertEqual([reason for _, reason in report.examples], ['time', 'time', 'time', 'position', 'position',
+                                                                     'hand'])
+        self.assertEqual(report.examples[0][0], 1)
+
+        for hand in ('right', 'left'):
+            df = pd.read_csv(report.outputs[hand])
+            time, positions = self.expected(hand)
+            self.assertEqual(list(df.columns), ['time', 'x', 'y', 'z'])
+            self.assertEqual(report.kept[hand], len(df))
+            np.testing.assert_array_equal(df['time'], time)
+            np.testing.assert_array_equal(df[['x', 'y', 'z']].to_numpy(dtype=np.float32), positions)
+
+    def test_npy(self):
+        output = os.path.join(self.folder.name, 'processed')
+        report = clean_tracking(self.path, output, 'npy', chunk_size=128)
+
+        df = load_cache(report.outputs['left'])
+        time, positions = self.expected('left')
+        np.testing.assert_array_equal(df['time'], time)
+        np.testing.assert_array_equal(df[['x', 'y', 'z']].to_numpy(), positions)
+
+    def test_large_timestamps(self):
+        # integer chunks, chunks with bad rows and chunks with float times, all above 2**53
+        texts = ['9007199254740993', '18446744073709551615', '9007199254740995', 'x', '9007199254740997.0',
+                 '1e3', '18446744073709551616', '-3']
+        expected = [9007199254740993, 18446744073709551615, 9007199254740995, 0, 9007199254740997, 1000, 0, 0]
+        for chunk in (texts[:2], texts[:4], texts):
+            time, valid = parse_time(pd.Series(chunk, dtype=object))
+            with self.subTest(chunk=chunk):
+                self.assertEqual(time.dtype, np.uint64)
+                self.assertEqual(time.tolist(), expected[:len(chunk)])
+                self.assertEqual(valid.tolist(), [value > 0 for value in expected[:len(chunk)]])
+
+        # the parser reads the times of chunks with a decimal or empty time as float, these chunks are read again
+        lines = ['9007199254740993,tracker,right,0.1,0.2,0.3', '9007199254740995,tracker,right,0.1,0.2,0.3',
+                 '12.5,tracker,right,0.1,0.2,0.3', ',tracker,right,0.1,0.2,0.3', '',
+                 '9007199254740999,tracker,left,0,0,0', '9007199254741001.0,tracker,left,0,0,0', '7,tracker,left,0,0,0']
+        with open(self.path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        for chunk_size in (2, 3, 100):
+            report = clean_tracking(self.path, os.path.join(self.folder.name, 'processed'), 'npy', chunk_size)
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(load_cache(report.outputs['right'])['time'].tolist(),
+                                 [9007199254740993, 9007199254740995])
+                self.assertEqual(load_cache(report.outputs['left'])['time'].tolist(),
+                                 [7, 9007199254740999, 9007199254741001])
+                self.assertEqual(report.bad['time'], 2)
+
+    def test_merge_runs(self):
+        rng = np.random.default_rng(1)
+        runs = []
+        for size in (0, 1, 30, 200):
+            run = np.zeros(size, dtype=RECORD_DTYPE)
+            run['time'] = np.sort(rng.integers(0, 50, size))
+            runs.append(run)
+
+        blocks = list(merge_runs(runs, 7))
+        self.assertTrue(all(len(block) <= 7 * len(runs) for block in blocks))
+        merged = np.concatenate(blocks)['time']
+        np.testing.assert_array_equal(merged, np.sort(np.concatenate([run['time'] for run in runs])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import time
+import unittest
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from frame_buffer import ResultRingBuffer
+from main import Main, get_params
+from process_pipeline import run_sessions
+from result_sinks import ListSink
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class TestProcessPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.path_goals = os.path.join(DATA_FOLDER, 'test_data_generated', 'test_goal', '3_4.csv')
+        self.path_trajectories = os.path.join(DATA_FOLDER, 'test_data_generated', 'test_trajectory', '3_4_2_11.csv')
+        self.df_goals = pd.read_csv(self.path_goals)
+        self.df_trajectories = pd.read_csv(self.path_trajectories)
+        self.params = get_params(self.df_trajectories)
+
+    def compact_results(self, df_trajectories, params):
+        controller = Controller(self.df_goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'],
+                                PRECISION=params['PRECISION'])
+        frames = DataEmitter(None, df_trajectories, None, params['DATA_EMITTER_PARAMS']).frames()
+        return [result for result in map(controller.process_data_compact, frames) if result is not None]
+
+    def test_result_ring(self):
+        for precision in ('float64', 'float32'):
+            params = dict(self.params, PRECISION=precision)
+            expected = self.compact_results(self.df_trajectories, params)
+            ring = ResultRingBuffer(capacity=8, goal_count=len(self.df_goals), precision=precision)
+            for result in expected[:8]:
+                self.assertTrue(ring.write(result))
+            self.assertFalse(ring.write(expected[8]))
+
+            for result, copy in zip(expected, ring.take()):
+                with self.subTest(precision=precision, time=result.time):
+                    self.assertEqual(copy.time, result.time)
+                    np.testing.assert_array_equal(copy.goal_ids, result.goal_ids)
+                    np.testing.assert_array_equal(copy.probability, result.probability)
+                    self.assertEqual(copy.probability.dtype, result.probability.dtype)
+                    self.assertEqual(copy.to_dict(), result.to_dict())
+            self.assertEqual(len(ring), 0)
+
+    def test_sessions(self):
+        # the second session uses a shifted trajectory and a ring smaller than the number of frames
+        df_shifted = self.df_trajectories.assign(x=self.df_trajectories['x'] + 0.05)
+        expected = [self.compact_results(self.df_trajectories, self.params),
+                    self.compact_results(df_shifted, self.params)]
+
+        sessions = [(self.df_goals, DataEmitter(None, df, None, self.params['DATA_EMITTER_PARAMS']).frames())
+                    for df in (self.df_trajectories, df_shifted)]
+        results = [[], []]
+        for i, result in run_sessions(sessions, self.params, capacity=16, result_capacity=4):
+            results[i].append(result.to_dict())
+
+        for i in range(2):
+            self.assertEqual(results[i], [result.to_dict() for result in expected[i]])
+
+    def test_paced_source(self):
+        # results are collected while a paced source waits between its frames, not after several frames
+        emitted = {}
+
+        def paced(frames):
+            for data in frames:
+                emitted[data[0]] = time.perf_counter()
+                yield data
+                time.sleep(0.02)
+
+        frames = DataEmitter(None, self.df_trajectories, None, self.params['DATA_EMITTER_PARAMS']).frames()
+        latencies = [time.perf_counter() - emitted[result.time]
+                     for _, result in run_sessions([(self.df_goals, paced(frames))], self.params)]
+
+        self.assertEqual(len(latencies), len(self.compact_results(self.df_trajectories, self.params)))
+        self.assertLess(np.median(latencies), 0.05)
+
+    def test_failed_source(self):
+        # the frame rings of the workers have no slots for actions, so the producer fails on the first frame
+        frames = [[0, np.zeros(3), 1]]
+        with self.assertRaises(ValueError):
+            list(run_sessions([(self.df_goals, frames)], self.params))
+
+    def test_main_mode(self):
+        expected = Main(self.path_goals, self.path_trajectories).run(ListSink()).results
+        self.assertEqual(Main(self.path_goals, self.path_trajectories, mode='processes').run(ListSink()).results,
+                         expected)
+
+        with self.assertRaises(ValueError):
+            Main(self.path_goals, self.path_trajectories, use_db=True, mode='processes')
+
+
+if __name__ == '__main__':
+    unittest.main()
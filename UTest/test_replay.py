@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+from main import Main, get_params
+from replay import replay
+from result_sinks import ListSink
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class TestReplay(unittest.TestCase):
+
+    def assert_same_as_main(self, path_goals, path_trajectories, path_actions=None):
+        use_db = path_actions is not None
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = Main(path_goals, path_trajectories, path_actions or '', use_db=use_db).run(ListSink()).results
+
+            df_trajectories = pd.read_csv(path_trajectories)
+            df_actions = pd.read_csv(path_actions) if use_db else None
+            result = replay(pd.read_csv(path_goals), df_trajectories, df_actions, get_params(df_trajectories, use_db))
+
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual(result.time.tolist(), [r["time"] for r in expected])
+        self.assertEqual(result.uncat_prob.tolist(), [r["uncat_prob"] for r in expected])
+
+        for i, r in enumerate(expected):
+            with self.subTest(frame=i):
+                ids = result.goal_ids[result.in_result[i]].tolist()
+                self.assertEqual(ids, list(r["goals"].keys()))
+                np.testing.assert_array_equal(result.hand_position[i], r["hand_position"])
+                self.assertEqual(result.probability[i][result.in_result[i]].tolist(),
+                                 [g["probability"] for g in r["goals"].values()])
+                self.assertEqual(result.distance[i][result.in_result[i]].tolist(),
+                                 [g["distance"] for g in r["goals"].values()])
+                self.assertEqual(result.sample_quantity[i][result.in_result[i]].tolist(),
+                                 [g["sample_quantity"] for g in r["goals"].values()])
+
+    def test_generated(self):
+        self.assert_same_as_main(os.path.join(DATA_FOLDER, 'test_data_generated', 'test_goal', '3_4.csv'),
+                                 os.path.join(DATA_FOLDER, 'test_data_generated', 'test_trajectory', '3_4_2_11.csv'))
+
+    def test_study(self):
+        study_folder = os.path.join(DATA_FOLDER, 'test_data_study')
+        self.assert_same_as_main(os.path.join(study_folder, 'goals.csv'),
+                                 os.path.join(study_folder, 'assemble_right_hand', '41212_2_168_r.csv'),
+                                 os.path.join(study_folder, 'assemble_actions', '41212_2_168.csv'))
+
+    def test_float32_precision(self):
+        # float32 with log domain probabilities stays within one step of the rounded results of float64
+        recorded_folder = os.path.join(DATA_FOLDER, 'test_data_recorded')
+        generated_folder = os.path.join(DATA_FOLDER, 'test_data_generated')
+        tests = [(os.path.join(recorded_folder, 'recorded_goals', 'goal_config1.csv'),
+                  os.path.join(recorded_folder, 'recorded_trajectories', 'configuration1', '10_config1_target2.csv')),
+                 (os.path.join(generated_folder, 'test_goal', '3_4.csv'),
+                  os.path.join(generated_folder, 'test_trajectory', '3_4_2_11.csv'))]
+
+        for path_goals, path_trajectories in tests:
+            with self.subTest(trajectory=os.path.basename(path_trajectories)):
+                df_goals, df_trajectories = pd.read_csv(path_goals), pd.read_csv(path_trajectories)
+                params = get_params(df_trajectories)
+                expected = replay(df_goals, df_trajectories, params=params)
+                params['PRECISION'] = 'float32'
+                result = replay(df_goals, df_trajectories, params=params)
+
+                self.assertEqual(result.time.tolist(), expected.time.tolist())
+                np.testing.assert_array_equal(result.in_result, expected.in_result)
+                np.testing.assert_allclose(result.probability, expected.probability, rtol=0, atol=0.011)
+                np.testing.assert_allclose(result.uncat_prob, expected.uncat_prob, rtol=0, atol=0.011)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from main import Main, get_params
+from result_sinks import CallbackSink, DequeSink, DownsampleSink, FileSink, ListSink, Sink
+
+GENERATED_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test_data_generated')
+
+
+class TestResultSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.path_goals = os.path.join(GENERATED_FOLDER, 'test_goal', '3_4.csv')
+        self.path_trajectories = os.path.join(GENERATED_FOLDER, 'test_trajectory', '3_4_2_11.csv')
+        self.expected = Main(self.path_goals, self.path_trajectories).run(ListSink()).results
+
+    def test_process_stream(self):
+        df_trajectories = pd.read_csv(self.path_trajectories)
+        params = get_params(df_trajectories)
+        controller = Controller(pd.read_csv(self.path_goals), False, params['NOISE_REDUCER_PARAMS'],
+                                params['MODEL_PARAMS'], params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'])
+        frames = DataEmitter(None, df_trajectories, None, params['DATA_EMITTER_PARAMS']).frames()
+
+        consumed = []
+
+        def record(frames_):
+            for frame in frames_:
+                consumed.append(frame)
+                yield frame
+
+        stream = controller.process_stream(record(frames))
+        self.assertEqual(next(stream), self.expected[0])
+        self.assertLess(len(consumed), len(self.expected))  # only the frames up to the first result are processed
+        self.assertEqual([next(stream) for _ in range(len(self.expected) - 1)], self.expected[1:])
+
+    def test_bounded_sinks(self):
+        times = []
+        sink = Main(self.path_goals, self.path_trajectories).run(DequeSink(maxlen=5))
+        self.assertEqual(list(sink.results), self.expected[-5:])
+        self.assertEqual(sink.count, len(self.expected))
+
+        Main(self.path_goals, self.path_trajectories).run(DownsampleSink(CallbackSink(
+            lambda result: times.append(result['time'])), every=10))
+        self.assertEqual(times, [result['time'] for result in self.expected[::10]])
+
+    def test_abstract_sink(self):
+        class IncompleteSink(Sink):
+            pass
+
+        with self.assertRaises(TypeError):
+            Sink()
+        with self.assertRaises(TypeError):
+            IncompleteSink()
+
+    def test_file_sink(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'results.jsonl')
+            with FileSink(path) as sink:
+                Main(self.path_goals, self.path_trajectories).run(sink)
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+
+        self.assertEqual(len(lines), len(self.expected))
+        self.assertEqual([line['uncat_prob'] for line in lines], [result['uncat_prob'] for result in self.expected])
+        self.assertEqual(lines[-1]['goals'], {str(key): value for key, value in self.expected[-1]['goals'].items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from utilities.result_summarizer import ResultSink, load_results, make_record, parse_test_id, summarize
+
+
+class TestResultSummarizer(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            make_record('1_3_1_01', 99.5, 500, 12, 0.4, 'Success', (50, 990)),
+            make_record('1_3_2_21', 98.0, 900, 20, 0.2, 'Pass1', (50, 990)),
+            make_record('2_1_1_00', 40.0, None, None, None, 'Failure', (50, 990)),
+            make_record('2_1_3_11', 70.0, 60, 10, 1.0, 'Success', (50, 990)),
+            make_record('23_config1_all2', 80.0, None, None, None, 'Pass2', None),
+        ]
+
+    def test_parse_test_id(self):
+        self.assertEqual(parse_test_id('4_6_2_11'), {'goal_config': '4_6', 'target': 2, 'curvature': 'moderate',
+                                                     'start_side': 'left'})
+        self.assertEqual(parse_test_id('23_config1_all2')['goal_config'], None)
+
+    def test_sink_and_summary(self):
+        results = load_results_from(self.records)
+        self.assertEqual(results['test_id'].tolist(), [record['test_id'] for record in self.records])
+
+        summary = summarize(results)
+        self.assertEqual(summary['status'].tolist(), ['Success', 'Pass1', 'Pass2', 'Failure'])
+        self.assertEqual(summary['count'].tolist(), [2, 1, 1, 1])
+        self.assertEqual(summary['share'].tolist(), [40.0, 20.0, 20.0, 20.0])
+        self.assertEqual(summary['highest_probability'].tolist(), [84.75, 98.0, 80.0, 40.0])
+        self.assertEqual(summary['distance_60'].tolist(), [0.7, 0.2, 0.0, 0.0])
+        self.assertEqual(summary[['time_q1', 'time_q2', 'time_q3', 'time_q4']].values.tolist(),
+                         [[1, 1, 0, 0], [0, 0, 0, 1], [0, 0, 0, 0], [0, 0, 0, 0]])
+
+    def test_group_by(self):
+        results = load_results_from(self.records)
+        summary = summarize(results, ('goal_config', 'curvature'))
+        success = summary[summary['status'] == 'Success']
+
+        self.assertEqual(len(summary), 5 * 4)  # 4 generated groups and one without metadata
+        self.assertEqual(success['count'].tolist(), [1, 0, 0, 1, 0])
+        self.assertEqual(success['goal_config'].tolist()[:4], ['1_3', '1_3', '2_1', '2_1'])
+        self.assertEqual(success['curvature'].tolist()[:4], ['linear', 'max', 'linear', 'moderate'])
+
+
+def load_results_from(records):
+    """ Writes the records with a ResultSink and reads them again. """
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'results.jsonl')
+        with ResultSink(path) as sink:
+            for record in records:
+                sink.write(record)
+        return load_results(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
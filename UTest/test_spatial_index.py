@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+
+from main import get_params
+from replay import replay
+from spatial_index import ConeCulling, GoalGrid
+from utilities.benchmark import synthetic_goals, synthetic_trajectory
+
+
+class TestGoalGrid(unittest.TestCase):
+
+    def test_query_ball(self):
+        rng = np.random.default_rng(1)
+        positions = rng.uniform(-1.0, 1.0, (500, 3))
+        grid = GoalGrid(positions, 0.1)
+
+        for center, radius in ((np.zeros(3), 0.3), (np.array([0.9, -0.9, 0.5]), 0.05), (np.ones(3), 5.0)):
+            expected = np.flatnonzero(np.linalg.norm(positions - center, axis=1) <= radius)
+            np.testing.assert_array_equal(grid.query_ball(center, radius), expected)
+
+    def test_invalid_cell_size(self):
+        with self.assertRaises(ValueError):
+            GoalGrid(np.zeros((1, 3)), 0.0)
+
+
+class TestConeCulling(unittest.TestCase):
+
+    def test_candidates(self):
+        positions = np.array([[1.0, 0.0, 0.0], [0.5, 0.4, 0.0], [0.0, 1.0, 0.0], [-1.0, 0.0, 0.0], [3.0, 0.0, 0.0]])
+        culling = ConeCulling(positions, 2.0, np.pi / 4)
+        np.testing.assert_array_equal(culling.candidates(np.zeros(3), np.array([2.0, 0.0, 0.0])), [0, 1])
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            ConeCulling(np.zeros((1, 3)), -1.0, 1.0)
+        with self.assertRaises(ValueError):
+            ConeCulling(np.zeros((1, 3)), 1.0, 4.0)
+
+    def test_no_culling_with_full_cone(self):
+        # a cone of pi and a radius larger than the table keep all goals, so the results are unchanged
+        rng = np.random.default_rng(0)
+        df_goals = synthetic_goals(50, rng)
+        df_trajectories = synthetic_trajectory(df_goals[['x', 'y', 'z']].to_numpy()[0], 120, rng)
+
+        params = get_params(df_trajectories)
+        expected = replay(df_goals, df_trajectories, params=params)
+        params['CULLING_PARAMS'] = (10.0, np.pi)
+        result = replay(df_goals, df_trajectories, params=params)
+
+        np.testing.assert_array_equal(result.time, expected.time)
+        np.testing.assert_allclose(result.probability, expected.probability, rtol=0, atol=1e-12)
+
+    def test_culled_goals_are_reset(self):
+        rng = np.random.default_rng(0)
+        df_goals = synthetic_goals(200, rng)
+        df_trajectories = synthetic_trajectory(df_goals[['x', 'y', 'z']].to_numpy()[0], 120, rng)
+
+        params = get_params(df_trajectories)
+        params['CULLING_PARAMS'] = (0.3, np.pi / 6)
+        result = replay(df_goals, df_trajectories, params=params)
+
+        self.assertGreater(len(result.time), 0)
+        self.assertTrue(np.all(result.probability[-1] >= 0))
+        self.assertLess(np.count_nonzero(result.sample_quantity[-1]), 200)
+
+    def test_culled_goals_have_current_distances(self):
+        rng = np.random.default_rng(0)
+        df_goals = synthetic_goals(200, rng)
+        df_trajectories = synthetic_trajectory(df_goals[['x', 'y', 'z']].to_numpy()[0], 120, rng)
+
+        params = get_params(df_trajectories)
+        params['CULLING_PARAMS'] = (0.3, np.pi / 6)
+        result = replay(df_goals, df_trajectories, params=params)
+
+        positions = df_goals[['x', 'y', 'z']].to_numpy()
+        for i in range(len(result.time)):
+            distances = np.linalg.norm(positions - result.hand_position[i], axis=1)
+            np.testing.assert_allclose(result.distance[i], distances, rtol=0, atol=0.005 + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+from utilities.trajectory_generator import (START_COORDS, calculate_quadratic_bezier_curve,
+                                            calculate_quadratic_bezier_curves, generate_dataset, generate_goal_layouts,
+                                            load_packed_dataset, write_packed_dataset)
+
+
+class TestTrajectoryGenerator(unittest.TestCase):
+
+    def test_same_as_single_curve(self):
+        rng = np.random.default_rng(0)
+        starts = START_COORDS[rng.integers(0, 3, 50), :2]
+        ends = rng.uniform(-1.0, 1.0, (50, 2))
+        ends[0] = starts[0]  # no curve to a target at the start point
+        curvatures = rng.choice([0.0, 0.5, 1.0], 50)
+
+        curves = calculate_quadratic_bezier_curves(starts, ends, curvatures, 200)
+        self.assertTrue(np.isnan(curves[0]).all())
+        for start, end, curvature, curve in zip(starts[1:], ends[1:], curvatures[1:], curves[1:]):
+            np.testing.assert_allclose(curve, calculate_quadratic_bezier_curve(start, end, curvature, 200), atol=1e-12)
+
+    def test_min_jerk_profile(self):
+        curve = calculate_quadratic_bezier_curves(np.zeros((1, 2)), np.array([[0.0, 1.0]]), np.zeros(1), 101,
+                                                  'min_jerk')[0]
+        steps = np.linalg.norm(np.diff(curve, axis=0), axis=1)
+        self.assertLess(steps[0], steps[50] / 10)  # slow start, fast middle
+        np.testing.assert_allclose(curve[[0, -1]], [[0.0, 0.0], [0.0, 1.0]], atol=1e-15)
+
+        with self.assertRaises(ValueError):
+            calculate_quadratic_bezier_curves(np.zeros((1, 2)), np.ones((1, 2)), np.zeros(1), 10, 'linear')
+
+    def test_packed_dataset(self):
+        rng = np.random.default_rng(1)
+        goal_positions = generate_goal_layouts(4, 6, rng)
+        goal_positions[0, 0, :2] = START_COORDS[1, :2]  # left out for the left start point
+        dataset = generate_dataset(goal_positions, steps=50)
+
+        self.assertEqual(len(dataset), 4 * 6 * 3 * 3 - 3)
+        self.assertEqual(dataset.trajectories.shape, (len(dataset), 50, 3))
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'dataset.npz')
+            write_packed_dataset(path, dataset)
+            loaded = load_packed_dataset(path)
+
+        np.testing.assert_array_equal(loaded.trajectories, dataset.trajectories)
+        np.testing.assert_array_equal(loaded.index, dataset.index)
+
+        number = 40
+        entry = loaded.index[number]
+        trajectory = loaded.trajectory_df(number)
+        goals = loaded.goals_df(entry['layout'])
+        target = goals[goals['ID'] == entry['target']][['x', 'y', 'z']].to_numpy()[0]
+        self.assertEqual(trajectory['time'].tolist(), list(range(1, 51)))
+        np.testing.assert_allclose(trajectory[['x', 'y', 'z']].to_numpy()[[0, -1]],
+                                   [START_COORDS[entry['start']], target], atol=1e-12)
+
+    def test_chunked_dataset(self):
+        goal_positions = generate_goal_layouts(3, 5, np.random.default_rng(2))
+        expected = generate_dataset(goal_positions, steps=40, noise_sd=0.01, rng=np.random.default_rng(3))
+
+        # chunks of 7 trajectories into a memory map give the same trajectories and noise
+        with tempfile.TemporaryDirectory() as folder, \
+                mock.patch('utilities.trajectory_generator.CHUNK_BYTES', 7 * 40 * 3 * 8):
+            path = os.path.join(folder, 'trajectories.npy')
+            dataset = generate_dataset(goal_positions, steps=40, noise_sd=0.01, rng=np.random.default_rng(3),
+                                       trajectories_path=path)
+            self.assertIsInstance(dataset.trajectories, np.memmap)
+            np.testing.assert_array_equal(dataset.trajectories, expected.trajectories)
+            np.testing.assert_array_equal(np.load(path), expected.trajectories)
+            del dataset
+
+        dataset = generate_dataset(goal_positions, steps=40, noise_sd=0.01, rng=np.random.default_rng(3),
+                                   dtype='float32')
+        self.assertEqual(dataset.trajectories.dtype, np.float32)
+        np.testing.assert_allclose(dataset.trajectories, expected.trajectories, atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            generate_dataset(goal_positions, dtype='float16')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,41 +1,54 @@
 import sys
+from typing import Optional, TYPE_CHECKING
 
-import pandas
-import pandas as pd
+import numpy as np
 from data_handler import DataHandler
 from data_handler import ActionData
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from action_timeline import ActionTimeline
+
 
 class ActionHandler:
     """ A class that handles actions. """
 
-    def __init__(self, data_handler: DataHandler, ACTION_HANDLER_PARAMS: tuple[bool, str]) -> None:
+    def __init__(self,
+                 data_handler: DataHandler,
+                 ACTION_HANDLER_PARAMS: tuple[bool, str],
+                 action_timeline: Optional['ActionTimeline'] = None
+                 ) -> None:
         """
         Parameters:
             data_handler (DataHandler): An instance for handling the data during runtime.
             ACTION_HANDLER_PARAMS (tuple):
                 [0] Boolean flag for Task (bool): True for assemble_actions and False for dismantling.
                 [1] hand (str): Hand that is being tracked.
+            action_timeline (ActionTimeline): Compiled actions for actions given as indices. None if not used.
         """
         self.data_handler = data_handler
-        self.possible_goals = self.data_handler.possible_goals
+        self.action_timeline = action_timeline
+        self.goal_store = self.data_handler.goal_store
 
         self.is_assembly = ACTION_HANDLER_PARAMS[0]
         self.tracked_hand = ACTION_HANDLER_PARAMS[1]
 
-    def handle_action(self, action_df: pd.DataFrame) -> None:
+    def handle_action(self, action_df: 'int | pd.DataFrame') -> None:
         """
         Updates all goals and handles actions from the database.
 
         Parameters:
-            action_df (pandas.DataFrame): A DataFrame containing data for current action from the database.
-            Each DataFrame includes the following columns:
+            action_df (int | pandas.DataFrame): Index of the action in action_timeline or a DataFrame containing data
+            for current action from the database. Each DataFrame includes the following columns:
                 - time
                 - hand
                 - action_id
                 - possible_actions
         """
-        action = self.convert_action(action_df)
+        if isinstance(action_df, (int, np.integer)):
+            action = self.action_timeline.action(action_df)
+        else:
+            action = self.convert_action(action_df)
 
         # Check if it is a future action.
         if action.time <= self.data_handler.timestamp:
@@ -47,12 +60,12 @@ class ActionHandler:
                 removed = self.remove_goal(action.target)
 
                 # Exit when no more goals are active.
-                if len(self.data_handler.all_goals) < 1:
+                if self.goal_store.count_active() < 1:
                     sys.exit(1)
 
                 # Switch to all goals when possible goals are empty.
-                if len(self.possible_goals) < 1:
-                    self.possible_goals[:] = self.possible_goals[:] = self.data_handler.all_goals.copy()
+                if self.goal_store.count_possible() < 1:
+                    self.goal_store.reset_possible()
 
                 if removed:
                     msg = f"Deactivating :  {action.target}"
@@ -67,37 +80,39 @@ class ActionHandler:
             # Handle future actions.
             self.data_handler.set_future_tracked_target(action)
 
-            if (action.possible_targets is not None and len(self.possible_goals) > 0 and
-                    any(goal.num == action.target for goal in self.data_handler.all_goals)):
+            if (action.possible_targets is not None and self.goal_store.count_possible() > 0 and
+                    self.goal_store.is_active(action.target)):
 
                 # Reduce goal amount with possible actions.
                 unique_targets = list(set([action.target] + action.possible_targets))
-                self.possible_goals[:] = (filter(lambda g: g.num in unique_targets, self.data_handler.all_goals))
-                targets = [t.num for t in self.possible_goals]
+                self.goal_store.reduce_possible(unique_targets)
+                targets = self.goal_store.num[self.goal_store.possible].tolist()
 
-                msg = (f" Reduced to {len(self.possible_goals)} possible targets: {targets} ===> {action.target} going "
+                msg = (f" Reduced to {len(targets)} possible targets: {targets} ===> {action.target} going "
                        f"to be picked at {action.time} <===")
 
             else:
                 msg = "Corrupt database line for possible future goals. Falling back to all goals with "
 
-                if action.target in self.data_handler.all_goals:
+                if self.goal_store.is_active(action.target):
                     msg += f"future target: {action.target}."
                 else:
                     msg += "no future target."
 
                 # Switch to all goals when action is faulty.
-                self.possible_goals[:] = self.data_handler.all_goals.copy()
+                self.goal_store.reset_possible()
 
             print_boxed_message_2(msg)
 
-    def convert_action(self, action: pandas.DataFrame) -> ActionData:
+    def convert_action(self, action: 'pd.DataFrame') -> ActionData:
         """
         Converts actions from database (dataframe) to ActionData (dataclass).
 
         action (pandas.DataFrame): Action to be converted.
         return: Action as ActionData object.
         """
+        import pandas as pd
+
         time = int(action['time'])
         hand = action['hand']
 
@@ -124,21 +139,12 @@ class ActionHandler:
         goal_id (int): Goal id to be removed.
         return: True if it is successfully removed. False otherwise.
         """
-        bad_db_entry = True
-        for index, g in enumerate(self.possible_goals):
-            if g.num == goal_id:
-                # Remove the goal from the active goals list
-                self.possible_goals.pop(index)
-
-        for index, g in enumerate(self.data_handler.all_goals):
-            if g.num == goal_id:
-                # Remove the goal from the active goals list
-                self.data_handler.all_goals.pop(index)
-                return True
-
-        if bad_db_entry:
-            print(f"Goal ID:{goal_id} is not in the list of all goals.")
-            return False
+        # Deactivate the goal in the masks of possible and all goals
+        if self.goal_store.remove(goal_id):
+            return True
+
+        print(f"Goal ID:{goal_id} is not in the list of all goals.")
+        return False
 
 
 def parse_action_string_to_tuples(action_string: str) -> list:
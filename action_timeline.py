@@ -0,0 +1,93 @@
+from typing import TYPE_CHECKING
+import numpy as np
+
+from action_handler import parse_action_string_to_tuples
+from data_handler import ActionData
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ActionTimeline:
+    """
+    A class that stores the actions from the database as arrays. The strings of the actions are parsed once when the
+    timeline is compiled, so the data emitter and the action handler only look up arrays during runtime.
+
+    Attributes:
+        time (numpy.ndarray): Timestamps of the actions (A,).
+        hand (numpy.ndarray): Hand of the actions as index into hand_names (A,).
+        type (numpy.ndarray): Action type as index into type_names (A,).
+        target (numpy.ndarray): Targeted goals (A,).
+        is_relevant (numpy.ndarray): True for actions that are relevant for assembly or dismantle (A,).
+        is_tracked_hand (numpy.ndarray): True for actions of the tracked hand (A,).
+        has_possible_targets (numpy.ndarray): True for actions with valid possible targets (A,).
+        possible_ptr (numpy.ndarray): Possible targets of action i are possible_targets[ptr[i]:ptr[i + 1]] (A + 1,).
+        possible_targets (numpy.ndarray): Possible targets of all actions.
+        next_relevant (numpy.ndarray): Index of the first relevant action of the tracked hand at or after each
+            index. -1 if there is none (A + 1,).
+        hand_names, type_names (list[str]): Names of the codes.
+    """
+
+    def __init__(self, df_actions: 'pd.DataFrame', is_assembly: bool, tracked_hand: str) -> None:
+        """
+        Parameters:
+            df_actions (pandas.DataFrame): DataFrame with the columns time, hand, action_id and possible_actions.
+            is_assembly (bool): True for assemble_actions and False for dismantling.
+            tracked_hand (str): Hand that is being tracked.
+        """
+        import pandas as pd
+
+        relevant_action_type = 'pick' if is_assembly else 'place'
+        size = len(df_actions)
+
+        self.time = df_actions['time'].to_numpy(dtype=np.int64)
+
+        hands = df_actions['hand'].tolist()
+        self.hand_names = list(dict.fromkeys(hands))
+        self.hand = np.array([self.hand_names.index(hand) for hand in hands], dtype=np.int8)
+        self.is_tracked_hand = np.array([hand == tracked_hand for hand in hands], dtype=bool)
+
+        types, targets = [], []
+        has_possible_targets = np.zeros(size, dtype=bool)
+        possible_ptr = np.zeros(size + 1, dtype=np.int64)
+        possible_targets = []
+        possible_actions_column = df_actions['possible_actions'].tolist() if 'possible_actions' in df_actions \
+            else [None] * size
+        for index, (action_id, possible_actions) in enumerate(zip(df_actions['action_id'].tolist(),
+                                                                  possible_actions_column)):
+            action_type, target = parse_action_string_to_tuples(action_id)[0]
+            types.append(action_type)
+            targets.append(target)
+
+            if pd.notna(possible_actions):
+                possible_actions_tuple = parse_action_string_to_tuples(possible_actions)
+                if all(action_str == action_type for action_str, _ in possible_actions_tuple):
+                    has_possible_targets[index] = True
+                    possible_targets += [action_int for _, action_int in possible_actions_tuple]
+            possible_ptr[index + 1] = len(possible_targets)
+
+        self.type_names = list(dict.fromkeys(types))
+        self.type = np.array([self.type_names.index(action_type) for action_type in types], dtype=np.int8)
+        self.target = np.array(targets, dtype=np.int64)
+        self.is_relevant = np.array([action_type == relevant_action_type for action_type in types], dtype=bool)
+        self.has_possible_targets = has_possible_targets
+        self.possible_ptr = possible_ptr
+        self.possible_targets = np.array(possible_targets, dtype=np.int64)
+
+        # next relevant action of the tracked hand, searched backwards
+        candidates = np.where(self.is_relevant & self.is_tracked_hand, np.arange(size), size)
+        next_relevant = np.append(np.minimum.accumulate(candidates[::-1])[::-1], size)
+        self.next_relevant = np.where(next_relevant == size, -1, next_relevant)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def action(self, index: int) -> ActionData:
+        """ Returns the action at an index in the same format as ActionHandler.convert_action. """
+        possible_targets = None
+        if self.has_possible_targets[index]:
+            possible_targets = self.possible_targets[self.possible_ptr[index]:self.possible_ptr[index + 1]].tolist()
+
+        return ActionData(int(self.time[index]), self.hand_names[self.hand[index]], self.type_names[self.type[index]],
+                          int(self.target[index]), bool(self.is_relevant[index]), bool(self.is_tracked_hand[index]),
+                          possible_targets)
@@ -1,16 +1,20 @@
 import sys
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Sequence, TYPE_CHECKING, Union
 import numpy as np
-import pandas as pd
 
 import noise_reducer
-from data_handler import DataHandler
+from data_handler import DataHandler, FrameResult
+from frame_buffer import FrameView
 from action_handler import ActionHandler
-from goal import Goal
+from action_timeline import ActionTimeline
+from goal_store import GoalStore
+from instrumentation import Instrumentation
+from kernels import select_kernel
 from prediction_model import PredictionModel
 from probability_evaluator import ProbabilityEvaluator
 
-from utilities import prediction_plotter
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class Controller:
@@ -18,7 +22,7 @@ class Controller:
     A class that controls the flow of data.
 
     Attributes:
-        goals (list[Goals]): A list of instances of the Goals class.
+        goal_store (GoalStore): All goals with their state as arrays.
         data_handler (DataHandler): An instance for handling the data during runtime.
         noise_reducer (NoiseReducer): An instance of one of the three noise reducer classes.
         prediction_model (PredictionModel): An instance for calculating trajectories.
@@ -27,16 +31,22 @@ class Controller:
     """
 
     def __init__(self,
-                 df: pd.DataFrame,
+                 df: 'pd.DataFrame',
                  use_database: bool,
                  NOISE_REDUCER_PARAMS: tuple[int, float],
                  MODEL_PARAMS: tuple[float, float],
                  PROBABILITY_PARAMS: tuple[float, float, float],
-                 ACTION_HANDLER_PARAMS: tuple[bool, str]
+                 ACTION_HANDLER_PARAMS: tuple[bool, str],
+                 action_timeline: Optional[ActionTimeline] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 CULLING_PARAMS: Optional[tuple[float, float]] = None,
+                 PRECISION: str = 'float64',
+                 BACKEND: str = 'numpy'
                  ) -> None:
         """
         Parameters:
-            df (pandas.DataFrame): DataFrame containing the positions and IDs of the goals.
+            df (pandas.DataFrame): DataFrame containing the positions and IDs of the goals. A dict of columns (see
+                dataset_cache.read_columns) works as well.
             use_database (bool): True when database (action) is used. False otherwise.
             NOISE_REDUCER_PARAMS (tuple): A tuple specifying
                 [0] noise_reducer_type (int): The type of noise reduction technique to apply.
@@ -51,16 +61,27 @@ class Controller:
             ACTION_HANDLER_PARAMS (tuple):
                 [0] is_assemble (bool): True for assemble_actions and False for dismantling.
                 [1] hand (str): Hand that is being tracked.
+            action_timeline (ActionTimeline): Compiled actions for actions given as indices. None if not used.
+            instrumentation (Instrumentation): Measures the time of each stage. None disables the measurement.
+            CULLING_PARAMS (tuple): None to evaluate all goals. Otherwise a tuple specifying
+                [0] radius (float): Maximum distance of an evaluated goal to the hand wrist in meters.
+                [1] cone_angle (float): Maximum angle between the measured direction and an evaluated goal in radians.
+            PRECISION (str): 'float64' (reference) or 'float32' for goal state in float32 and probabilities in log
+                domain.
+            BACKEND (str): 'numpy' (reference) or 'numba' for the goal update in one compiled loop. Falls back to
+                'numpy' when Numba is not installed.
         """
 
         goal_data = process_goal_df(df)
-        self.goals = [Goal(number, position) for number, position in goal_data]
+        self.goal_store = GoalStore.from_goal_data(goal_data, PRECISION)
 
-        self.data_handler = DataHandler(self.goals, use_database)
-        self.prediction_model = PredictionModel(self.data_handler, MODEL_PARAMS)
-        self.probability_evaluator = ProbabilityEvaluator(self.data_handler, PROBABILITY_PARAMS)
-        self.action_handler = ActionHandler(self.data_handler, ACTION_HANDLER_PARAMS)
+        self.data_handler = DataHandler(self.goal_store, use_database)
+        kernel = select_kernel(BACKEND)
+        self.prediction_model = PredictionModel(self.data_handler, MODEL_PARAMS, CULLING_PARAMS, kernel)
+        self.probability_evaluator = ProbabilityEvaluator(self.data_handler, PROBABILITY_PARAMS, kernel)
+        self.action_handler = ActionHandler(self.data_handler, ACTION_HANDLER_PARAMS, action_timeline)
         self.noise_reducer = select_noise_reducer(NOISE_REDUCER_PARAMS)
+        self.instrumentation = instrumentation
 
     def process_data(self, data: list) -> Optional[dict]:
         """
@@ -72,6 +93,8 @@ class Controller:
                 [2], [3], [4], ... -> actions from the database.
                 [-1] -> future action.
 
+        Frames from a FrameRingBuffer are processed in batches with process_view.
+
         Parameters:
             data (list): A list containing:
                 (int): Time value.
@@ -93,15 +116,131 @@ class Controller:
 
         if is_bad_data(data):
             return None
+        return self._timed_step(data[0], data[1], data[2:], self.data_handler.get_result)
+
+    def process_data_compact(self, data: list) -> Optional[FrameResult]:
+        """
+        Like process_data, but returns the result as arrays. The dict of process_data can be built with
+        FrameResult.to_dict when it is needed.
+
+        Parameters:
+            data (list): A list in the same format as in process_data.
+
+        Return:
+            FrameResult: The goals of the result as arrays. None if no new prediction has been calculated.
+        """
+        if is_bad_data(data):
+            return None
+        return self._timed_step(data[0], data[1], data[2:], self.data_handler.get_compact_result)
+
+    def process_stream(self, frames: Iterable, compact: bool = False) -> Iterator:
+        """
+        Processes the frames one after another while they are iterated and yields the result of every frame with a
+        new prediction. No result is kept, so the memory does not grow with the length of the stream.
 
-        self.data_handler.timestamp = data[0]
-        hand_position = data[1]
+        Parameters:
+            frames (Iterable): Frames in the format of process_data (e.g. DataEmitter.frames) or views of a
+                FrameRingBuffer (e.g. FrameRingBuffer.batches).
+            compact (bool): True to yield FrameResults like process_data_compact instead of dicts.
+
+        Yields:
+            dict | FrameResult: The results in the order of the frames.
+        """
+        process = self.process_data_compact if compact else self.process_data
+        for frame in frames:
+            if isinstance(frame, FrameView):
+                yield from self.process_view(frame, compact)
+                continue
+
+            result = process(frame)
+            if result is not None:
+                yield result
+
+    def process_view(self, view: FrameView, compact: bool = False) -> list:
+        """
+        Processes the frames of a view of a FrameRingBuffer like process_data (or process_data_compact). The frames
+        have been validated when they were written, so they are not checked again. The positions are copied once for
+        the whole view, so the view can be released right after the call.
+
+        Parameters:
+            view (FrameView): Consecutive frames of a FrameRingBuffer.
+            compact (bool): True to return FrameResults like process_data_compact instead of dicts.
+
+        Return:
+            list: The results of the frames with a new prediction in the order of the frames.
+        """
+        get_result = self.data_handler.get_compact_result if compact else self.data_handler.get_result
+        positions = view.position.copy()
+        counts = view.action_count.tolist()
+
+        results = []
+        for i, timestamp in enumerate(view.time.tolist()):
+            actions = view.actions[i, :counts[i]].tolist() if counts[i] else ()
+            result = self._timed_step(timestamp, positions[i], actions, get_result)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def _timed_step(self, timestamp: int, hand_position: np.ndarray, actions: Sequence[int],
+                    get_result: Callable[[], Union[dict, FrameResult]]) -> Optional[Union[dict, FrameResult]]:
+        """
+        Runs step_frame for a validated frame and packages the result with get_result if there is a new prediction.
+        With instrumentation the stages and the total time of the frame are measured.
+
+        Return:
+            dict | FrameResult: The result of get_result. None if no new prediction has been calculated.
+        """
+        timer = self.instrumentation
+        if timer is not None:
+            timer.begin(timestamp)
+
+        result = get_result() if self.step_frame(timestamp, hand_position, actions) else None
+
+        if timer is not None:
+            if result is not None:
+                timer.lap('get_result')
+            timer.end(timestamp, result is not None)
+        return result
+
+    def step(self, data: list) -> bool:
+        """
+        Runs the actions, the noise reducer, the prediction model and the probability evaluator for one measurement
+        without packaging the result. The result can be read from data_handler afterwards.
+
+        Parameters:
+            data (list): A list in the same format as in process_data.
+
+        Return:
+            bool: True if a new prediction has been calculated. False otherwise.
+        """
+
+        if is_bad_data(data):
+            return False
+        return self.step_frame(data[0], data[1], data[2:])
+
+    def step_frame(self, timestamp: int, hand_position: np.ndarray, actions: Sequence[int]) -> bool:
+        """
+        Like step, but with the fields of a frame that has already been validated (see FrameRingBuffer.write).
+
+        Parameters:
+            timestamp (int): Time value.
+            hand_position (numpy.ndarray): Hand wrist position as a NumPy array of float64. It is kept by the prediction
+                model, so it must not be overwritten afterwards.
+            actions (Sequence[int]): Indices of the actions of the frame.
+
+        Return:
+            bool: True if a new prediction has been calculated. False otherwise.
+        """
+        timer = self.instrumentation
+        self.data_handler.timestamp = timestamp
 
         self.data_handler.actions = []  # Reset actions for this measurement.
-        for d in data[2:]:
+        for d in actions:
             self.action_handler.handle_action(d)
+        if timer is not None:
+            timer.lap('actions')
 
-        if len(self.goals) <= 0:
+        if self.goal_store.count_active() <= 0:
             sys.exit(1)  # Exit when there are no longer goals
 
         stabilized_coordinates = hand_position  # Default value
@@ -110,29 +249,34 @@ class Controller:
             noise_reduction_result = self.noise_reducer.get()
             if noise_reduction_result is not None:
                 stabilized_coordinates = noise_reduction_result  # stabilized value
+        if timer is not None:
+            timer.lap('noise_reducer')
 
         # calculate predicted direction
         self.prediction_model.update(stabilized_coordinates)
+        if timer is not None:
+            timer.lap('prediction_model')
 
         # Skip measurements when no prediction is calculated.
         if not self.data_handler.calculated:
             # NOTE: This has been added after Tests.
-            return None
+            return False
 
         self.data_handler.hand_position = stabilized_coordinates
 
         # calculate the probability of predicted direction
         self.probability_evaluator.update()
+        if timer is not None:
+            timer.lap('probability_evaluator')
 
         self.data_handler.calculated = False
-        return self.data_handler.get_result()
+        return True
 
 
-def process_goal_df(df: pd.DataFrame) -> list:
-    """ Processes goal Dataframe. """
-    data = []
-    for index, row in df.iterrows():
-        data.append((int(row['ID']), np.array([float(row['x']), float(row['y']), float(row['z'])])))
+def process_goal_df(df: 'pd.DataFrame') -> list:
+    """ Processes goal Dataframe (or dict of columns). """
+    positions = np.column_stack([np.asarray(df[axis], dtype=float) for axis in ('x', 'y', 'z')])
+    data = [(int(number), position) for number, position in zip(np.asarray(df['ID']), positions)]
 
     assert len(data) > 0, 'the list of goal can not be empty'
     return data
@@ -0,0 +1,77 @@
+"""
+Slim entry point of the predictor for processes that are restarted often.
+
+Goals and trajectories are read with dataset_cache.read_columns, so neither pandas nor matplotlib or scipy are
+imported. Actions from the database are parsed with pandas and are not supported here, use main.py for them.
+
+Run from the root folder of the repository:
+    python core.py data/test_data_recorded/recorded_goals/goal_config1.csv
+        data/test_data_recorded/recorded_trajectories/configuration1/23_config1_all2.csv
+"""
+import argparse
+import sys
+from typing import Iterator, Optional
+
+from controller import Controller
+from data_emitter import DataEmitter
+from data_handler import FrameResult
+from dataset_cache import read_columns
+from goal_store import PRECISIONS
+from kernels import BACKENDS
+from main import get_params, print_result
+
+
+def predict(path_goals: str, path_trajectories: str, params: Optional[dict] = None) -> Iterator[FrameResult]:
+    """
+    Runs the predictor over a recorded trajectory without waiting between the frames.
+
+    Parameters:
+        path_goals (str): The file path of the goals (ID, x, y, z).
+        path_trajectories (str): The file path of the hand wrist positions (time, x, y, z).
+        params (dict): Parameters in the format of main.get_params. Defaults of main.get_params if None.
+
+    Yields:
+        FrameResult: The result of every frame with a new prediction.
+    """
+    goals = read_columns(path_goals)
+    trajectories = read_columns(path_trajectories)
+    if params is None:
+        params = get_params(trajectories)
+
+    data_emitter = DataEmitter(None, trajectories, None, params['DATA_EMITTER_PARAMS'])
+    controller = Controller(goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                            params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'],
+                            CULLING_PARAMS=params.get('CULLING_PARAMS'), PRECISION=params.get('PRECISION', 'float64'),
+                            BACKEND=params.get('BACKEND', 'numpy'))
+
+    yield from controller.process_stream(data_emitter.frames(), compact=True)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the predictor without pandas, matplotlib and scipy.")
+    parser.add_argument('path_goals')
+    parser.add_argument('path_trajectories')
+    parser.add_argument('--precision', choices=list(PRECISIONS), default='float64')
+    parser.add_argument('--backend', choices=BACKENDS, default='numpy')
+    parser.add_argument('--all', action='store_true', help="print all goal probabilities instead of the top 3")
+    parser.add_argument('--quiet', action='store_true', help="print only the number of results")
+    parser.add_argument('--first', action='store_true', help="stop after the first result (startup measurement)")
+    args = parser.parse_args(argv)
+
+    params = get_params(read_columns(args.path_trajectories))
+    params.update(PRECISION=args.precision, BACKEND=args.backend)
+
+    count = 0
+    for result in predict(args.path_goals, args.path_trajectories, params):
+        count += 1
+        if not args.quiet:
+            print_result(result.to_dict(), not args.all)
+        if args.first:
+            break
+
+    print(f"{count} results")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
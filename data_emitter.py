@@ -1,22 +1,30 @@
 import time
 import queue
-import pandas as pd
+from typing import Iterator, Optional, TYPE_CHECKING
 import numpy as np
 
+from action_timeline import ActionTimeline
+from frame_buffer import FrameRingBuffer
+from instrumentation import Instrumentation
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class DataEmitter:
     """ A class that represents a data emitter """
 
     def __init__(self,
                  data_queue: queue.Queue,
-                 df_trajectories: pd.DataFrame,
-                 df_actions: pd.DataFrame,
-                 DATA_EMITTER_PARAMS: tuple[bool, float, int, int, int, float, str, bool]
+                 df_trajectories: 'pd.DataFrame',
+                 df_actions: Optional['pd.DataFrame'],
+                 DATA_EMITTER_PARAMS: tuple[bool, float, int, int, int, float, str, bool],
+                 instrumentation: Optional[Instrumentation] = None
                  ) -> None:
         """
         Parameters:
-            data_queue (queue.Queue): The queue that stores the data to be processed.
-            df_trajectories (pandas.DataFrame): DataFrame containing trajectory data.
+            data_queue (queue.Queue): The queue of emit_data that stores the data to be processed. None if not used.
+            df_trajectories (pandas.DataFrame): DataFrame (or dict of columns) containing trajectory data.
             df_actions (pandas.DataFrame): DataFrame containing action data.
             DATA_EMITTER_PARAMS (tuple):
                 [0] Boolean flag to enable or disable the use of the database.
@@ -27,6 +35,7 @@ class DataEmitter:
                 [5] Real time speed (0.1 (fast) < 1.0 (normal) < 10.0 (slow))
                 [6] String identifier of tracked hand, relevant of the set of next goals
                 [7] Boolean flag indicating assembly/disassembly
+            instrumentation (Instrumentation): Stamps the emission time of each frame. None if not used.
         """
 
         self.data_queue = data_queue
@@ -40,47 +49,73 @@ class DataEmitter:
         self.SPEED = DATA_EMITTER_PARAMS[5]
         self.TRACKED_HAND = DATA_EMITTER_PARAMS[6]
         self.IS_ASSEMBLY = DATA_EMITTER_PARAMS[7]
+        self.instrumentation = instrumentation
+
+        # actions compiled to arrays, the frames contain the indices of the actions
+        self.action_timeline = ActionTimeline(df_actions, self.IS_ASSEMBLY, self.TRACKED_HAND) if self.USE_DB else None
 
     def emit_data(self) -> None:
         """
         Streams data from DataFrames at specified intervals to simulate real-time measurements or to quickly process
         data for testing purposes.
         """
-        # data to be used
-        timestamps_traj = self.df_trajectories['time'].values.tolist()
-        timestamps_action = self.df_actions['time'].values.tolist() if self.USE_DB else []
-
-        # parameters for real time emitting
-        start_time, end_time = self.START_TIME, self.END_TIME
-        curr_time = start_time
-        time_step = self.TIME_STEP
-        speed = self.SPEED
-        curr_traj_index, curr_action_index = 0, -1
-        next_action_index = -1
+        for data in self.paced_frames():
+            self.data_queue.put(data)  # save in queue
+
+        self.data_queue.put(-1)
 
-        # emit data until end of data or end time is reached
-        while curr_time < end_time - time_step and curr_traj_index < len(timestamps_traj):
-            data = []
-            curr_time += time_step
-            same_data = True
+    def emit_to_buffer(self, frame_buffer: FrameRingBuffer, poll_interval: float = 0.0005) -> None:
+        """
+        Like emit_data, but writes the frames into the slots of a ring buffer and closes it at the end. Waits while
+        all slots are in use. On an error (e.g. a frame rejected by FrameRingBuffer.write) the buffer is closed as
+        failed, so the consumer stops too, and the error is raised.
 
-            # Find the next trajectory index that is after the current time
-            for index in range(curr_traj_index, len(timestamps_traj)):
-                if timestamps_traj[index] > curr_time:
-                    break
+        Parameters:
+            frame_buffer (FrameRingBuffer): The buffer that is read by the controller.
+            poll_interval (float): Seconds to wait for a free slot.
+        """
+        failed = True
+        try:
+            for data in self.paced_frames():
+                while not frame_buffer.write(data[0], data[1], data[2:]):
+                    time.sleep(poll_interval)
+            failed = False
+        finally:
+            frame_buffer.close(failed)
+
+    def paced_frames(self) -> Iterator[list]:
+        """ Yields the frames like frames, but stamps their emission and waits between them like emit_data. """
+        for data in self.frames():
+            if self.instrumentation is not None:
+                self.instrumentation.stamp_emitted(data[0])
+            yield data
 
-                curr_traj_index = index + 1
-                same_data = False
+            # wait for certain amount of milliseconds to simulate real time
+            time.sleep(self.TIME_STEP * self.SPEED / 1000)
+
+    def frames(self) -> Iterator[list]:
+        """
+        Yields the data of every frame that emit_data puts in the queue, without queue and without waiting.
+        Actions are given as indices into action_timeline.
+        """
+        # data to be used
+        timestamps_traj = np.asarray(self.df_trajectories['time'])
+        timestamps_action = self.action_timeline.time.tolist() if self.USE_DB else []
+        curr_action_index = -1
+        next_action_index = -1
 
-            if same_data:
-                continue
+        # rows of the trajectory that are emitted at each time step
+        rows = frame_schedule(timestamps_traj, self.START_TIME, self.END_TIME, self.TIME_STEP)
 
-            row = self.df_trajectories.iloc[curr_traj_index - 1]
-            data.append(int(row['time']))
+        # coordinates of the emitted rows as one contiguous array, the noise of all frames is drawn at once
+        # (the same values as drawing 3 values per frame)
+        times = timestamps_traj[rows].tolist()
+        points = np.column_stack([np.asarray(self.df_trajectories[axis], dtype=np.float64)[rows]
+                                  for axis in ('x', 'y', 'z')])
+        points += add_noise(std_dev=self.NOISE_SD, size=points.size).reshape(points.shape)
 
-            coordinates = np.array([float(row['x']), float(row['y']), float(row['z'])]) + add_noise(
-                std_dev=self.NOISE_SD, size=3)
-            data.append(coordinates)
+        for timestamp, coordinates in zip(times, points):
+            data = [int(timestamp), coordinates]
 
             # Check list of actions without skipping rows
             if self.USE_DB and (next_action_index == -1 or timestamps_action[curr_action_index] <= data[0]):
@@ -89,27 +124,42 @@ class DataEmitter:
 
                     if timestamps_action[index] > data[0]:
                         if next_action_index <= curr_action_index:
-                            relevant_action_type = 'pick' if self.IS_ASSEMBLY else 'place'
-
-                            # find next action of tracked hand to get goals
-                            for index2 in range(curr_action_index + 1, len(timestamps_action)):
-                                hand = self.df_actions['hand'][index2]
-                                action_type = self.df_actions['action_id'][index2].split("_")[0]
-                                if hand == self.TRACKED_HAND and action_type == relevant_action_type:
-                                    data.append(self.df_actions.iloc[index2])
-                                    next_action_index = index2
-                                    break
+                            # next action of tracked hand to get goals
+                            index2 = int(self.action_timeline.next_relevant[curr_action_index + 1])
+                            if index2 != -1:
+                                data.append(index2)
+                                next_action_index = index2
                         break
 
-                    data.append(self.df_actions.iloc[index])
+                    data.append(index)
                     curr_action_index = index
 
-            self.data_queue.put(data)  # save in queue
+            yield data
 
-            # wait for certain amount of milliseconds to simulate real time
-            time.sleep(time_step * speed / 1000)
 
-        self.data_queue.put(-1)
+def frame_schedule(timestamps: np.ndarray, start_time: float, end_time: float, time_step: float) -> np.ndarray:
+    """
+    Calculates which rows of a recording are emitted when the time advances from start_time in steps of time_step.
+    At each step the last row with a timestamp up to the current time is emitted, unless it was already emitted.
+
+    Parameters:
+        timestamps (numpy.ndarray): Timestamps of the recorded rows.
+        start_time (float): Start time.
+        end_time (float): End time (exclusive).
+        time_step (float): Time step.
+
+    Returns:
+        numpy.ndarray: The indices of the emitted rows in emission order.
+    """
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=int)
+
+    steps = np.arange(start_time + time_step, end_time, time_step)
+
+    # rows are consumed in order, a row with an earlier timestamp is never emitted after a later one
+    consumed = np.searchsorted(np.maximum.accumulate(timestamps), steps, side='right')
+    emitted = np.diff(consumed, prepend=0) > 0
+    return consumed[emitted] - 1
 
 
 def add_noise(mean: float = 0.0, std_dev: float = 0.0, size: int = 1) -> float:
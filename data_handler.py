@@ -2,7 +2,8 @@ from dataclasses import dataclass, asdict
 from typing import Literal
 import numpy as np
 
-from goal import Goal
+from goal import Goal, goal_arrays_to_dict
+from goal_store import GoalStore
 
 
 # NOTE: This FILE been added after Tests.
@@ -33,7 +34,7 @@ class DataHandler:
     """ A class that handles data during runtime.
 
         Attributes:
-        all_goals (list[Goal]): A list of all goals.
+        goal_store (GoalStore): All goals with their state. Removed and possible goals are tracked as masks.
         use_database (bool): Indicates whether database (action) is being used.
         timestamp (int): The current timestamp of measurement.
         calculated (bool): A flag indicating if the prediction model has been calculated.
@@ -41,13 +42,14 @@ class DataHandler:
         prev_p (np.ndarray): The previous hand wrist position in the prediction model.
         curr_dp (np.ndarray): The current derivative (direction) of hand wrist position in the prediction model.
         prev_dp (np.ndarray): The previous derivative (direction) of hand wrist position in the prediction mode
-        possible_goals (list[Goal]): A copy of all_goals, used for filtering and possible future goals.
+        candidate_rows (np.ndarray): Rows of the goals evaluated by the prediction model when goals are culled.
+            None if all goals of get_goal_rows are evaluated.
         actions (list): A list of actions at a timestamp.
         future_action (Any): The future action for look ahead.
     """
 
-    def __init__(self, goals_all: list[Goal], use_database: bool = False):
-        self.all_goals = goals_all
+    def __init__(self, goal_store: GoalStore, use_database: bool = False):
+        self.goal_store = goal_store
         self.use_database = use_database
 
         self.timestamp = None
@@ -58,9 +60,9 @@ class DataHandler:
         self.prev_p = None
         self.prev_dp = None
         self.curr_dp = None
+        self.candidate_rows = None
 
         # action handler:
-        self.possible_goals = goals_all.copy()
         self.actions = []
         self.future_action = None
 
@@ -84,11 +86,19 @@ class DataHandler:
     def set_future_tracked_target(self, action: ActionData) -> None:
         self.future_action = asdict(action)
 
+    def get_goal_rows(self) -> np.ndarray:
+        """ Returns the rows of the possible goals when database (action) is used. Rows of all goals otherwise. """
+        return self.goal_store.get_rows(self.use_database)
+
+    def get_evaluated_rows(self) -> np.ndarray:
+        """ Returns the rows of the goals that are evaluated by the prediction model and the probability evaluator. """
+        if self.candidate_rows is not None:
+            return self.candidate_rows
+        return self.get_goal_rows()
+
     def get_goals(self) -> list[Goal]:
-        if self.use_database:
-            return self.possible_goals
-        else:
-            return self.all_goals
+        """ Returns the goals of get_goal_rows as Goal objects. """
+        return self.goal_store.goals(self.get_goal_rows())
 
     def get_result(self) -> dict:
         """ Packages all results in python standard objects.
@@ -106,26 +116,106 @@ class DataHandler:
             - 'future_action' (dict): Future action with its attributes.
          """
 
-        goals_dict = Goal.goals_list_to_dict(self.get_goals())
-        timestamp = self.timestamp
-        hand_position = self.curr_p.tolist()
-
-        num_prob_pairs = [(num, goal_data["probability"]) for num, goal_data in goals_dict.items()]
-        uncat_prob = calculate_uncategorized_probability(goals_dict)
-        top_3 = calculate_top3(goals_dict, uncat_prob)
-        over_60 = calculate_over_60(top_3)
-
-        return {
-            "goals": goals_dict,
-            "time": timestamp,
-            "hand_position": hand_position,
-            "num_prob_pairs": num_prob_pairs,
-            "uncat_prob": uncat_prob,
-            "top_3": top_3,
-            "over_60_and_distance": over_60,
-            "actions": self.actions,
-            "future_action": self.future_action
-        }
+        return self.get_compact_result().to_dict()
+
+    def get_compact_result(self) -> 'FrameResult':
+        """ Packages the results as arrays. The dict of get_result is only built on request with to_dict. """
+        rows = self.get_goal_rows()
+        store = self.goal_store
+        return FrameResult(self.timestamp, np.array(self.curr_p, dtype=float), store.num[rows], store.pos[rows],
+                           store.prob[rows], store.dist[rows], store.sq[rows], self.actions, self.future_action)
+
+
+@dataclass
+class FrameResult:
+    """ Dataclass for the result of a measurement with G goals stored as arrays.
+    time: Timestamp of measurement.
+    hand_position: Stabilized hand wrist position (3,).
+    goal_ids: IDs of the goals (G,).
+    positions: Positions of the goals (G, 3).
+    probability: Probabilities of the goals between 0 and 1 (G,).
+    distance: Distances from the hand wrist to the goals in meters (G,).
+    sample_quantity: Sample quantities of the goals (G,).
+    actions: All actions for this timestamp with its attributes.
+    future_action: Future action with its attributes.
+    """
+    time: int
+    hand_position: np.ndarray
+    goal_ids: np.ndarray
+    positions: np.ndarray
+    probability: np.ndarray
+    distance: np.ndarray
+    sample_quantity: np.ndarray
+    actions: list
+    future_action: dict
+
+    def probability_percent(self) -> np.ndarray:
+        """ Probabilities in percent, rounded like in the result dict. """
+        return np.round(self.probability * 100, 2)
+
+    def uncat_prob(self) -> float:
+        """ Probability of uncategorized goal (no goal) like calculate_uncategorized_probability. """
+        probabilities = self.probability_percent()
+
+        # cumulative sum adds in the same order as the sum over the result dict
+        total = np.cumsum(probabilities)[-1] if len(probabilities) > 0 else 0.0
+        return max(0, round(100 - total, 2))
+
+    def top_k(self, k: int = 3) -> list[tuple[str, float, float]]:
+        """
+        Calculates the k highest probabilities like calculate_top3 with a partial selection instead of a full sort.
+         return (list[tuple[str, float, float]]): Between 0 and k elements with id, probability and distance (in m).
+        """
+        probabilities = self.probability_percent()
+        uncat_prob = self.uncat_prob()
+
+        candidates = np.flatnonzero(probabilities > 0.0)
+        if len(candidates) > k:
+            # keep all candidates that tie with the k-th highest probability to select them in order of the goals
+            kth = np.partition(probabilities[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[probabilities[candidates] >= kth]
+        candidates = candidates[np.argsort(-probabilities[candidates], kind='stable')]
+
+        top = [(str(goal_id), prob, dist) for goal_id, prob, dist in
+               zip(self.goal_ids[candidates].tolist(), probabilities[candidates].tolist(),
+                   np.round(self.distance[candidates], 2).tolist())]
+
+        # uncategorized goal comes after goals with the same probability
+        if uncat_prob > 0.0:
+            position = sum(1 for _, prob, _ in top if prob >= uncat_prob)
+            top.insert(position, ("U", uncat_prob, 0))
+
+        return top[:k]
+
+    def over_60(self) -> tuple[str, float, float] | None:
+        """ Returns a goal when reached over 60% probability with id, probability and distance."""
+        return calculate_over_60(self.top_k(1))
+
+    def to_dict(self) -> dict:
+        """ Converts the result into the format of DataHandler.get_result. """
+        goals_dict = goal_arrays_to_dict(self.goal_ids, self.positions, self.probability, self.distance,
+                                         self.sample_quantity)
+        return package_result(goals_dict, self.time, self.hand_position.tolist(), self.actions, self.future_action)
+
+
+def package_result(goals_dict: dict, timestamp: int, hand_position: list, actions: list, future_action: dict) -> dict:
+    """ Packages the goals of a measurement with their derived values into the result format of get_result. """
+    num_prob_pairs = [(num, goal_data["probability"]) for num, goal_data in goals_dict.items()]
+    uncat_prob = calculate_uncategorized_probability(goals_dict)
+    top_3 = calculate_top3(goals_dict, uncat_prob)
+    over_60 = calculate_over_60(top_3)
+
+    return {
+        "goals": goals_dict,
+        "time": timestamp,
+        "hand_position": hand_position,
+        "num_prob_pairs": num_prob_pairs,
+        "uncat_prob": uncat_prob,
+        "top_3": top_3,
+        "over_60_and_distance": over_60,
+        "actions": actions,
+        "future_action": future_action
+    }
 
 
 def calculate_uncategorized_probability(goals: dict) -> float:
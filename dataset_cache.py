@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from typing import Optional, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# default folder of the cached datasets
+CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', '.cache')
+
+
+def read_csv(path: str, cache_folder: Optional[str] = CACHE_FOLDER) -> 'pd.DataFrame':
+    """
+    Reads a CSV file like pandas.read_csv. On first use the parsed columns are saved as binary .npy files in the
+    cache folder, later calls load the columns memory-mapped without parsing the text again. Worker processes that
+    read the same file share the pages of the cached columns.
+
+    Parameters:
+        path (str): The file path of the CSV file.
+        cache_folder (str): The folder of the cached datasets. None disables the cache.
+
+    Returns:
+        pandas.DataFrame: The content of the CSV file.
+    """
+    import pandas as pd
+
+    if cache_folder is None:
+        return pd.read_csv(path)
+
+    folder = cache_path(path, cache_folder)
+    if not os.path.isdir(folder):
+        df = pd.read_csv(path)
+        write_cache(df, folder)
+        return df
+
+    return load_cache(folder)
+
+
+def read_columns(path: str, cache_folder: Optional[str] = CACHE_FOLDER) -> dict[str, np.ndarray]:
+    """
+    Reads a numeric CSV file (e.g. goals or trajectories) as one array per column without pandas, for processes that
+    have to start fast. The numbers are rounded correctly like pandas.read_csv with float_precision='round_trip', so
+    they can differ from read_csv in the last digit. They are cached separately from read_csv.
+
+    Parameters:
+        path (str): The file path of the CSV file.
+        cache_folder (str): The folder of the cached datasets. None disables the cache.
+
+    Returns:
+        dict[str, numpy.ndarray]: The columns with the types of pandas.read_csv.
+    """
+    if cache_folder is None:
+        return parse_columns(path)
+
+    folder = cache_path(path, cache_folder) + '_columns'
+    if not os.path.isdir(folder):
+        columns = parse_columns(path)
+        write_columns({name: (values, str(values.dtype), None) for name, values in columns.items()}, folder)
+        return columns
+
+    return load_columns(folder)
+
+
+def parse_columns(path: str) -> dict[str, np.ndarray]:
+    """
+    Parses a numeric CSV file with header. Columns of integers become int64, other columns float64 with NaN for empty
+    fields, like pandas.read_csv.
+    """
+    with open(path) as file:
+        names = file.readline().strip().split(',')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # file without rows
+        text = np.loadtxt(path, delimiter=',', skiprows=1, dtype=str, comments=None, ndmin=2).reshape(-1, len(names))
+
+    columns = {}
+    for name, values in zip(names, text.T):
+        missing = values == ''
+        try:
+            if missing.any():
+                raise ValueError('integer column with missing values')
+            columns[name] = values.astype(np.int64)
+        except ValueError:
+            try:
+                columns[name] = np.where(missing, 'nan', values).astype(np.float64)
+            except ValueError:
+                raise ValueError(f"column {name} of {path} is not numeric, use read_csv.") from None
+    return columns
+
+
+def cache_path(path: str, cache_folder: str) -> str:
+    """ Returns the folder of the cached columns of a file. The key changes when the file is modified. """
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}'
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_folder, f'{name}_{hashlib.sha1(key.encode()).hexdigest()[:16]}')
+
+
+def write_cache(df: 'pd.DataFrame', folder: str) -> None:
+    """
+    Saves every column of a DataFrame as .npy file. Text columns are saved as fixed width strings with a mask of
+    missing values. The folder is written at once, so processes that read the same file at the same time never see
+    an incomplete cache.
+    """
+    columns = {}
+    for name, column in df.items():
+        values = column.to_numpy()
+        missing = None
+
+        if values.dtype.kind == 'O':
+            missing = column.isna().to_numpy()
+            if not all(isinstance(value, str) for value in values[~missing]):
+                # only text columns can be saved without pickle
+                return
+            values = np.array(['' if is_missing else value for value, is_missing in zip(values, missing)], dtype=str)
+
+        columns[name] = (values, str(column.dtype), missing)
+
+    write_columns(columns, folder)
+
+
+def write_columns(columns: dict[str, tuple[np.ndarray, str, Optional[np.ndarray]]], folder: str) -> None:
+    """
+    Saves columns as .npy files into the cache folder of a file, see write_cache.
+
+    Parameters:
+        columns (dict): Values, pandas type and mask of missing values (None for numeric columns) of each column.
+        folder (str): The cache folder of the file, see cache_path.
+    """
+    parent = os.path.dirname(folder)
+    os.makedirs(parent, exist_ok=True)
+    temp_folder = tempfile.mkdtemp(dir=parent)
+
+    entries = []
+    for i, (name, (values, dtype, missing)) in enumerate(columns.items()):
+        entry = {'name': name, 'dtype': dtype, 'file': f'{i}.npy'}
+        if missing is not None:
+            np.save(os.path.join(temp_folder, f'{i}_missing.npy'), missing)
+            entry['missing'] = f'{i}_missing.npy'
+
+        np.save(os.path.join(temp_folder, entry['file']), values)
+        entries.append(entry)
+
+    with open(os.path.join(temp_folder, 'columns.json'), 'w') as file:
+        json.dump(entries, file)
+
+    try:
+        os.rename(temp_folder, folder)
+    except OSError:
+        # cached by another process in the meantime
+        shutil.rmtree(temp_folder)
+
+
+def load_columns(folder: str) -> dict[str, np.ndarray]:
+    """ Loads the cached columns memory-mapped. Text columns are returned as object arrays with NaN where missing. """
+    return _load_columns(folder)[0]
+
+
+def load_cache(folder: str) -> 'pd.DataFrame':
+    """ Loads a cached DataFrame with the column types of pandas.read_csv. """
+    import pandas as pd
+
+    data, text_dtypes = _load_columns(folder)
+    df = pd.DataFrame(data, copy=False)
+    return df.astype(text_dtypes) if text_dtypes else df
+
+
+def _load_columns(folder: str) -> tuple[dict[str, np.ndarray], dict[str, str]]:
+    """ Loads the cached columns and the pandas types of the text columns. """
+    with open(os.path.join(folder, 'columns.json')) as file:
+        columns = json.load(file)
+
+    data, text_dtypes = {}, {}
+    for entry in columns:
+        values = np.asarray(np.load(os.path.join(folder, entry['file']), mmap_mode='r'))
+        if 'missing' in entry:
+            values = values.astype(object)
+            values[np.load(os.path.join(folder, entry['missing']))] = np.nan
+            text_dtypes[entry['name']] = entry['dtype']
+        data[entry['name']] = values
+    return data, text_dtypes
@@ -0,0 +1,322 @@
+"""
+Ring buffers of preallocated slots: frames from the data emitter (producer) to the controller (consumer) and results
+from the controller back (see process_pipeline.py).
+
+Every slot holds the timestamp, the hand wrist position and the action indices of one frame in typed arrays. Frames
+are validated once when they are written, the consumer reads batches of consecutive slots as views without copying
+and without checking the types again. The counters of written and read slots only grow: the producer is the only
+writer of the written counter and the consumer the only writer of the read counter, so no lock is needed.
+
+All arrays are placed in one buffer (header with the counters, then one array per column), so the same layout works
+in a bytearray and in shared memory.
+"""
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+import numpy as np
+
+from data_handler import FrameResult
+from goal_store import PRECISIONS
+
+MAX_ACTIONS = 16  # action indices per frame, the study data has at most 5
+
+# header of int64 counters, padded to a cache line
+HEADER_SIZE = 64
+WRITTEN, READ, CLOSED, FAILED = 0, 1, 2, 3
+
+
+def buffer_size(capacity: int, max_actions: int = MAX_ACTIONS) -> int:
+    """ Returns the bytes of a FrameRingBuffer with capacity slots. """
+    return HEADER_SIZE + capacity * 8 * (1 + 3 + 1 + max_actions)
+
+
+def result_buffer_size(capacity: int, goal_count: int) -> int:
+    """ Returns the bytes of a ResultRingBuffer with capacity slots (at most, the floats can be float32). """
+    return HEADER_SIZE + capacity * 8 * (1 + 3 + 1 + goal_count * (1 + 3 + 1 + 1 + 1))
+
+
+class RingBuffer:
+    """
+    Base class of the ring buffers: a fixed number of slots with the columns in one buffer after a header with the
+    counters. The counters of written and read slots only grow, the producer is the only writer of the written
+    counter and the consumer the only writer of the read counter.
+
+    Attributes:
+        capacity (int): Number of slots.
+        counters (numpy.ndarray): Written slots, read slots, the closed flag and the failed flag (int64).
+    """
+
+    def __init__(self, capacity: int, size: int, buffer=None) -> None:
+        """
+        Parameters:
+            capacity (int): Number of slots.
+            size (int): Bytes of the buffer.
+            buffer: Writable buffer of at least size bytes, e.g. the buf of a
+                multiprocessing.shared_memory.SharedMemory. None allocates a new buffer with the counters at 0.
+        """
+        if buffer is None:
+            buffer = bytearray(size)
+        elif memoryview(buffer).nbytes < size:
+            raise ValueError(f"buffer must have at least {size} bytes.")
+
+        self.capacity = capacity
+        self.buffer = buffer
+        self.counters = np.ndarray((HEADER_SIZE // 8,), dtype=np.int64, buffer=buffer)
+        self.offset = HEADER_SIZE
+
+    def add_column(self, shape: tuple, dtype) -> np.ndarray:
+        """ Places the next column (capacity, *shape) in the buffer. """
+        column = np.ndarray((self.capacity, *shape), dtype=dtype, buffer=self.buffer, offset=self.offset)
+        self.offset += column.nbytes
+        return column
+
+    @property
+    def closed(self) -> bool:
+        """ True when the producer has written its last slot. """
+        return bool(self.counters[CLOSED])
+
+    @property
+    def failed(self) -> bool:
+        """ True when the producer has stopped because of an error. """
+        return bool(self.counters[FAILED])
+
+    def close(self, failed: bool = False) -> None:
+        """ Marks the end of the slots. failed=True if the producer stopped because of an error. """
+        if failed:
+            self.counters[FAILED] = 1
+        self.counters[CLOSED] = 1
+
+    def __len__(self) -> int:
+        """ Number of written slots that have not been released by the consumer. """
+        return int(self.counters[WRITTEN] - self.counters[READ])
+
+    def free_slot(self) -> Optional[int]:
+        """ Returns the next slot for the producer. None if all slots are in use. """
+        written = int(self.counters[WRITTEN])
+        if written - int(self.counters[READ]) >= self.capacity:
+            return None
+        return written % self.capacity
+
+    def publish(self, count: int = 1) -> None:
+        """ Hands the next count slots over to the consumer, after their data has been written. """
+        self.counters[WRITTEN] += count
+
+    def readable(self, max_count: Optional[int] = None) -> tuple[int, int]:
+        """ Returns the first slot and the number of consecutive written slots, at most up to the end of the ring. """
+        read = int(self.counters[READ])
+        slot = read % self.capacity
+        count = min(int(self.counters[WRITTEN]) - read, self.capacity - slot)
+        if max_count is not None:
+            count = min(count, max_count)
+        return slot, count
+
+    def release(self, count: int) -> None:
+        """ Frees the next count slots for the producer. """
+        self.counters[READ] += count
+
+
+@dataclass
+class FrameView:
+    """ Dataclass for consecutive frames of a FrameRingBuffer (views of the slots, valid until they are released).
+    time: Timestamps (N,).
+    position: Hand wrist positions (N, 3).
+    action_count: Number of actions of each frame (N,).
+    actions: Action indices (N, max_actions), only the first action_count entries of a row are used.
+    """
+    time: np.ndarray
+    position: np.ndarray
+    action_count: np.ndarray
+    actions: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+class FrameRingBuffer(RingBuffer):
+    """
+    A fixed number of frame slots that are reused in a ring. One producer writes frames, one consumer reads them.
+
+    Attributes:
+        max_actions (int): Maximum number of actions of a frame.
+        time, position, action_count, actions (numpy.ndarray): The columns of the slots, see FrameView.
+    """
+
+    def __init__(self, capacity: int = 1024, max_actions: int = MAX_ACTIONS, buffer=None) -> None:
+        """
+        Parameters:
+            capacity (int): Number of slots.
+            max_actions (int): Maximum number of actions of a frame.
+            buffer: Writable buffer of at least buffer_size(capacity, max_actions) bytes, see RingBuffer.
+        """
+        if capacity < 1 or max_actions < 0:
+            raise ValueError("capacity must be greater than 0 and max_actions must not be negative.")
+
+        super().__init__(capacity, buffer_size(capacity, max_actions), buffer)
+        self.max_actions = max_actions
+        self.time = self.add_column((), np.int64)
+        self.position = self.add_column((3,), np.float64)
+        self.action_count = self.add_column((), np.int64)
+        self.actions = self.add_column((max_actions,), np.int64)
+
+    def write(self, timestamp: int, position: np.ndarray, actions: Sequence[int] = ()) -> bool:
+        """
+        Validates a frame and writes it into the next free slot.
+
+        Parameters:
+            timestamp (int): Timestamp of the measurement.
+            position (numpy.ndarray): Hand wrist position as a NumPy array of 3 floats.
+            actions (Sequence[int]): Indices of the actions of the frame (see ActionTimeline).
+
+        Return:
+            bool: True if the frame has been written. False if all slots are in use (nothing is written).
+        """
+        if isinstance(timestamp, bool) or not isinstance(timestamp, (int, np.integer)):
+            raise ValueError("timestamp must be an integer.")
+        if (not isinstance(position, np.ndarray) or not np.issubdtype(position.dtype, np.floating) or
+                position.shape != (3,)):
+            raise ValueError("position must be a numpy array of 3 floats.")
+        if len(actions) > self.max_actions:
+            raise ValueError(f"a frame has more than max_actions={self.max_actions} actions.")
+        for action in actions:
+            if isinstance(action, bool) or not isinstance(action, (int, np.integer)) or action < 0:
+                raise ValueError("actions must be indices (integers >= 0).")
+
+        slot = self.free_slot()
+        if slot is None:
+            return False
+
+        self.time[slot] = timestamp
+        self.position[slot] = position
+        self.action_count[slot] = len(actions)
+        self.actions[slot, :len(actions)] = actions
+        self.publish()
+        return True
+
+    def write_batch(self, timestamps: np.ndarray, positions: np.ndarray) -> int:
+        """
+        Validates frames without actions and writes as many as there are free slots.
+
+        Parameters:
+            timestamps (numpy.ndarray): Integer timestamps (N,).
+            positions (numpy.ndarray): Float hand wrist positions (N, 3).
+
+        Return:
+            int: Number of written frames (the first ones of the batch).
+        """
+        if not np.issubdtype(timestamps.dtype, np.integer):
+            raise ValueError("timestamps must be integers.")
+        if not np.issubdtype(positions.dtype, np.floating) or positions.shape != (len(timestamps), 3):
+            raise ValueError("positions must be an array of floats with the shape (N, 3).")
+
+        written = int(self.counters[WRITTEN])
+        count = min(len(timestamps), self.capacity - len(self))
+        done = 0
+        while done < count:  # at most two parts when the batch wraps around the end of the ring
+            slot = (written + done) % self.capacity
+            size = min(count - done, self.capacity - slot)
+            self.time[slot:slot + size] = timestamps[done:done + size]
+            self.position[slot:slot + size] = positions[done:done + size]
+            self.action_count[slot:slot + size] = 0
+            done += size
+
+        self.publish(count)
+        return count
+
+    def read(self, max_frames: Optional[int] = None) -> FrameView:
+        """
+        Returns the next unread frames as views of the slots, at most up to the end of the ring. The frames stay in
+        use until they are released.
+        """
+        slot, count = self.readable(max_frames)
+        end = slot + count
+        return FrameView(self.time[slot:end], self.position[slot:end], self.action_count[slot:end],
+                         self.actions[slot:end])
+
+    def batches(self, max_frames: int = 256, poll_interval: float = 0.0005) -> Iterator[FrameView]:
+        """
+        Yields views of the frames until the buffer is closed and empty. A view is released when the next view is
+        requested, so it must be processed (or copied) before. Raises RuntimeError after the last frame if the
+        producer has failed.
+
+        Parameters:
+            max_frames (int): Maximum number of frames in a view.
+            poll_interval (float): Seconds to wait when no frame is available.
+        """
+        while True:
+            closed = self.closed  # frames written before closing are read below
+            view = self.read(max_frames)
+            if len(view):
+                yield view
+                self.release(len(view))
+            elif closed:
+                if self.failed:
+                    raise RuntimeError("the producer of the frames has failed.")
+                return
+            else:
+                time.sleep(poll_interval)
+
+
+class ResultRingBuffer(RingBuffer):
+    """
+    A fixed number of slots for the FrameResults of a controller without database (actions are not transported).
+
+    Attributes:
+        goal_count (int): Maximum number of goals of a result.
+        time, hand_position, count, goal_ids, positions, probability, distance, sample_quantity (numpy.ndarray): The
+            columns of the slots, count is the number of goals of a result. See FrameResult for the others.
+    """
+
+    def __init__(self, capacity: int = 256, goal_count: int = 1, precision: str = 'float64', buffer=None) -> None:
+        """
+        Parameters:
+            capacity (int): Number of slots.
+            goal_count (int): Maximum number of goals of a result (all goals of the controller).
+            precision (str): PRECISION of the controller, the results are transported without conversion.
+            buffer: Writable buffer of at least result_buffer_size(capacity, goal_count) bytes, see RingBuffer.
+        """
+        if capacity < 1 or goal_count < 1:
+            raise ValueError("capacity and goal_count must be greater than 0.")
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {list(PRECISIONS)}.")
+
+        super().__init__(capacity, result_buffer_size(capacity, goal_count), buffer)
+        dtype = PRECISIONS[precision]
+        self.goal_count = goal_count
+        self.time = self.add_column((), np.int64)
+        self.hand_position = self.add_column((3,), np.float64)
+        self.count = self.add_column((), np.int64)
+        self.goal_ids = self.add_column((goal_count,), np.int64)
+        self.positions = self.add_column((goal_count, 3), dtype)
+        self.probability = self.add_column((goal_count,), dtype)
+        self.distance = self.add_column((goal_count,), dtype)
+        self.sample_quantity = self.add_column((goal_count,), np.int64)
+
+    def write(self, result: FrameResult) -> bool:
+        """ Writes a result into the next free slot. Returns False if all slots are in use (nothing is written). """
+        slot = self.free_slot()
+        if slot is None:
+            return False
+
+        count = len(result.goal_ids)
+        self.time[slot] = result.time
+        self.hand_position[slot] = result.hand_position
+        self.count[slot] = count
+        self.goal_ids[slot, :count] = result.goal_ids
+        self.positions[slot, :count] = result.positions
+        self.probability[slot, :count] = result.probability
+        self.distance[slot, :count] = result.distance
+        self.sample_quantity[slot, :count] = result.sample_quantity
+        self.publish()
+        return True
+
+    def take(self, max_results: Optional[int] = None) -> list[FrameResult]:
+        """ Copies the next written results into FrameResults and releases their slots. """
+        slot, count = self.readable(max_results)
+        results = []
+        for i, size in zip(range(slot, slot + count), self.count[slot:slot + count].tolist()):
+            results.append(FrameResult(int(self.time[i]), self.hand_position[i].copy(), self.goal_ids[i, :size].copy(),
+                                       self.positions[i, :size].copy(), self.probability[i, :size].copy(),
+                                       self.distance[i, :size].copy(), self.sample_quantity[i, :size].copy(), [],
+                                       None))
+        self.release(count)
+        return results
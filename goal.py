@@ -1,5 +1,8 @@
 import numpy as np
 
+MIN_PROBABILITY = 0.001  # lower boundary of 0.1% for the angle probability to reset the goal probability
+LOG_MIN_PROBABILITY = np.log(MIN_PROBABILITY)
+
 
 class Goal:
     """
@@ -67,13 +70,11 @@ class Goal:
             angle_probability (float): The probability of the last measured angle.
         """
 
-        min_probability = 0.001  # lower boundary of 0.1% for the angle probability to reset the goal probability
-
-        if angle_probability < min_probability or not self.hand_towards_goal:  # reset
+        if angle_probability < MIN_PROBABILITY or not self.hand_towards_goal:  # reset
             self.prob = 0.0
             self.sq = 0
 
-        elif self.prob < min_probability:  # begin
+        elif self.prob < MIN_PROBABILITY:  # begin
             self.prob = angle_probability
             self.sq = 1
 
@@ -104,6 +105,70 @@ class Goal:
         return combined_dict
 
 
+def goal_arrays_to_dict(numbers: np.ndarray,
+                        positions: np.ndarray,
+                        probabilities: np.ndarray,
+                        distances: np.ndarray,
+                        sample_quantities: np.ndarray
+                        ) -> dict:
+    """ Convert goals given as arrays into a dictionary in the same format as Goal.goals_list_to_dict. """
+    combined_dict = {}
+    probabilities = np.asarray(probabilities, dtype=np.float64)  # float32 results are rounded like float64 ones
+    distances = np.asarray(distances, dtype=np.float64)
+    for number, position, prob, dist, sq in zip(numbers.tolist(), positions.tolist(), probabilities, distances,
+                                                 sample_quantities.tolist()):
+        combined_dict[number] = {
+            "position": position,
+            "probability": round(prob * 100, 2),
+            "distance": round(dist, 2),
+            "sample_quantity": sq
+        }
+    return combined_dict
+
+
+def update_probability_batch(probabilities: np.ndarray,
+                             sample_quantities: np.ndarray,
+                             angle_probabilities: np.ndarray,
+                             hand_towards_goal: np.ndarray
+                             ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Updates probabilities and sample quantities of many goals with the same reset/begin/update rules as
+    Goal.update_probability.
+
+    Returns:
+        tuple: The updated probabilities and sample quantities as new arrays.
+    """
+    reset = (angle_probabilities < MIN_PROBABILITY) | ~hand_towards_goal
+    begin = ~reset & (probabilities < MIN_PROBABILITY)
+    update = ~reset & ~begin
+
+    new_probabilities = np.where(begin, angle_probabilities, np.where(update, probabilities * angle_probabilities, 0.0))
+    new_sample_quantities = np.where(begin, 1, np.where(update, sample_quantities + 1, 0))
+    return new_probabilities, new_sample_quantities
+
+
+def update_log_probability_batch(log_probabilities: np.ndarray,
+                                 sample_quantities: np.ndarray,
+                                 log_angle_probabilities: np.ndarray,
+                                 hand_towards_goal: np.ndarray
+                                 ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Updates the logarithms of the probabilities like update_probability_batch. The product of the angle probabilities
+    becomes a sum, a reset goal has the log probability -inf.
+
+    Returns:
+        tuple: The updated log probabilities and sample quantities as new arrays.
+    """
+    reset = (log_angle_probabilities < LOG_MIN_PROBABILITY) | ~hand_towards_goal
+    begin = ~reset & (log_probabilities < LOG_MIN_PROBABILITY)
+    update = ~reset & ~begin
+
+    new_log_probabilities = np.where(begin, log_angle_probabilities,
+                                     np.where(update, log_probabilities + log_angle_probabilities, -np.inf))
+    new_sample_quantities = np.where(begin, 1, np.where(update, sample_quantities + 1, 0))
+    return new_log_probabilities.astype(log_probabilities.dtype, copy=False), new_sample_quantities
+
+
 def calc_poly(matrix: np.ndarray, s: float) -> np.ndarray:
     """ Calculates the value of a polynomial at point s. """
     x = np.polyval(matrix[0], s)
@@ -120,3 +185,21 @@ def norm_vector(vector: np.ndarray, epsilon: float = 0.0001) -> np.ndarray:
         return vector
 
     return vector / length
+
+
+def calc_poly_batch(matrices: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """
+    Calculates the values of polynomials (..., 3, K) at points s (...) with Horner's method like numpy.polyval.
+    """
+    s = np.expand_dims(s, -1)
+    result = matrices[..., 0]
+    for k in range(1, matrices.shape[-1]):
+        result = result * s + matrices[..., k]
+
+    return result
+
+
+def norm_vectors(vectors: np.ndarray, epsilon: float = 0.0001) -> np.ndarray:
+    """ Norm vectors of shape (..., 3). Vectors shorter than epsilon are returned unchanged. """
+    length = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, length, out=vectors.copy(), where=length >= epsilon)
@@ -0,0 +1,182 @@
+from typing import Optional
+import numpy as np
+
+from goal import Goal, goal_arrays_to_dict
+
+# float types of the goal state by precision mode
+PRECISIONS = {'float64': np.float64, 'float32': np.float32}
+
+
+class GoalStore:
+    """
+    A class that stores all goals as contiguous arrays (one row per goal).
+
+    Goals are never deleted from the arrays. Removing a goal or reducing the goals to the possible targets only
+    changes the boolean masks, so the rows of a goal stay valid during runtime.
+
+    Attributes:
+        num (numpy.ndarray): The IDs of the goals (G,).
+        pos (numpy.ndarray): The coordinates of the goals (G, 3).
+        index (dict[int, int]): Maps the ID of a goal to its row.
+
+        dist (numpy.ndarray): The distances to the last measured hand wrist position (G,).
+        prev_dist (numpy.ndarray): The distances to the previous measured hand wrist position (G,).
+        mat (numpy.ndarray): The trajectories to the goals as matrices (G, 3, 4).
+        dmat (numpy.ndarray): The derivatives of the trajectory matrices (G, 3, 3).
+        ppt (numpy.ndarray): The predicted points on the trajectories (G, 3).
+        dppt (numpy.ndarray): The derivatives at the predicted points (G, 3).
+        angle (numpy.ndarray): The angles between the last measured direction and the predicted directions (G,).
+        hand_towards_goal (numpy.ndarray): True where the hand is moving towards the goal (G,).
+
+        prob (numpy.ndarray): The accumulated probabilities of samples (G,).
+        sq (numpy.ndarray): The sample quantities (G,).
+        log_prob (numpy.ndarray): The logarithms of the accumulated probabilities (G,). Only in log domain (float32
+            precision) where they replace prob as state, None otherwise.
+
+        active (numpy.ndarray): True for goals that have not been removed (G,).
+        possible (numpy.ndarray): True for active goals that are possible future goals (G,).
+        version (int): Incremented whenever a mask changes.
+        dtype (type): Float type of all float arrays, see PRECISIONS.
+    """
+
+    def __init__(self, numbers: np.ndarray, positions: np.ndarray, precision: str = 'float64') -> None:
+        """
+        Parameters:
+            numbers (numpy.ndarray): The IDs of the goals.
+            positions (numpy.ndarray): The coordinates of the goals as (G, 3) array.
+            precision (str): 'float64' (reference) or 'float32' with probabilities in log domain.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {list(PRECISIONS)}.")
+
+        self.dtype = PRECISIONS[precision]
+        self.num = np.asarray(numbers, dtype=int)
+        self.pos = np.asarray(positions, dtype=self.dtype).reshape(-1, 3)
+        assert len(self.num) == len(self.pos), 'every goal needs an ID and a position'
+
+        self.index = {number: row for row, number in enumerate(self.num.tolist())}
+        size = len(self.num)
+
+        # prediction model
+        self.dist = np.full(size, 10000.0, dtype=self.dtype)  # default to np.inf caused divide by zero error
+        self.prev_dist = np.full(size, 10000.0, dtype=self.dtype)
+        self.mat = np.zeros((size, 3, 4), dtype=self.dtype)
+        self.dmat = np.zeros((size, 3, 3), dtype=self.dtype)
+        self.ppt = np.zeros((size, 3), dtype=self.dtype)
+        self.dppt = np.zeros((size, 3), dtype=self.dtype)
+        self.angle = np.full(size, np.pi, dtype=self.dtype)
+        self.hand_towards_goal = np.zeros(size, dtype=bool)
+
+        # probability
+        self.prob = np.zeros(size, dtype=self.dtype)
+        self.sq = np.zeros(size, dtype=int)
+        self.log_prob = np.full(size, -np.inf, dtype=self.dtype) if self.dtype == np.float32 else None
+
+        # action handler
+        self.active = np.ones(size, dtype=bool)
+        self.possible = np.ones(size, dtype=bool)
+        self.version = 0
+
+        self._rows_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.num)
+
+    @classmethod
+    def from_goal_data(cls, goal_data: list[tuple[int, np.ndarray]], precision: str = 'float64') -> 'GoalStore':
+        """ Creates a store from a list of (ID, position) tuples. """
+        numbers = [number for number, _ in goal_data]
+        positions = [position for _, position in goal_data]
+        return cls(np.array(numbers, dtype=int), np.array(positions, dtype=float), precision)
+
+    @property
+    def log_domain(self) -> bool:
+        return self.log_prob is not None
+
+    def row(self, goal_id: int) -> Optional[int]:
+        """ Returns the row of a goal. None if the goal id is unknown. """
+        return self.index.get(goal_id)
+
+    def is_active(self, goal_id: int) -> bool:
+        row = self.index.get(goal_id)
+        return row is not None and bool(self.active[row])
+
+    def count_active(self) -> int:
+        return int(np.count_nonzero(self.active))
+
+    def count_possible(self) -> int:
+        return int(np.count_nonzero(self.possible))
+
+    def mask(self, only_possible: bool) -> np.ndarray:
+        """ Returns the mask of the possible goals when only_possible is True. Mask of the active goals otherwise. """
+        return self.possible if only_possible else self.active
+
+    def get_rows(self, only_possible: bool) -> np.ndarray:
+        """
+        Returns the rows of the active goals, or of the possible goals when only_possible is True, in ascending order.
+        The rows are cached until the next change of a mask.
+        """
+        key = (only_possible, self.version)
+        rows = self._rows_cache.get(key)
+        if rows is None:
+            rows = np.flatnonzero(self.mask(only_possible))
+            self._rows_cache = {key: rows}
+        return rows
+
+    def remove(self, goal_id: int) -> bool:
+        """
+        Deactivates a goal.
+
+        goal_id (int): Goal id to be removed.
+        return: True if it is successfully removed. False if the goal is unknown or was already removed.
+        """
+        row = self.index.get(goal_id)
+        if row is None or not self.active[row]:
+            return False
+
+        self.active[row] = False
+        self.possible[row] = False
+        self.version += 1
+        return True
+
+    def reset_probability(self, rows: np.ndarray) -> None:
+        """ Resets the probabilities and sample quantities of the given rows. """
+        self.prob[rows] = 0.0
+        self.sq[rows] = 0
+        if self.log_prob is not None:
+            self.log_prob[rows] = -np.inf
+
+    def reduce_possible(self, goal_ids: list[int]) -> None:
+        """ Reduces the possible goals to the active goals with the given ids. """
+        rows = [row for row in map(self.index.get, goal_ids) if row is not None]
+        self.possible[:] = False
+        self.possible[rows] = self.active[rows]
+        self.version += 1
+
+    def reset_possible(self) -> None:
+        """ Falls back to all active goals as possible goals. """
+        self.possible[:] = self.active
+        self.version += 1
+
+    def goal(self, row: int) -> Goal:
+        """ Returns a Goal object with the current values of a row. """
+        g = Goal(int(self.num[row]), self.pos[row])
+        g.dist = self.dist[row]
+        g.prev_dist = self.prev_dist[row]
+        g.mat = self.mat[row]
+        g.dmat = self.dmat[row]
+        g.ppt = self.ppt[row]
+        g.dppt = self.dppt[row]
+        g.angle = self.angle[row]
+        g.hand_towards_goal = self.hand_towards_goal[row]
+        g.prob = self.prob[row]
+        g.sq = int(self.sq[row])
+        return g
+
+    def goals(self, rows: np.ndarray) -> list[Goal]:
+        """ Returns Goal objects for the given rows. """
+        return [self.goal(row) for row in rows]
+
+    def to_dict(self, rows: np.ndarray) -> dict:
+        """ Converts the given rows into a dictionary in the same format as Goal.goals_list_to_dict. """
+        return goal_arrays_to_dict(self.num[rows], self.pos[rows], self.prob[rows], self.dist[rows], self.sq[rows])
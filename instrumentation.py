@@ -0,0 +1,100 @@
+import sys
+import time
+from typing import TextIO
+import numpy as np
+
+# stages of Controller.process_data in pipeline order
+STAGES = ('actions', 'noise_reducer', 'prediction_model', 'probability_evaluator', 'get_result')
+
+
+class RollingHistogram:
+    """ A class that keeps the last values (latencies in nanoseconds) in a ring buffer for percentiles. """
+
+    def __init__(self, size: int = 1024) -> None:
+        if size < 1:
+            raise ValueError("size must be greater than 0.")
+
+        self.values = np.zeros(size, dtype=np.int64)
+        self.count = 0  # all values, also the overwritten ones
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def summary(self) -> dict:
+        """ Percentiles of the values in the buffer and the maximum of all values in microseconds. """
+        values = self.values[:min(self.count, len(self.values))]
+        if len(values) == 0:
+            return {'count': 0, 'p50_us': 0.0, 'p95_us': 0.0, 'p99_us': 0.0, 'max_us': 0.0}
+
+        p50, p95, p99 = np.percentile(values, (50, 95, 99)) / 1000
+        return {'count': self.count, 'p50_us': round(float(p50), 1), 'p95_us': round(float(p95), 1),
+                'p99_us': round(float(p99), 1), 'max_us': round(self.max / 1000, 1)}
+
+
+class Instrumentation:
+    """
+    A class that measures the time of every stage of Controller.process_data and the latency of frames from the
+    emission by the DataEmitter to the result. The controller and the emitter only call it when it is given to
+    them, without instrumentation the pipeline runs unchanged.
+
+    Frames are identified by their timestamp. Histograms:
+        - one for each stage in STAGES,
+        - 'total': time of process_data,
+        - 'queue': time between emission and start of process_data,
+        - 'end_to_end': time between emission and result (only frames with a result).
+
+    Attributes:
+        histograms (dict[str, RollingHistogram]): Histograms by name.
+        emitted (dict[int, int]): Emission times of the frames that are not processed yet.
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        """
+        Parameters:
+            window (int): Number of latest values that are used for the percentiles.
+        """
+        self.histograms = {name: RollingHistogram(window) for name in STAGES + ('total', 'queue', 'end_to_end')}
+        self.emitted = {}
+        self._start = 0
+        self._last = 0
+
+    def stamp_emitted(self, timestamp: int) -> None:
+        """ Called by the emitter (producer thread) when a frame is emitted. """
+        self.emitted[timestamp] = time.perf_counter_ns()
+
+    def begin(self, timestamp: int) -> None:
+        """ Called at the beginning of process_data. """
+        self._start = self._last = time.perf_counter_ns()
+        emitted = self.emitted.get(timestamp)
+        if emitted is not None:
+            self.histograms['queue'].add(self._start - emitted)
+
+    def lap(self, stage: str) -> None:
+        """ Records the time since the last lap (or begin) for a stage. """
+        now = time.perf_counter_ns()
+        self.histograms[stage].add(now - self._last)
+        self._last = now
+
+    def end(self, timestamp: int, has_result: bool) -> None:
+        """ Called at the end of process_data. """
+        now = time.perf_counter_ns()
+        self.histograms['total'].add(now - self._start)
+
+        emitted = self.emitted.pop(timestamp, None)
+        if emitted is not None and has_result:
+            self.histograms['end_to_end'].add(now - emitted)
+
+    def summary(self) -> dict[str, dict]:
+        """ Returns the summary of every histogram with at least one value. """
+        return {name: histogram.summary() for name, histogram in self.histograms.items() if histogram.count > 0}
+
+    def dump(self, file: TextIO = sys.stdout) -> None:
+        """ Prints the summary as table, e.g. at shutdown. """
+        print(f"{'stage':<24}{'count':>8}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'max us':>10}", file=file)
+        for name, s in self.summary().items():
+            print(f"{name:<24}{s['count']:>8}{s['p50_us']:>10}{s['p95_us']:>10}{s['p99_us']:>10}{s['max_us']:>10}",
+                  file=file)
@@ -0,0 +1,189 @@
+"""
+Kernel backends for the goal update of a measurement.
+
+'numpy' runs the vectorized functions of PredictionModel and ProbabilityEvaluator (reference). 'numba' runs the whole
+goal update (trajectory, progression, angle, PDF, probability state machine, distance cost and normalization) in one
+loop over the goals that is compiled with Numba. Numba is optional: without it 'numba' falls back to 'numpy'. Numba
+is only imported when a kernel is compiled, so the 'numpy' backend does not pay for its import.
+"""
+import importlib.util
+import math
+from typing import Optional
+import numpy as np
+
+from goal import LOG_MIN_PROBABILITY, MIN_PROBABILITY
+
+BACKENDS = ('numpy', 'numba')
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def update_goals(rows: np.ndarray, positions: np.ndarray, hand: np.ndarray, min_progression: float,
+                 min_variance: float, max_variance: float, omega: float, log_domain: bool,
+                 dist: np.ndarray, prev_dist: np.ndarray, mat: np.ndarray, dmat: np.ndarray, ppt: np.ndarray,
+                 dppt: np.ndarray, angle: np.ndarray, towards: np.ndarray, state: np.ndarray, prob: np.ndarray,
+                 sq: np.ndarray) -> None:
+    """
+    Updates the goals in the rows in place like PredictionModel.update followed by ProbabilityEvaluator.update. Plain
+    Python that Numba compiles, so only scalar math and loops.
+
+    Parameters:
+        rows (numpy.ndarray): Rows of the evaluated goals.
+        positions (numpy.ndarray): Positions of all goals (G, 3).
+        hand (numpy.ndarray): prev_p, curr_p, prev_dp and curr_dp of the prediction model (4, 3).
+        min_progression, min_variance, max_variance, omega (float): See MODEL_PARAMS and PROBABILITY_PARAMS.
+        log_domain (bool): True if state holds log probabilities (float32 precision).
+        dist ... sq (numpy.ndarray): The arrays of the GoalStore. state is log_prob in log domain, prob otherwise.
+    """
+    count = len(rows)
+    prev_p, curr_p, prev_dp, curr_dp = hand[0], hand[1], hand[2], hand[3]
+    step = math.sqrt((curr_p[0] - prev_p[0]) ** 2 + (curr_p[1] - prev_p[1]) ** 2 + (curr_p[2] - prev_p[2]) ** 2)
+    direction = np.empty(3)
+
+    # prediction model
+    angle_sum = 0.0
+    for k in range(count):
+        r = rows[k]
+        goal = positions[r]
+
+        prev_dist[r] = dist[r]
+        distance = math.sqrt((curr_p[0] - goal[0]) ** 2 + (curr_p[1] - goal[1]) ** 2 + (curr_p[2] - goal[2]) ** 2)
+        dist[r] = distance
+
+        denominator = step + distance
+        s = step / denominator if denominator >= 1e-10 else 0.0
+        s = max(s, min_progression)
+
+        for i in range(3):
+            a0 = prev_p[i]
+            a1 = prev_dp[i]
+            a2 = 1.5 * goal[i] - 1.5 * prev_p[i] - 1.5 * prev_dp[i]
+            a3 = -0.5 * goal[i] + 0.5 * prev_p[i] + 0.5 * prev_dp[i]
+            mat[r, i, 0] = a3
+            mat[r, i, 1] = a2
+            mat[r, i, 2] = a1
+            mat[r, i, 3] = a0
+            dmat[r, i, 0] = 3 * a3
+            dmat[r, i, 1] = 2 * a2
+            dmat[r, i, 2] = a1
+            ppt[r, i] = ((a3 * s + a2) * s + a1) * s + a0
+            direction[i] = (3 * a3 * s + 2 * a2) * s + a1
+
+        length = math.sqrt(direction[0] ** 2 + direction[1] ** 2 + direction[2] ** 2)
+        for i in range(3):
+            dppt[r, i] = direction[i] / length if length >= 0.0001 else direction[i]
+
+        determinant = dppt[r, 0] * curr_dp[1] - dppt[r, 1] * curr_dp[0]
+        dot_product = dppt[r, 0] * curr_dp[0] + dppt[r, 1] * curr_dp[1]
+        angle[r] = abs(math.atan2(determinant, dot_product))
+        angle_sum += angle[r]
+
+        towards[r] = ((goal[0] - curr_p[0]) * curr_dp[0] + (goal[1] - curr_p[1]) * curr_dp[1] +
+                      (goal[2] - curr_p[2]) * curr_dp[2]) > 0
+
+    # standard deviation of the angles
+    mean = angle_sum / count
+    squares = 0.0
+    for k in range(count):
+        squares += (angle[rows[k]] - mean) ** 2
+    sd = min(max(math.sqrt(squares / count), math.sqrt(min_variance)), math.sqrt(max_variance))
+
+    # probability state machine and distance cost, see Goal.update_probability
+    total = 0.0
+    maximum = -math.inf
+    for k in range(count):
+        r = rows[k]
+        y = angle[r] / sd
+        if log_domain:
+            angle_probability = -y * y / 2 - math.log(SQRT_2PI * sd)
+            threshold = LOG_MIN_PROBABILITY
+        else:
+            angle_probability = math.exp(-y * y / 2.0) / SQRT_2PI / sd
+            threshold = MIN_PROBABILITY
+
+        if angle_probability < threshold or not towards[r]:
+            value = -math.inf if log_domain else 0.0
+            sq[r] = 0
+        elif state[r] < threshold:
+            value = angle_probability
+            sq[r] = 1
+        else:
+            value = state[r] + angle_probability if log_domain else state[r] * angle_probability
+            sq[r] = sq[r] + 1
+
+        if log_domain:
+            value -= math.log1p(omega * dist[r])
+            maximum = max(maximum, value)
+        else:
+            value /= 1 + omega * dist[r]
+            total += value
+        state[r] = value
+
+    # normalization when the sum of probabilities is greater than 1
+    if log_domain:
+        if maximum > -math.inf:
+            for k in range(count):
+                total += math.exp(state[rows[k]] - maximum)
+            divisor = max(maximum + math.log(total), 0.0)
+        else:
+            divisor = 0.0
+        for k in range(count):
+            r = rows[k]
+            state[r] -= divisor
+            prob[r] = math.exp(state[r])
+    else:
+        divisor = max(1.0, total)
+        for k in range(count):
+            state[rows[k]] /= divisor
+
+
+class GoalUpdateKernel:
+    """
+    A class that runs the goal update of a measurement in one call of update_goals. PredictionModel.update only hands
+    over the hand vectors (set_hand), ProbabilityEvaluator.update then updates prediction and probabilities together.
+
+    Attributes:
+        hand (numpy.ndarray): prev_p, curr_p, prev_dp and curr_dp of the last prediction (4, 3). None before.
+        min_progression (float): The minimum progression of the prediction model.
+    """
+
+    def __init__(self, jit: bool = True) -> None:
+        """
+        Parameters:
+            jit (bool): True to compile update_goals with Numba (required). False runs it as plain Python (slow, to
+                check the kernel without Numba).
+        """
+        if jit and not NUMBA_AVAILABLE:
+            raise ValueError("the kernel can only be compiled with numba installed.")
+
+        if jit:
+            import numba  # loads llvmlite, only for the 'numba' backend
+            self.update_goals = numba.njit(cache=True)(update_goals)
+        else:
+            self.update_goals = update_goals
+        self.hand = None
+        self.min_progression = 0.0
+
+    def set_hand(self, prev_p: np.ndarray, curr_p: np.ndarray, prev_dp: np.ndarray, curr_dp: np.ndarray,
+                 min_progression: float) -> None:
+        self.hand = np.array([prev_p, curr_p, prev_dp, curr_dp], dtype=float)
+        self.min_progression = min_progression
+
+    def update(self, store, rows: np.ndarray, min_variance: float, max_variance: float, omega: float) -> None:
+        """ Updates prediction and probabilities of the goals in the rows of the GoalStore. """
+        state = store.log_prob if store.log_domain else store.prob
+        self.update_goals(np.asarray(rows, dtype=np.int64), store.pos, self.hand, self.min_progression, min_variance,
+                          max_variance, omega, store.log_domain, store.dist, store.prev_dist, store.mat, store.dmat,
+                          store.ppt, store.dppt, store.angle, store.hand_towards_goal, state, store.prob, store.sq)
+
+
+def select_kernel(backend: str) -> Optional[GoalUpdateKernel]:
+    """
+    Returns the kernel of a backend, see BACKENDS. None for 'numpy' and for 'numba' without Numba installed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {list(BACKENDS)}.")
+    if backend == 'numba' and NUMBA_AVAILABLE:
+        return GoalUpdateKernel()
+    return None
@@ -0,0 +1,181 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Optional
+import numpy as np
+from numpy.lib import recfunctions
+
+from controller import Controller
+
+# one measurement of the hand tracker on the wire: timestamp and hand wrist position, little endian
+FRAME_DTYPE = np.dtype([('time', '<i8'), ('x', '<f8'), ('y', '<f8'), ('z', '<f8')])
+
+
+def encode_frames(timestamps: np.ndarray, points: np.ndarray) -> bytes:
+    """
+    Packs measurements into the binary format of the live ingest.
+
+    Parameters:
+        timestamps (numpy.ndarray): Timestamps of the measurements (N,).
+        points (numpy.ndarray): Hand wrist positions (N, 3).
+
+    Returns:
+        bytes: N records of FRAME_DTYPE.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    frames = np.empty(len(points), dtype=FRAME_DTYPE)
+    frames['time'] = timestamps
+    frames['x'], frames['y'], frames['z'] = points.T
+    return frames.tobytes()
+
+
+def decode_frames(buffer: bytes) -> np.ndarray:
+    """ Decodes all complete records of a buffer at once. Incomplete bytes at the end are ignored. """
+    count = len(buffer) // FRAME_DTYPE.itemsize
+    return np.frombuffer(buffer, dtype=FRAME_DTYPE, count=count)
+
+
+class StreamSource:
+    """
+    A source of measurements from a byte stream like a TCP connection or a pipe. The stream is only read when the
+    consumer asks for the next batch, so a slow consumer slows down the sender (flow control of the stream).
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, batch_size: int = 256) -> None:
+        """
+        Parameters:
+            reader (asyncio.StreamReader): The stream with the records of FRAME_DTYPE.
+            batch_size (int): Maximum number of measurements in a batch.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be greater than 0.")
+
+        self.reader = reader
+        self.batch_size = batch_size
+
+    async def __aiter__(self) -> AsyncIterator[np.ndarray]:
+        """ Yields batches of measurements as arrays of FRAME_DTYPE until the stream ends. """
+        itemsize = FRAME_DTYPE.itemsize
+        rest = b''
+        while True:
+            chunk = await self.reader.read(self.batch_size * itemsize - len(rest))
+            if not chunk:
+                return
+
+            buffer = rest + chunk
+            complete = len(buffer) - len(buffer) % itemsize
+            rest = buffer[complete:]
+            if complete:
+                yield decode_frames(buffer[:complete])
+
+
+class DatagramSource(asyncio.DatagramProtocol):
+    """
+    A source of measurements from UDP datagrams. Every datagram contains one or more records of FRAME_DTYPE, an
+    empty datagram ends the stream (asyncio transports do not send empty datagrams, use a plain socket for it).
+
+    UDP has no flow control, so the received batches are kept in a bounded queue. When the consumer falls behind, the
+    oldest batch is dropped because only the latest measurements matter for live prediction.
+
+    Attributes:
+        queue (asyncio.Queue): Received batches that are not consumed yet. None marks the end of the stream.
+        dropped (int): Number of dropped measurements.
+        ended (bool): True when the end of the stream is in the queue, later datagrams are ignored.
+    """
+
+    def __init__(self, max_batches: int = 64) -> None:
+        """
+        Parameters:
+            max_batches (int): Maximum number of datagrams in the queue.
+        """
+        if max_batches < 1:
+            raise ValueError("max_batches must be greater than 0.")
+
+        self.queue = asyncio.Queue(max_batches + 1)  # one more slot for the end of the stream
+        self.max_batches = max_batches
+        self.dropped = 0
+        self.ended = False
+        self.transport = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        if self.ended:
+            return
+        if not data:
+            self.end()
+            return
+
+        # the queue only contains batches before the end, so the evicted item is never the end marker
+        if self.queue.qsize() >= self.max_batches:
+            self.dropped += len(self.queue.get_nowait())
+        self.queue.put_nowait(decode_frames(data))
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if not self.ended:
+            self.end()
+
+    def end(self) -> None:
+        """ Puts the end of the stream into the free slot of the queue. """
+        self.ended = True
+        self.queue.put_nowait(None)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def __aiter__(self) -> AsyncIterator[np.ndarray]:
+        """ Yields batches of measurements. Datagrams that are already waiting are combined into one batch. """
+        while True:
+            batches = [await self.queue.get()]
+            while batches[-1] is not None and not self.queue.empty():
+                batches.append(self.queue.get_nowait())
+
+            end = batches[-1] is None
+            if end:
+                batches.pop()
+            if batches:
+                yield np.concatenate(batches)
+            if end:
+                return
+
+
+async def open_udp_source(host: str, port: int, max_batches: int = 64) -> DatagramSource:
+    """ Receives measurements on a local UDP port. Port 0 chooses a free port (see source.transport). """
+    loop = asyncio.get_running_loop()
+    source = DatagramSource(max_batches)
+    await loop.create_datagram_endpoint(lambda: source, local_addr=(host, port))
+    return source
+
+
+async def open_tcp_source(host: str, port: int, batch_size: int = 256) -> StreamSource:
+    """ Connects to a hand tracker that sends measurements over TCP. """
+    reader, _ = await asyncio.open_connection(host, port)
+    return StreamSource(reader, batch_size)
+
+
+async def open_pipe_source(pipe, batch_size: int = 256) -> StreamSource:
+    """ Reads measurements from a pipe or file object, e.g. the stdout of a tracker process. """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return StreamSource(reader, batch_size)
+
+
+async def process_batches(controller: Controller, batches: AsyncIterable[np.ndarray]) -> AsyncIterator[dict]:
+    """
+    Feeds the measurements of a source into the controller and yields the results of Controller.process_data.
+    The next batch is only requested after the current batch has been processed.
+
+    Parameters:
+        controller (Controller): The controller without database.
+        batches (AsyncIterable[numpy.ndarray]): Batches of measurements as arrays of FRAME_DTYPE.
+
+    Returns:
+        AsyncIterator[dict]: Results of the measurements with a new prediction.
+    """
+    async for batch in batches:
+        points = recfunctions.structured_to_unstructured(batch[['x', 'y', 'z']], dtype=np.float64)
+        for timestamp, point in zip(batch['time'].tolist(), points):
+            result = controller.process_data([timestamp, point])
+            if result is not None:
+                yield result
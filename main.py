@@ -1,10 +1,19 @@
-import queue
 import threading
-import time
-import pandas as pd
+from typing import Optional, TYPE_CHECKING
+import numpy as np
 
 from controller import Controller
 from data_emitter import DataEmitter
+from dataset_cache import read_csv
+from frame_buffer import FrameRingBuffer
+from instrumentation import Instrumentation
+from result_sinks import Sink
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+MODES = ('threads', 'processes')
 
 
 class Main:
@@ -15,7 +24,9 @@ class Main:
                  rt_result: bool = False,
                  use_db: bool = False,
                  is_asemble: bool = True,
-                 hand: str = 'right'
+                 hand: str = 'right',
+                 instrumentation: bool = False,
+                 mode: str = 'threads'
                  ) -> None:
         """
         Main class responsible for initializing file paths and parameters, as well as setting up data emitter and
@@ -29,107 +40,191 @@ class Main:
             use_db (bool): True if database (actions) are used. False otherwise.
             is_asemble (bool): True if assemble task is chosen. False otherwise.
             hand (str): Whether 'left' or 'right' hand is being tracked.
+            instrumentation (bool): Measures the time of each stage and prints the latencies after the run.
+            mode (str): 'threads' runs the data emitter and the controller as two threads. 'processes' runs the
+                controller in a worker process (see process_pipeline.py), without database and instrumentation.
         """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {list(MODES)}.")
+        if mode == 'processes' and (use_db or instrumentation):
+            raise ValueError("the processes mode supports neither the database nor the instrumentation.")
+
+        # CSV files are parsed once and then loaded from the binary cache of dataset_cache
         # all goal positions and ids are saved in csv->(ID, x, y, z)
-        df_goals = pd.read_csv(path_goals)
+        df_goals = read_csv(path_goals)
 
         # CSV with timestamp and coordinates of hand wrist
-        df_trajectories = pd.read_csv(path_trajectories)
+        df_trajectories = read_csv(path_trajectories)
 
         # CSV with actions from database. None if database is disabled
-        df_actions = pd.read_csv(path_actions) if use_db else None
+        df_actions = read_csv(path_actions) if use_db else None
 
-        """
-                Parameters for action handler.
+        params = get_params(df_trajectories, use_db, is_asemble, hand)
 
-                ACTION_HANDLER_PARAMS (tuple):
-                        [0] Boolean flag for Task: True for assemble_actions and False for dismantling.
-                        [1] Hand that is being tracked.
+        self.rt_result = rt_result
+        self.mode = mode
+        self.df_goals = df_goals
+        self.params = params
+        self.instrumentation = Instrumentation() if instrumentation else None
+        self.frame_buffer = FrameRingBuffer()
+        self.data_emitter = DataEmitter(None, df_trajectories, df_actions, params['DATA_EMITTER_PARAMS'],
+                                        self.instrumentation)
+        self.controller = Controller(df_goals, use_db, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                     params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'],
+                                     self.data_emitter.action_timeline, self.instrumentation, params['CULLING_PARAMS'],
+                                     params['PRECISION'], params['BACKEND'])
+
+    def run(self, sink: Optional[Sink] = None) -> Optional[Sink]:
         """
-        ACTION_HANDLER_PARAMS = (is_asemble, hand)
+        Runs the predictor until the data emitter has emitted all frames. Results are not kept by Main, so the memory
+        stays constant also for long sessions.
 
-        """
-        Noise reducer type: None=0, SMA=1, WMA=2, EMA=3 (for EMA: 0 < alpha < 1)
-        window: short: 5 to 15 | medium: 15 to 30 | long: 30 to 50
-        Best: (2, 10) for generated | (2, 25) for recorded 
-        
-        NOISE_REDUCER_PARAMS (tuple): A tuple specifying
-                [0] noise_reducer_type (int): The type of noise reduction technique to apply.
-                [1] window_size_or_alpha (float): The window size or alpha value associated with the noise reducer.
-        """
-        NOISE_REDUCER_PARAMS = (2, 25)  # (NOISE_REDUCER, WINDOW_SIZE)
+        Parameters:
+            sink (Sink): Receives every result (see result_sinks.py), e.g. ListSink to keep all results for tests.
+                The caller closes it. None if the results are only printed (rt_result) or not used.
 
+        Return:
+            Sink: The sink given as parameter.
         """
-        Minimum thresholds for prediction model calculations.
-        Best: (0.025, 0.0) for generated | (0.01, 0.15) for recorded
-        
-        MODEL_PARAMS (tuple): A tuple specifying
-                [0] min_distance (float): The minimum distance at which to begin calculations.
-                [1] min_progression (float): The minimum progression along the predicted trajectory. (0 < prog < 1)
-        """
-        MODEL_PARAMS = (0.01, 0.15)  # (MIN_DIST, MIN_PROG)
+        if self.mode == 'processes':
+            return self.run_processes(sink)
 
-        """
-        Variance boundaries for normal distribution and weight for distance cost function for
-        Best: (0.005, 0.85, 0.25) for generated | (0.005, 0.85, 4.0) to reduce false-positive results for recoded.
-        
-        PROBABILITY_PARAMS (tuple): A tuple specifying
-                [0] variance_lower_limit (float): The lower bound for variance in the normal distribution.
-                [1] variance_upper_limit (float): The upper bound for variance in the normal distribution.
-                [2] omega (float): A variable > 1 used in the distance cost function to adjust probabilities. 
-        """
-        PROBABILITY_PARAMS = (0.005, 0.85, 4.0)  # (MIN_VAR, MAX_VAR, OMEGA)
+        producer_thread = threading.Thread(target=self.data_emitter.emit_to_buffer, args=(self.frame_buffer,))
+        producer_thread.daemon = True  # to close thread with sys.exit
+        producer_thread.start()
 
-        """
-        Emitter uses actions from database and standard deviation of noise to be added.
-        DATA_EMITTER_PARAMS (tuple):
-                [0] Boolean flag to enable or disable the use of the database.
-                [1] Standard deviation of noise to be added
-                [2] Start time (at beginning of hand wrist recording)
-                [3] End time (at end of hand wrist recording)
-                [4] Time step (17 ~ 60hz, 100 = 10hz)
-                [5] Real time speed (0.001(fastest) < 0.1 (fast) < 1.0 (normal) < 10.0 (slow))
-                [6] String identifier of tracked hand, relevant of the set of next goals
-                [7] Boolean flag indicating assembly/disassembly
-        """
-        DATA_EMITTER_PARAMS = (
-            use_db, 0.00, df_trajectories['time'].iloc[0], df_trajectories['time'].iloc[-1], 17, 0.001, hand,
-            is_asemble)
+        # views of the written frames, each view is released after it has been processed
+        for result in self.controller.process_stream(self.frame_buffer.batches()):
+            """Note: The output uses only Python standard objects and no program-specific objects."""
+            self.handle_result(result, sink)
 
-        self.rt_result = rt_result
-        self.data_queue = queue.Queue()
-        self.data_emitter = DataEmitter(self.data_queue, df_trajectories, df_actions, DATA_EMITTER_PARAMS)
-        self.controller = Controller(df_goals, use_db, NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS,
-                                     ACTION_HANDLER_PARAMS)
+        if self.instrumentation is not None:
+            self.instrumentation.dump()
 
-    def run(self):
+        return sink
 
-        producer_thread = threading.Thread(target=self.data_emitter.emit_data)
-        producer_thread.daemon = True  # to close thread with sys.exit
-        producer_thread.start()
+    def run_processes(self, sink: Optional[Sink] = None) -> Optional[Sink]:
+        """ Like run, but the frames are emitted in this process and the controller runs in a worker process. """
+        from process_pipeline import run_sessions  # multiprocessing is only imported for this mode
+
+        for _, result in run_sessions([(self.df_goals, self.data_emitter.paced_frames())], self.params):
+            self.handle_result(result.to_dict(), sink)
+
+        return sink
+
+    def handle_result(self, result: dict, sink: Optional[Sink]) -> None:
+        if sink is not None:
+            sink.write(result)
+
+        if self.rt_result:
+            print_result(result, print_only_top3)
+
+
+def get_params(df_trajectories: 'pd.DataFrame', use_db: bool = False, is_asemble: bool = True, hand: str = 'right'
+               ) -> dict:
+    """
+    Returns the parameters of the controller and the data emitter as a dict with the keys ACTION_HANDLER_PARAMS,
+    NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS, CULLING_PARAMS, PRECISION, BACKEND and
+    DATA_EMITTER_PARAMS.
+
+    Parameters:
+        df_trajectories (pandas.DataFrame): DataFrame (or dict of columns) with the hand wrist positions recorded over
+            time.
+        use_db (bool): True if database (actions) are used. False otherwise.
+        is_asemble (bool): True if assemble task is chosen. False otherwise.
+        hand (str): Whether 'left' or 'right' hand is being tracked.
+    """
 
-        results = []
-        while True:
-            try:
-                data = self.data_queue.get()
-                if data == -1:  # stop when no more data
-                    break
+    """
+    Parameters for action handler.
 
-                """Note: The output uses only Python standard objects and no program-specific objects."""
-                result = self.controller.process_data(data)
+    ACTION_HANDLER_PARAMS (tuple):
+            [0] Boolean flag for Task: True for assemble_actions and False for dismantling.
+            [1] Hand that is being tracked.
+    """
+    ACTION_HANDLER_PARAMS = (is_asemble, hand)
 
-                if result is not None:
-                    results.append(result)
+    """
+    Noise reducer type: None=0, SMA=1, WMA=2, EMA=3 (for EMA: 0 < alpha < 1)
+    window: short: 5 to 15 | medium: 15 to 30 | long: 30 to 50
+    Best: (2, 10) for generated | (2, 25) for recorded 
+    
+    NOISE_REDUCER_PARAMS (tuple): A tuple specifying
+            [0] noise_reducer_type (int): The type of noise reduction technique to apply.
+            [1] window_size_or_alpha (float): The window size or alpha value associated with the noise reducer.
+    """
+    NOISE_REDUCER_PARAMS = (2, 25)  # (NOISE_REDUCER, WINDOW_SIZE)
 
-                    if self.rt_result:
-                        print_result(result, print_only_top3)
+    """
+    Minimum thresholds for prediction model calculations.
+    Best: (0.025, 0.0) for generated | (0.01, 0.15) for recorded
+    
+    MODEL_PARAMS (tuple): A tuple specifying
+            [0] min_distance (float): The minimum distance at which to begin calculations.
+            [1] min_progression (float): The minimum progression along the predicted trajectory. (0 < prog < 1)
+    """
+    MODEL_PARAMS = (0.01, 0.15)  # (MIN_DIST, MIN_PROG)
 
-            except queue.Empty:
-                print("wait for data...")
-                time.sleep(0.2)
+    """
+    Variance boundaries for normal distribution and weight for distance cost function for
+    Best: (0.005, 0.85, 0.25) for generated | (0.005, 0.85, 4.0) to reduce false-positive results for recoded.
+    
+    PROBABILITY_PARAMS (tuple): A tuple specifying
+            [0] variance_lower_limit (float): The lower bound for variance in the normal distribution.
+            [1] variance_upper_limit (float): The upper bound for variance in the normal distribution.
+            [2] omega (float): A variable > 1 used in the distance cost function to adjust probabilities. 
+    """
+    PROBABILITY_PARAMS = (0.005, 0.85, 4.0)  # (MIN_VAR, MAX_VAR, OMEGA)
 
-        # Thread returns ALL collected results after finishing. (for testing)
-        return results
+    """
+    Culling of goals for very large goal sets. Only goals within the radius around the hand wrist and inside the cone
+    around the measured direction are evaluated, all other goals have the probability 0. None evaluates all goals.
+
+    CULLING_PARAMS (tuple): A tuple specifying
+            [0] radius (float): Maximum distance of an evaluated goal to the hand wrist in meters.
+            [1] cone_angle (float): Maximum angle between the measured direction and an evaluated goal in radians.
+    """
+    CULLING_PARAMS = None  # (RADIUS, CONE_ANGLE)
+
+    """
+    Precision of the goal state. 'float64' is the reference. 'float32' halves the memory of the goal state and
+    accumulates the probabilities in log domain. The probabilities differ by at most 0.01 percentage points (one step
+    of the rounded results) from float64 on the recorded and generated data.
+    """
+    PRECISION = 'float64'
+
+    """
+    Backend of the goal update. 'numpy' is the reference. 'numba' runs prediction and probabilities of all goals in one
+    loop compiled with Numba (optional dependency, falls back to 'numpy' when it is not installed). The first
+    measurement compiles the loop, later runs load it from the Numba cache.
+    """
+    BACKEND = 'numpy'
+
+    """
+    Emitter uses actions from database and standard deviation of noise to be added.
+    DATA_EMITTER_PARAMS (tuple):
+            [0] Boolean flag to enable or disable the use of the database.
+            [1] Standard deviation of noise to be added
+            [2] Start time (at beginning of hand wrist recording)
+            [3] End time (at end of hand wrist recording)
+            [4] Time step (17 ~ 60hz, 100 = 10hz)
+            [5] Real time speed (0.001(fastest) < 0.1 (fast) < 1.0 (normal) < 10.0 (slow))
+            [6] String identifier of tracked hand, relevant of the set of next goals
+            [7] Boolean flag indicating assembly/disassembly
+    """
+    timestamps = np.asarray(df_trajectories['time'])
+    DATA_EMITTER_PARAMS = (use_db, 0.00, timestamps[0], timestamps[-1], 17, 0.001, hand, is_asemble)
+
+    return {
+        'ACTION_HANDLER_PARAMS': ACTION_HANDLER_PARAMS,
+        'NOISE_REDUCER_PARAMS': NOISE_REDUCER_PARAMS,
+        'MODEL_PARAMS': MODEL_PARAMS,
+        'PROBABILITY_PARAMS': PROBABILITY_PARAMS,
+        'CULLING_PARAMS': CULLING_PARAMS,
+        'PRECISION': PRECISION,
+        'BACKEND': BACKEND,
+        'DATA_EMITTER_PARAMS': DATA_EMITTER_PARAMS
+    }
 
 
 def print_result(r: dict, only_top3: bool = True) -> None:
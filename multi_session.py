@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from controller import process_goal_df
+from data_handler import package_result
+from goal import goal_arrays_to_dict
+from goal_store import PRECISIONS
+from prediction_model import calc_prediction_batch, point_directions
+from probability_evaluator import calc_log_probabilities, calc_probabilities_masked
+
+
+class MultiSessionController:
+    """
+    A class that controls the flow of data for many tracked hands (sessions) at once. Every session has its own set
+    of goals and behaves like its own Controller without database (actions), but all sessions that receive a
+    measurement are advanced in one vectorized step.
+
+    The goal sets are padded to the size of the largest set. Padded and removed goals are excluded with a mask.
+
+    Attributes:
+        goal_ids (numpy.ndarray): IDs of the goals of each session (S, G). -1 for padding.
+        goal_pos (numpy.ndarray): Positions of the goals of each session (S, G, 3).
+        goal_valid (numpy.ndarray): True for goals that exist and have not been removed (S, G).
+        noise_reducer (SessionNoiseReducer): Noise reducer with a window for each session.
+        stage (numpy.ndarray): Amount of measurements of each session, up to 2 (S,).
+        prev_p, curr_p, prev_dp, curr_dp (numpy.ndarray): Points and directions of the hand wrists (S, 3).
+        dist, prob (numpy.ndarray): Distances and probabilities of the goals (S, G).
+        sq (numpy.ndarray): Sample quantities of the goals (S, G).
+        log_prob (numpy.ndarray): Log probabilities of the goals (S, G) in float32 precision, None otherwise.
+    """
+
+    def __init__(self,
+                 goal_dfs: list[pd.DataFrame],
+                 NOISE_REDUCER_PARAMS: tuple[int, float],
+                 MODEL_PARAMS: tuple[float, float],
+                 PROBABILITY_PARAMS: tuple[float, float, float],
+                 precision: str = 'float64'
+                 ) -> None:
+        """
+        Parameters:
+            goal_dfs (list[pandas.DataFrame]): DataFrames containing the positions and IDs of the goals of each session.
+            NOISE_REDUCER_PARAMS (tuple): Parameters of the noise reducer like in Controller.
+            MODEL_PARAMS (tuple): Parameters of the prediction model like in Controller.
+            PROBABILITY_PARAMS (tuple): Parameters of the probability evaluator like in Controller.
+            precision (str): Precision of the goals and hand wrists like PRECISION in Controller.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {list(PRECISIONS)}.")
+        dtype = PRECISIONS[precision]
+
+        goal_data = [process_goal_df(df) for df in goal_dfs]
+        sessions = len(goal_data)
+        size = max(len(data) for data in goal_data)
+
+        self.goal_ids = np.full((sessions, size), -1)
+        self.goal_pos = np.zeros((sessions, size, 3), dtype=dtype)
+        self.goal_valid = np.zeros((sessions, size), dtype=bool)
+        for session, data in enumerate(goal_data):
+            self.goal_ids[session, :len(data)] = [number for number, _ in data]
+            self.goal_pos[session, :len(data)] = [position for _, position in data]
+            self.goal_valid[session, :len(data)] = True
+
+        self.noise_reducer = SessionNoiseReducer(NOISE_REDUCER_PARAMS, sessions)
+
+        # prediction model
+        self.stage = np.zeros(sessions, dtype=int)
+        self.prev_p = np.zeros((sessions, 3), dtype=dtype)
+        self.curr_p = np.zeros((sessions, 3), dtype=dtype)
+        self.prev_dp = np.zeros((sessions, 3), dtype=dtype)
+        self.curr_dp = np.zeros((sessions, 3), dtype=dtype)
+        self.MIN_DIST = MODEL_PARAMS[0]
+        self.MIN_PROG = MODEL_PARAMS[1]
+
+        # probability
+        self.dist = np.full((sessions, size), 10000.0, dtype=dtype)
+        self.prob = np.zeros((sessions, size), dtype=dtype)
+        self.sq = np.zeros((sessions, size), dtype=int)
+        self.log_prob = np.full((sessions, size), -np.inf, dtype=dtype) if dtype == np.float32 else None
+        self.MIN_VARIANCE = PROBABILITY_PARAMS[0]
+        self.MAX_VARIANCE = PROBABILITY_PARAMS[1]
+        self.OMEGA = PROBABILITY_PARAMS[2]
+
+    def __len__(self) -> int:
+        return len(self.goal_ids)
+
+    def remove_goal(self, session: int, goal_id: int) -> bool:
+        """
+        Removes goal from a session.
+
+        return: True if it is successfully removed. False otherwise.
+        """
+        columns = np.flatnonzero((self.goal_ids[session] == goal_id) & self.goal_valid[session])
+        if len(columns) == 0:
+            return False
+
+        self.goal_valid[session, columns] = False
+        self.prob[session, columns] = 0.0
+        self.sq[session, columns] = 0
+        if self.log_prob is not None:
+            self.log_prob[session, columns] = -np.inf
+        return True
+
+    def step(self, sessions: np.ndarray, timestamps: np.ndarray, points: np.ndarray) -> Optional['MultiSessionResult']:
+        """
+        Processes one measurement for each of the given sessions.
+
+        Parameters:
+            sessions (numpy.ndarray): Indices of the sessions that received a measurement (K,). Each at most once.
+            timestamps (numpy.ndarray): Timestamps of the measurements (K,).
+            points (numpy.ndarray): Measured hand wrist positions (K, 3).
+
+        Returns:
+            MultiSessionResult: Results of the sessions with a new prediction. None if there is none.
+        """
+        sessions = np.asarray(sessions, dtype=int)
+        timestamps = np.asarray(timestamps)
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(np.unique(sessions)) != len(sessions):
+            raise ValueError('Each session can only receive one measurement per step.')
+
+        stabilized = self.noise_reducer.update(sessions, points).astype(self.prob.dtype, copy=False)
+        stage = self.stage[sessions]
+
+        # calculating starts after third measurement
+        first = stage == 0
+        self.prev_p[sessions[first]] = stabilized[first]
+
+        second = stage == 1
+        self.curr_p[sessions[second]] = stabilized[second]
+        self.curr_dp[sessions[second]] = point_directions(self.prev_p[sessions[second]], stabilized[second])
+
+        self.stage[sessions[first | second]] += 1
+
+        # calculating starts after minimum distance between measurements is reached
+        third = np.flatnonzero(stage >= 2)
+        moved = np.linalg.norm(self.curr_p[sessions[third]] - stabilized[third], axis=-1) >= self.MIN_DIST
+        selected = third[moved]
+        if len(selected) == 0:
+            return None
+
+        calc = sessions[selected]
+
+        # shift coordinates and derivative
+        self.prev_p[calc] = self.curr_p[calc]
+        self.curr_p[calc] = stabilized[selected]
+        self.prev_dp[calc] = self.curr_dp[calc]
+        self.curr_dp[calc] = point_directions(self.prev_p[calc], self.curr_p[calc])
+
+        batch = calc_prediction_batch(self.prev_p[calc], self.curr_p[calc], self.prev_dp[calc], self.curr_dp[calc],
+                                      self.goal_pos[calc], self.MIN_PROG)
+
+        valid = self.goal_valid[calc]
+        self.dist[calc] = batch.dist
+        if self.log_prob is not None:
+            self.log_prob[calc], self.sq[calc] = calc_log_probabilities(
+                batch.angle, batch.hand_towards_goal, batch.dist, self.log_prob[calc], self.sq[calc],
+                self.MIN_VARIANCE, self.MAX_VARIANCE, self.OMEGA, valid)
+            self.prob[calc] = np.exp(self.log_prob[calc])
+        else:
+            self.prob[calc], self.sq[calc] = calc_probabilities_masked(batch.angle, batch.hand_towards_goal, batch.dist,
+                                                                       self.prob[calc], self.sq[calc], valid,
+                                                                       self.MIN_VARIANCE, self.MAX_VARIANCE,
+                                                                       self.OMEGA)
+
+        return MultiSessionResult(calc, timestamps[selected], self.curr_p[calc], self.goal_ids[calc],
+                                  self.goal_pos[calc], valid, self.prob[calc], self.dist[calc], self.sq[calc])
+
+
+@dataclass
+class MultiSessionResult:
+    """ Dataclass for the results of the C sessions with a new prediction in one step of MultiSessionController.
+    sessions: Indices of the sessions (C,).
+    time: Timestamps of the measurements (C,).
+    hand_position: Stabilized hand wrist positions (C, 3).
+    goal_ids: IDs of the goals (C, G).
+    goal_pos: Positions of the goals (C, G, 3).
+    valid: True for goals that take part in the prediction (C, G).
+    probability: Probabilities of the goals (C, G).
+    distance: Distances from the hand wrists to the goals (C, G).
+    sample_quantity: Sample quantities of the goals (C, G).
+    """
+    sessions: np.ndarray
+    time: np.ndarray
+    hand_position: np.ndarray
+    goal_ids: np.ndarray
+    goal_pos: np.ndarray
+    valid: np.ndarray
+    probability: np.ndarray
+    distance: np.ndarray
+    sample_quantity: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def to_dict(self, i: int) -> dict:
+        """ Converts the result of the i-th session into the result format of Controller.process_data. """
+        columns = self.valid[i]
+        goals_dict = goal_arrays_to_dict(self.goal_ids[i, columns], self.goal_pos[i, columns],
+                                         self.probability[i, columns], self.distance[i, columns],
+                                         self.sample_quantity[i, columns])
+        return package_result(goals_dict, self.time[i].item(), self.hand_position[i].tolist(), [], None)
+
+
+class SessionNoiseReducer:
+    """
+    A class that applies one of the noise reducers of noise_reducer.py to many sessions at once. The windows of all
+    sessions are stored in one array.
+    Noise reducer type: None=0, SMA=1, WMA=2, EMA=3 (for EMA: 0 < alpha < 1)
+    """
+
+    def __init__(self, settings: tuple[int, float], sessions: int) -> None:
+        self.type = settings[0]
+        self.count = np.zeros(sessions, dtype=int)
+
+        if self.type in (1, 2):
+            window_size = int(settings[1])
+            if window_size < 1:
+                raise ValueError("window_size must be greater than 1.")
+
+            # points in chronological order, the newest point is last
+            self.window_size = window_size
+            self.points = np.zeros((sessions, window_size, 3))
+            self.weights = np.arange(1, window_size + 1, dtype=float)  # Weights: 1, 2, ..., window_size
+            self.weight_sum = self.weights.sum()
+
+        elif self.type == 3:
+            alpha = settings[1]
+            if alpha > 1 or alpha < 0:
+                raise ValueError("alpha must be between 0 and 1.")
+
+            self.alpha = alpha
+            self.ema = np.zeros((sessions, 3))
+
+        elif self.type != 0:
+            raise ValueError('Undefined noise settings!')
+
+    def update(self, sessions: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """ Adds the measured points of the given sessions and returns their stabilized points. """
+        if self.type == 0:
+            return points
+
+        self.count[sessions] += 1
+
+        if self.type == 3:
+            first = (self.count[sessions] == 1)[:, np.newaxis]
+            self.ema[sessions] = np.where(first, points, self.alpha * points + (1 - self.alpha) * self.ema[sessions])
+            return self.ema[sessions]
+
+        window = self.points[sessions]
+        window[:, :-1] = window[:, 1:]
+        window[:, -1] = points
+        self.points[sessions] = window
+
+        if self.type == 1:
+            count = np.minimum(self.count[sessions], self.window_size)[:, np.newaxis]
+            return window.sum(axis=1) / count
+
+        # older slots of windows that are not full are zero and do not contribute
+        return np.einsum('kwc,w->kc', window, self.weights) / self.weight_sum
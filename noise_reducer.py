@@ -52,34 +52,64 @@ class SimpleMovingAverage:
         count = len(self.x_points)
         return np.array([self.sum_x / count, self.sum_y / count, self.sum_z / count]) if count != 0 else None
 
+    def filter(self, points: np.ndarray) -> np.ndarray:
+        """ Filters a whole trajectory (N, 3) like a new instance would after each point. The state is unchanged. """
+        counts = np.minimum(np.arange(1, len(points) + 1), self.window_size)[:, np.newaxis]
+        return _convolve_trajectory(points, np.ones(self.window_size)) / counts
+
 
 class WeightedMovingAverage:
+    """
+    The weighted sum is updated incrementally: when a point is added, every weight in the window decreases by one,
+    so the weighted sum decreases by the plain sum of the window. Each update is O(1). The sums are recalculated from
+    the window every window_size updates to prevent the accumulation of rounding errors.
+    """
+
     def __init__(self, window_size: float) -> None:
         window_size = int(window_size)
         if window_size < 1:
             raise ValueError("window_size must be greater than 1.")
 
         self.window_size = window_size
-        self.weights = [i + 1 for i in range(window_size)]  # Weights: 1, 2, ..., window_size
-        self.weight_sum = sum(self.weights)
-        self.x_points = deque(maxlen=window_size)
-        self.y_points = deque(maxlen=window_size)
-        self.z_points = deque(maxlen=window_size)
+        self.weights = np.arange(1, window_size + 1, dtype=float)  # Weights: 1, 2, ..., window_size
+        self.weight_sum = self.weights.sum()
+        self.points = deque(maxlen=window_size)
+        self.sum = np.zeros(3)
+        self.weighted_sum = np.zeros(3)
+        self.updates = 0
 
     def add(self, coordinates: np.ndarray) -> None:
-        self.x_points.append(coordinates[0])
-        self.y_points.append(coordinates[1])
-        self.z_points.append(coordinates[2])
+        coordinates = np.array(coordinates[:3], dtype=float)
+
+        # weights of the points in the window decrease by one, the oldest point gets weight 0 and is removed
+        self.weighted_sum += self.window_size * coordinates - self.sum
+        self.sum += coordinates
+        if len(self.points) == self.window_size:
+            self.sum -= self.points[0]
+        self.points.append(coordinates)
+
+        self.updates += 1
+        if self.updates == self.window_size:
+            self.resync()
+
+    def resync(self) -> None:
+        """ Recalculates the sums from the points in the window. """
+        window = np.array(self.points).reshape(-1, 3)
+        self.sum = window.sum(axis=0)
+        self.weighted_sum = self.weights[self.window_size - len(window):] @ window
+        self.updates = 0
 
     def get(self) -> Union[np.ndarray, None]:
-        if len(self.x_points) == 0:
+        if len(self.points) == 0:
             return None
 
-        wma_x = sum(w * x for w, x in zip(self.weights[-len(self.x_points):], self.x_points)) / self.weight_sum
-        wma_y = sum(w * y for w, y in zip(self.weights[-len(self.y_points):], self.y_points)) / self.weight_sum
-        wma_z = sum(w * z for w, z in zip(self.weights[-len(self.z_points):], self.z_points)) / self.weight_sum
+        # like the sum of the weights of a full window, also when the window is not full yet
+        return self.weighted_sum / self.weight_sum
 
-        return np.array([wma_x, wma_y, wma_z])
+    def filter(self, points: np.ndarray) -> np.ndarray:
+        """ Filters a whole trajectory (N, 3) like a new instance would after each point. The state is unchanged. """
+        kernel = self.weights[::-1]  # newest point has the highest weight
+        return _convolve_trajectory(points, kernel) / self.weight_sum
 
 
 class ExponentialMovingAverage:
@@ -104,3 +134,37 @@ class ExponentialMovingAverage:
 
     def get(self) -> Union[np.ndarray, None]:
         return np.array([self.ema_x, self.ema_y, self.ema_z]) if self.ema_x is not None else None
+
+    def filter(self, points: np.ndarray, block_size: int = 64) -> np.ndarray:
+        """
+        Filters a whole trajectory (N, 3) like a new instance would after each point. The state is unchanged.
+
+        The recursion is solved for blocks of points at once: inside a block, the EMA is a weighted sum of the EMA
+        before the block and the points of the block with the weights alpha * (1 - alpha)^k.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        result = np.empty_like(points)
+        if len(points) == 0:
+            return result
+
+        # block_matrix[j, k] = alpha * (1 - alpha)^(j - k) for k <= j
+        exponents = np.subtract.outer(np.arange(block_size), np.arange(block_size))
+        block_matrix = np.where(exponents >= 0, self.alpha * (1 - self.alpha) ** np.maximum(exponents, 0), 0.0)
+        decay = (1 - self.alpha) ** np.arange(1, block_size + 1)
+
+        result[0] = points[0]  # initialized with the first data point
+        for start in range(1, len(points), block_size):
+            block = points[start:start + block_size]
+            size = len(block)
+            previous = result[start - 1]
+            result[start:start + size] = block_matrix[:size, :size] @ block + decay[:size, np.newaxis] * previous
+
+        return result
+
+
+def _convolve_trajectory(points: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """ Sum of kernel[k] * points[i - k] for every point i. Points before the first point count as zero. """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if len(points) == 0:
+        return points
+    return np.stack([np.convolve(points[:, axis], kernel)[:len(points)] for axis in range(3)], axis=1)
@@ -1,5 +1,11 @@
+from dataclasses import dataclass
+from typing import Optional
 import numpy as np
+
 from data_handler import DataHandler
+from goal import calc_poly_batch, norm_vectors
+from kernels import GoalUpdateKernel
+from spatial_index import ConeCulling
 
 
 class PredictionModel:
@@ -11,15 +17,28 @@ class PredictionModel:
         curr_p (numpy.ndarray): Measured point of the hand wrist at time t.
         prev_dp (numpy.ndarray): Directional vector at time t-1.
         curr_dp (numpy.ndarray): Directional vector at time t.
+        culling (ConeCulling): Selects the goals in front of the hand. None if all goals are evaluated.
+        kernel (GoalUpdateKernel): Runs the prediction together with the probabilities in ProbabilityEvaluator.update.
+            None for the NumPy functions.
     """
 
-    def __init__(self, data_handler: DataHandler, MODEL_PARAMS: tuple[float, float]) -> None:
+    def __init__(self,
+                 data_handler: DataHandler,
+                 MODEL_PARAMS: tuple[float, float],
+                 CULLING_PARAMS: Optional[tuple[float, float]] = None,
+                 kernel: Optional[GoalUpdateKernel] = None
+                 ) -> None:
         """
         Parameters:
             data_handler (DataHandler): An instance for handling the data during runtime.
             MODEL_PARAMS (tuple): A tuple specifying
                 [0] min_distance (float): The minimum distance at which to begin calculations.
                 [1] min_progression (float): The minimum progression along the predicted trajectory.
+            CULLING_PARAMS (tuple): None to evaluate all goals. Otherwise a tuple specifying
+                [0] radius (float): Maximum distance of an evaluated goal to the hand wrist in meters.
+                [1] cone_angle (float): Maximum angle between the measured direction and the direction to an
+                    evaluated goal in radians.
+            kernel (GoalUpdateKernel): Kernel of the backend (see kernels.select_kernel). None for NumPy.
         """
 
         self.data_handler = data_handler
@@ -32,6 +51,12 @@ class PredictionModel:
         self.MIN_DIST = MODEL_PARAMS[0]
         self.MIN_PROG = MODEL_PARAMS[1]
 
+        self.culling = None
+        if CULLING_PARAMS is not None:
+            self.culling = ConeCulling(self.data_handler.goal_store.pos, CULLING_PARAMS[0], CULLING_PARAMS[1])
+
+        self.kernel = kernel
+
     def update(self, next_p: np.ndarray) -> None:
         """
         Calculates the predicted directions for each goal by modeling a cubic polynomial curve in 3D space.
@@ -40,8 +65,7 @@ class PredictionModel:
             next_p (numpy.ndarray): Last measured point of the hand wrist.
         """
 
-        # Gets possible goals when database (action) is used. All goals otherwise.
-        goals = self.data_handler.get_goals()
+        store = self.data_handler.goal_store
 
         # calculating starts after third measurement
         if self.prev_p is None:
@@ -65,21 +89,118 @@ class PredictionModel:
 
         self.data_handler.set_pm_data(True, self.prev_p, self.curr_p, self.prev_dp, self.curr_dp)
 
-        for g in goals:
-            # Set the distance from current point to goal
-            g.set_distance(self.curr_p)
+        # Gets possible goals when database (action) is used. All goals otherwise.
+        if self.culling is None:
+            rows = self.data_handler.get_goal_rows()
+        else:
+            rows = self.cull_goals()
 
-            # Set model trajectory and its derivative as matrices
-            g.set_matrices(calc_mats(self.prev_p, self.prev_dp, g.pos))
+        if len(rows) == 0:
+            return
 
-            # Set the progression of the current point at the trajectory path
-            g.set_progression(max(calc_progression(self.prev_p, self.curr_p, g.pos), self.MIN_PROG))
+        # The kernel calculates the prediction in ProbabilityEvaluator.update in the same loop as the probabilities.
+        if self.kernel is not None:
+            self.kernel.set_hand(self.prev_p, self.curr_p, self.prev_dp, self.curr_dp, self.MIN_PROG)
+            return
 
-            # Set angles between measured and predicted direction
-            g.angle = calc_angle(g.dppt, self.curr_dp)
+        # Calculate trajectories, progressions, angles and directions of all goals at once.
+        # The hand vectors have the precision of the store, so all arrays of the batch have it too.
+        prev_p, curr_p, prev_dp, curr_dp = (np.asarray(vector, dtype=store.dtype) for vector in
+                                            (self.prev_p, self.curr_p, self.prev_dp, self.curr_dp))
+        batch = calc_prediction_batch(prev_p, curr_p, prev_dp, curr_dp, store.pos[rows], self.MIN_PROG)
+
+        # Write the results back into the goal store.
+        store.prev_dist[rows] = store.dist[rows]
+        store.dist[rows] = batch.dist
+        store.mat[rows] = batch.mat
+        store.dmat[rows] = batch.dmat
+        store.ppt[rows] = batch.ppt
+        store.dppt[rows] = batch.dppt
+        store.angle[rows] = batch.angle
+        store.hand_towards_goal[rows] = batch.hand_towards_goal
+
+    def cull_goals(self) -> np.ndarray:
+        """
+        Selects the possible (or active) goals in front of the hand as candidates. Goals that were candidates in the
+        last calculation and are culled now are reset, so goals outside the candidates always have probability 0.
+        The result contains the culled goals too, so their distances are updated without prediction.
 
-            # Calculate if Hand is moving towards target.
-            g.hand_towards_goal = calc_hand_towards_goal(g.pos, self.curr_p, self.curr_dp)
+        return: The rows of the candidates.
+        """
+        store = self.data_handler.goal_store
+        candidates = self.culling.candidates(self.curr_p, self.curr_dp)
+        rows = candidates[store.mask(self.data_handler.use_database)[candidates]]
+
+        culled = np.setdiff1d(self.data_handler.get_goal_rows(), rows, assume_unique=True)
+        store.prev_dist[culled] = store.dist[culled]
+        store.dist[culled] = np.linalg.norm(store.pos[culled] - np.asarray(self.curr_p, dtype=store.dtype), axis=1)
+
+        previous = self.data_handler.candidate_rows
+        if previous is not None:
+            store.reset_probability(np.setdiff1d(previous, rows, assume_unique=True))
+        self.data_handler.candidate_rows = rows
+        return rows
+
+
+@dataclass
+class PredictionBatch:
+    """ Dataclass for the prediction model results of G goals.
+    dist: Distances from the current point to the goals (G,).
+    mat: Coefficients of the trajectory models (G, 3, 4).
+    dmat: Coefficients of the derivatives of the trajectory models (G, 3, 3).
+    ppt: Predicted points on the trajectories (G, 3).
+    dppt: Normalized derivatives at the predicted points (G, 3).
+    angle: Angles between the measured and the predicted directions (G,).
+    hand_towards_goal: True where the hand is moving towards the goal (G,).
+    """
+    dist: np.ndarray
+    mat: np.ndarray
+    dmat: np.ndarray
+    ppt: np.ndarray
+    dppt: np.ndarray
+    angle: np.ndarray
+    hand_towards_goal: np.ndarray
+
+
+def calc_prediction_batch(prev_p: np.ndarray,
+                          curr_p: np.ndarray,
+                          prev_dp: np.ndarray,
+                          curr_dp: np.ndarray,
+                          goal_positions: np.ndarray,
+                          min_progression: float
+                          ) -> PredictionBatch:
+    """
+    Calculates the prediction model for all goals at once. Gives the same results as calling calc_mats,
+    calc_progression, calc_poly, calc_angle and calc_hand_towards_goal for each goal.
+
+    All hand arguments may carry leading dimensions (..., 3) that broadcast against goal_positions (..., G, 3).
+
+    Parameters:
+        prev_p (numpy.ndarray): Measured point at time t_n-1.
+        curr_p (numpy.ndarray): Measured point at time t_n.
+        prev_dp (numpy.ndarray): Directional vector at time t_n-1.
+        curr_dp (numpy.ndarray): Directional vector at time t_n.
+        goal_positions (numpy.ndarray): Positions of the goals as (G, 3) array.
+        min_progression (float): The minimum progression along the predicted trajectory.
+
+    Returns:
+        PredictionBatch: The results of the prediction model for each goal.
+    """
+
+    prev_p = np.expand_dims(prev_p, -2)
+    curr_p = np.expand_dims(curr_p, -2)
+    prev_dp = np.expand_dims(prev_dp, -2)
+    curr_dp = np.expand_dims(curr_dp, -2)
+
+    dist = np.linalg.norm(curr_p - goal_positions, axis=-1)
+    mat, dmat = calc_mats_batch(prev_p, prev_dp, goal_positions)
+    progression = np.maximum(calc_progression_batch(prev_p, curr_p, goal_positions), min_progression)
+    ppt = calc_poly_batch(mat, progression)
+    dppt = norm_vectors(calc_poly_batch(dmat, progression))
+    angle = calc_angle_batch(dppt, curr_dp)
+    hand_towards_goal = calc_hand_towards_goal_batch(goal_positions, curr_p, curr_dp)
+
+    return PredictionBatch(dist, mat, dmat, ppt, dppt, angle, hand_towards_goal)
 
 
 def point_direction(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
@@ -92,6 +213,16 @@ def point_direction(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
     return p if divisor < 1e-10 else p / divisor
 
 
+def point_directions(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """
+    Calculates the normalized direction vectors between points of shape (..., 3). See point_direction.
+    """
+
+    p = p2 - p1
+    divisor = np.linalg.norm(p, axis=-1, keepdims=True)
+    return np.divide(p, divisor, out=p.copy(), where=divisor >= 1e-10)
+
+
 def calc_progression(prev_p: np.ndarray, curr_p: np.ndarray, goal_pos: np.ndarray) -> float:
     """
     Calculates the normalized path coordinate (progression) as a point on the trajectory.
@@ -152,6 +283,36 @@ def calc_mats(prev_p: np.ndarray, prev_dp: np.ndarray, goal_pos: np.ndarray) ->
     return prediction_mat, deriv_prediction_mat
 
 
+def calc_progression_batch(prev_p: np.ndarray, curr_p: np.ndarray, goal_positions: np.ndarray) -> np.ndarray:
+    """ Calculates the progression of the current point for goals of shape (..., G, 3). See calc_progression. """
+
+    distance_a = np.linalg.norm(curr_p - prev_p, axis=-1)
+    distance_b = np.linalg.norm(goal_positions - curr_p, axis=-1)
+    denominator = distance_a + distance_b
+
+    valid = denominator >= 1e-10
+    return np.divide(distance_a, denominator, out=np.zeros_like(denominator), where=valid)
+
+
+def calc_mats_batch(prev_p: np.ndarray, prev_dp: np.ndarray, goal_positions: np.ndarray
+                    ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the coefficients of the trajectory models and their derivatives for goals of shape (..., G, 3).
+
+    Returns:
+        tuple: Coefficient matrices of shape (..., G, 3, 4) and of their derivatives (..., G, 3, 3).
+    """
+
+    a0 = np.broadcast_to(prev_p, goal_positions.shape)
+    a1 = np.broadcast_to(prev_dp, goal_positions.shape)
+    a2 = 1.5 * goal_positions - 1.5 * prev_p - 1.5 * prev_dp
+    a3 = -0.5 * goal_positions + 0.5 * prev_p + 0.5 * prev_dp
+
+    prediction_mat = np.stack((a3, a2, a1, a0), axis=-1)
+    deriv_prediction_mat = np.stack((3 * a3, 2 * a2, a1), axis=-1)
+    return prediction_mat, deriv_prediction_mat
+
+
 def distance(v1: np.ndarray, v2: np.ndarray) -> float:
     """
     Calculates the Euclidean distance between two vectors.
@@ -174,6 +335,17 @@ def calc_angle(v1: np.ndarray, v2: np.ndarray) -> float:
     return abs(angle)
 
 
+def calc_angle_batch(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """
+    Calculates the angles on the x,y plane between 3D vectors of shape (..., 3). See calc_angle.
+    """
+
+    determinant = v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
+    dot_product = v1[..., 0] * v2[..., 0] + v1[..., 1] * v2[..., 1]
+
+    return np.abs(np.arctan2(determinant, dot_product))
+
+
 def calc_hand_towards_goal(goal_position: np.ndarray, hand_position: np.ndarray, hand_direction: np.ndarray) -> bool:
     """
     Calculates whether hand is moving towards point goal.
@@ -189,3 +361,14 @@ def calc_hand_towards_goal(goal_position: np.ndarray, hand_position: np.ndarray,
 
     difference_vector = goal_position - hand_position
     return np.dot(difference_vector, hand_direction) > 0
+
+
+def calc_hand_towards_goal_batch(goal_positions: np.ndarray, hand_position: np.ndarray, hand_direction: np.ndarray
+                                 ) -> np.ndarray:
+    """
+    Calculates whether hand is moving towards goals of shape (..., G, 3). See calc_hand_towards_goal.
+    """
+
+    difference_vectors = goal_positions - hand_position
+    hand_direction = np.broadcast_to(hand_direction, difference_vectors.shape)
+    return np.einsum('...i,...i->...', difference_vectors, hand_direction) > 0
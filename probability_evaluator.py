@@ -1,7 +1,9 @@
+from typing import Optional
 import numpy as np
-from scipy import stats
 
 from data_handler import DataHandler
+from goal import update_log_probability_batch, update_probability_batch
+from kernels import GoalUpdateKernel
 
 
 class ProbabilityEvaluator:
@@ -9,7 +11,8 @@ class ProbabilityEvaluator:
     A class that evaluates the probability of each goal.
     """
 
-    def __init__(self, data_handler: DataHandler, PROBABILITY_PARAMS: tuple[float, float, float]) -> None:
+    def __init__(self, data_handler: DataHandler, PROBABILITY_PARAMS: tuple[float, float, float],
+                 kernel: Optional[GoalUpdateKernel] = None) -> None:
         """
         Parameters:
             data_handler (DataHandler): An instance for handling the data during runtime.
@@ -17,9 +20,12 @@ class ProbabilityEvaluator:
                 [0] variance_lower_limit (float): The lower bound for variance in the normal distribution.
                 [1] variance_upper_limit (float): The upper bound for variance in the normal distribution.
                 [2] omega (float): A parameter used in the cost function to adjust probabilities.
+            kernel (GoalUpdateKernel): Kernel of the backend that also runs the prediction of PredictionModel.update
+                (see kernels.select_kernel). None for NumPy.
         """
 
         self.data_handler = data_handler
+        self.kernel = kernel
         self.MIN_VARIANCE = PROBABILITY_PARAMS[0]
         self.MAX_VARIANCE = PROBABILITY_PARAMS[1]
         self.OMEGA = PROBABILITY_PARAMS[2]
@@ -29,26 +35,171 @@ class ProbabilityEvaluator:
         Calculates the probability of goals by evaluating predicted angles.
         """
 
-        # Gets possible goals when database (action) is used. All goals otherwise.
-        goals = self.data_handler.get_goals()
+        # Gets possible goals when database (action) is used. All goals otherwise. Only candidates when culled.
+        rows = self.data_handler.get_evaluated_rows()
+        store = self.data_handler.goal_store
+
+        if len(rows) == 0:
+            return
+
+        if self.kernel is not None:
+            self.kernel.update(store, rows, self.MIN_VARIANCE, self.MAX_VARIANCE, self.OMEGA)
+            return
+
+        # Evaluates the angles, hand directions and distances of the goals.
+        if store.log_domain:
+            store.log_prob[rows], store.sq[rows] = calc_log_probabilities(
+                store.angle[rows], store.hand_towards_goal[rows], store.dist[rows], store.log_prob[rows],
+                store.sq[rows], self.MIN_VARIANCE, self.MAX_VARIANCE, self.OMEGA)
+            store.prob[rows] = np.exp(store.log_prob[rows])
+            return
+
+        store.prob[rows], store.sq[rows] = calc_probabilities(store.angle[rows], store.hand_towards_goal[rows],
+                                                              store.dist[rows], store.prob[rows], store.sq[rows],
+                                                              self.MIN_VARIANCE, self.MAX_VARIANCE, self.OMEGA)
+
+
+def calc_probabilities(angles: np.ndarray,
+                       hand_towards_goal: np.ndarray,
+                       distances: np.ndarray,
+                       probabilities: np.ndarray,
+                       sample_quantities: np.ndarray,
+                       min_variance: float,
+                       max_variance: float,
+                       omega: float
+                       ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the probabilities of all goals in one vectorized pass. Gives the same results as evaluating the normal
+    PDF, Goal.update_probability, dist_cost_function and the normalization for each goal.
+
+    Parameters:
+        angles (numpy.ndarray): Angles between measured direction and predicted directions of goals (G,).
+        hand_towards_goal (numpy.ndarray): True where the hand is moving towards the goal (G,).
+        distances (numpy.ndarray): Distances from the hand wrist to the goals (G,).
+        probabilities (numpy.ndarray): Probabilities of the goals from the last measurement (G,).
+        sample_quantities (numpy.ndarray): Sample quantities of the goals from the last measurement (G,).
+        min_variance (float): The lower limit for variance in the normal distribution.
+        max_variance (float): The upper limit for variance in the normal distribution.
+        omega (float): weight for the cost function.
+
+    Returns:
+        tuple: The updated probabilities and sample quantities.
+    """
+
+    # calculates standard deviation of all angles.
+    sd_of_angles = calc_sd(angles, min_variance, max_variance)
+
+    # update probability with normal PDF of angle.
+    probabilities, sample_quantities = update_probability_batch(probabilities, sample_quantities,
+                                                                norm_pdf(angles, sd_of_angles), hand_towards_goal)
+
+    # apply distance cost function
+    probabilities /= 1 + omega * distances
+
+    # normalize probability of goals.
+    probabilities /= max(1, probabilities.sum())
+
+    return probabilities, sample_quantities
+
+
+def calc_probabilities_masked(angles: np.ndarray,
+                              hand_towards_goal: np.ndarray,
+                              distances: np.ndarray,
+                              probabilities: np.ndarray,
+                              sample_quantities: np.ndarray,
+                              valid: np.ndarray,
+                              min_variance: float,
+                              max_variance: float,
+                              omega: float
+                              ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the probabilities like calc_probabilities for independent goal sets of shape (S, G). Only goals where
+    valid is True take part in the standard deviation and the normalization of their set. Other goals are reset.
+
+    Returns:
+        tuple: The updated probabilities and sample quantities of shape (S, G).
+    """
+
+    # standard deviation of the angles of each goal set
+    count = np.maximum(np.count_nonzero(valid, axis=-1, keepdims=True), 1)
+    mean = np.sum(angles, axis=-1, keepdims=True, where=valid) / count
+    sigma = np.sqrt(np.sum((angles - mean) ** 2, axis=-1, keepdims=True, where=valid) / count)
+    sd_of_angles = np.clip(sigma, np.sqrt(min_variance), np.sqrt(max_variance))
+
+    probabilities, sample_quantities = update_probability_batch(probabilities, sample_quantities,
+                                                                norm_pdf(angles, sd_of_angles),
+                                                                hand_towards_goal & valid)
+
+    probabilities /= 1 + omega * distances
+    probabilities /= np.maximum(1, probabilities.sum(axis=-1, keepdims=True))
+
+    return probabilities, sample_quantities
+
+
+def calc_log_probabilities(angles: np.ndarray,
+                           hand_towards_goal: np.ndarray,
+                           distances: np.ndarray,
+                           log_probabilities: np.ndarray,
+                           sample_quantities: np.ndarray,
+                           min_variance: float,
+                           max_variance: float,
+                           omega: float,
+                           valid: Optional[np.ndarray] = None
+                           ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the probabilities like calc_probabilities (or calc_probabilities_masked when valid is given) in log
+    domain. The angle probabilities are accumulated as sums of log PDFs and normalized with log-sum-exp, so nothing
+    underflows even in float32. All calculations keep the float type of log_probabilities.
+
+    The reset/begin thresholds are the same as in float64. Probabilities close to a threshold can switch sides, so a
+    goal can be reset or restarted one measurement earlier or later than in float64 (see README for the tolerance).
+
+    Parameters:
+        log_probabilities (numpy.ndarray): Log probabilities of the goals from the last measurement (..., G).
+        valid (numpy.ndarray): True for goals that take part in the standard deviation and the normalization
+            (..., G). None for all goals.
+        Others: see calc_probabilities.
+
+    Returns:
+        tuple: The updated log probabilities and sample quantities.
+    """
+    dtype = log_probabilities.dtype
+    if valid is None:
+        valid = np.ones(angles.shape, dtype=bool)
+
+    # standard deviation of the angles of each goal set
+    count = np.maximum(np.count_nonzero(valid, axis=-1, keepdims=True), 1)
+    mean = np.sum(angles, axis=-1, keepdims=True, where=valid) / count
+    sigma = np.sqrt(np.sum((angles - mean) ** 2, axis=-1, keepdims=True, where=valid) / count)
+    sd_of_angles = np.clip(sigma, np.sqrt(min_variance), np.sqrt(max_variance)).astype(dtype)
+
+    # log of the normal PDF of the angles
+    log_angle_probabilities = -(angles / sd_of_angles) ** 2 / 2 - np.log(np.sqrt(2 * np.pi) * sd_of_angles)
+    log_probabilities, sample_quantities = update_log_probability_batch(log_probabilities, sample_quantities,
+                                                                        log_angle_probabilities,
+                                                                        hand_towards_goal & valid)
+
+    # apply distance cost function
+    log_probabilities -= np.log1p(omega * distances).astype(dtype)
+
+    # normalize when the sum of probabilities is greater than 1, i.e. the log-sum-exp is greater than 0
+    log_probabilities -= np.maximum(log_sum_exp(log_probabilities, valid), 0)
 
-        # Angles between measured direction and predicted directions of goals.
-        angles = [g.angle for g in goals]
+    return log_probabilities, sample_quantities
 
-        # calculates standard deviation of all angles.
-        sd_of_angles = calc_sd(angles, self.MIN_VARIANCE, self.MAX_VARIANCE)
 
-        # update probability with normal PDF of angle.
-        for g in goals:
-            g.update_probability(stats.norm.pdf(g.angle, 0, sd_of_angles))
+def log_sum_exp(values: np.ndarray, where: np.ndarray) -> np.ndarray:
+    """ Calculates log(sum(exp(values))) along the last axis without overflow. -inf for sets without probability. """
+    maximum = np.max(values, axis=-1, keepdims=True, initial=-np.inf, where=where)
+    shift = np.where(np.isfinite(maximum), maximum, 0)
+    with np.errstate(divide='ignore'):
+        return shift + np.log(np.sum(np.exp(values - shift), axis=-1, keepdims=True, where=where))
 
-        # apply distance cost function
-        dist_cost_function(goals, self.OMEGA)
 
-        # normalize probability of goals.
-        norm_divisor = max(1, sum(g.prob for g in goals))
-        for g in goals:
-            g.divide_probability(norm_divisor)
+def norm_pdf(x: np.ndarray, sd: float) -> np.ndarray:
+    """ Calculates the PDF of a normal distribution with mean 0 and standard deviation sd in closed form. """
+    y = x / sd
+    return np.exp(-y ** 2 / 2.0) / np.sqrt(2 * np.pi) / sd
 
 
 def dist_cost_function(goals, omega: float = 1.0) -> None:
@@ -0,0 +1,192 @@
+"""
+Prediction in worker processes instead of threads.
+
+The parent process reads and decodes the frames (ingest) and writes them into a FrameRingBuffer in shared memory,
+one producer thread per session, so a paced or slow source never delays the collection of the results. Every worker process runs the Controller of one session on these frames and writes the FrameResults into a
+ResultRingBuffer in shared memory, which the parent reads. Frames and results are copied into the typed slots and are
+never pickled, only the goals and parameters are passed to a worker when it starts. So the NumPy math of the workers
+does not compete with the ingest for the GIL and several sessions run in parallel.
+
+The rings use the counters of frame_buffer.py without locks: a counter is written after the data of its slots and
+has a single writer. This relies on the order of the stores being kept between processes (x86 and CPython on Linux).
+
+Actions from the database and the instrumentation are not supported in the workers (like core.py).
+"""
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator, TYPE_CHECKING
+import numpy as np
+
+from controller import Controller
+from data_handler import FrameResult
+from frame_buffer import FrameRingBuffer, ResultRingBuffer, buffer_size, result_buffer_size
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+POLL_INTERVAL = 0.0002  # seconds to wait when no ring has progressed
+
+
+def run_worker(frame_memory_name: str, result_memory_name: str, capacity: int, result_capacity: int, goals: dict,
+               params: dict) -> None:
+    """
+    Runs a Controller on the frames of a shared FrameRingBuffer until it is closed and writes the results into a
+    shared ResultRingBuffer, which is closed at the end (also on errors). Target of the worker processes.
+    """
+    frame_memory = shared_memory.SharedMemory(frame_memory_name)
+    result_memory = shared_memory.SharedMemory(result_memory_name)
+    precision = params.get('PRECISION', 'float64')
+    frames = FrameRingBuffer(capacity, 0, frame_memory.buf)
+    results = ResultRingBuffer(result_capacity, len(goals['ID']), precision, result_memory.buf)
+
+    try:
+        controller = Controller(goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'],
+                                CULLING_PARAMS=params.get('CULLING_PARAMS'), PRECISION=precision,
+                                BACKEND=params.get('BACKEND', 'numpy'))
+
+        for view in frames.batches():
+            for result in controller.process_view(view, compact=True):
+                while not results.write(result):
+                    time.sleep(POLL_INTERVAL)
+    finally:
+        results.close()
+        del frames, results  # the views of the buffers must be released before closing the shared memory
+        for memory in (frame_memory, result_memory):
+            try:
+                memory.close()
+            except BufferError:
+                pass  # views are still referenced by the traceback of an error, they are freed with the process
+
+
+class PredictionProcess:
+    """
+    A worker process with the shared ring buffers of its session.
+
+    Attributes:
+        frames (FrameRingBuffer): Frames from the parent to the worker (without actions).
+        results (ResultRingBuffer): Results from the worker to the parent.
+        process (multiprocessing.Process): The worker process, see run_worker.
+        producer (threading.Thread): The thread that writes the frames into the frame ring, see feed.
+        error (Exception): The error of the producer, None if there is none.
+    """
+
+    def __init__(self, goals: 'pd.DataFrame', params: dict, capacity: int = 1024, result_capacity: int = 256) -> None:
+        """
+        Parameters:
+            goals (pandas.DataFrame): DataFrame (or dict of columns) containing the positions and IDs of the goals.
+            params (dict): Parameters in the format of main.get_params.
+            capacity (int): Slots of the frame ring.
+            result_capacity (int): Slots of the result ring.
+        """
+        goals = {name: np.asarray(goals[name]) for name in ('ID', 'x', 'y', 'z')}
+        goal_count = len(goals['ID'])
+        precision = params.get('PRECISION', 'float64')
+
+        self.frame_memory = shared_memory.SharedMemory(create=True, size=buffer_size(capacity, 0))
+        self.result_memory = shared_memory.SharedMemory(create=True,
+                                                        size=result_buffer_size(result_capacity, goal_count))
+        self.frames = FrameRingBuffer(capacity, 0, self.frame_memory.buf)
+        self.results = ResultRingBuffer(result_capacity, goal_count, precision, self.result_memory.buf)
+        self.process = multiprocessing.Process(target=run_worker, daemon=True,
+                                               args=(self.frame_memory.name, self.result_memory.name, capacity,
+                                                     result_capacity, goals, params))
+        self.producer = None
+        self.error = None
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        self.process.start()
+
+    def feed(self, frames: Iterable[list]) -> None:
+        """ Starts a producer thread that writes the frames into the frame ring. """
+        self.producer = threading.Thread(target=self.produce, args=(frames,), daemon=True)
+        self.producer.start()
+
+    def produce(self, frames: Iterable[list]) -> None:
+        """
+        Writes the frames into the frame ring and closes it at the end, as failed on an error (like
+        DataEmitter.emit_to_buffer). Waits while all slots are in use. Target of the producer thread.
+        """
+        failed = True
+        try:
+            for data in frames:
+                while not self.frames.write(data[0], data[1], data[2:]):
+                    if self.stopped.wait(POLL_INTERVAL):
+                        return
+                if self.stopped.is_set():
+                    return
+            failed = False
+        except Exception as error:
+            self.error = error  # raised by run_sessions
+        finally:
+            self.frames.close(failed)
+
+    def close(self) -> None:
+        """ Stops the producer and the worker if they are still running and frees the shared memory. """
+        self.stopped.set()
+        if self.producer is not None:
+            self.producer.join()
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.process.pid is not None:
+            self.process.join()
+
+        self.frames = self.results = None  # release the views of the buffers
+        for memory in (self.frame_memory, self.result_memory):
+            memory.close()
+            memory.unlink()
+
+
+def run_sessions(sessions: list[tuple['pd.DataFrame', Iterable[list]]], params: dict, capacity: int = 1024,
+                 result_capacity: int = 256) -> Iterator[tuple[int, FrameResult]]:
+    """
+    Runs every session in its own worker process. A producer thread of each session feeds its frames into the ring,
+    the calling thread only collects the results.
+
+    Parameters:
+        sessions (list[tuple]): Goals (DataFrame or dict of columns) and frames (e.g. DataEmitter.frames without
+            database) of each session.
+        params (dict): Parameters in the format of main.get_params, the same for all sessions.
+        capacity (int): Slots of each frame ring.
+        result_capacity (int): Slots of each result ring.
+
+    Yields:
+        tuple[int, FrameResult]: Index of the session and its next result. The results of a session are in order.
+    """
+    workers = []
+    try:
+        for goals, _ in sessions:
+            workers.append(PredictionProcess(goals, params, capacity, result_capacity))
+        for worker, (_, frames) in zip(workers, sessions):
+            worker.start()
+            worker.feed(frames)
+
+        running = set(range(len(sessions)))
+        while running:
+            idle = True
+            for i in sorted(running):
+                worker = workers[i]
+                closed = worker.results.closed  # results written before closing are taken below
+                results = worker.results.take()
+                for result in results:
+                    yield i, result
+                if results:
+                    idle = False
+                elif closed:
+                    worker.process.join()
+                    if worker.error is not None:
+                        raise worker.error
+                    if worker.process.exitcode != 0:
+                        raise RuntimeError(f"worker of session {i} failed with exit code {worker.process.exitcode}.")
+                    running.discard(i)
+                elif not worker.process.is_alive() and not worker.results.closed:
+                    raise RuntimeError(f"worker of session {i} stopped without closing its results.")
+
+            if idle:
+                time.sleep(POLL_INTERVAL)
+    finally:
+        for worker in workers:
+            worker.close()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from main import get_params
+
+
+@dataclass
+class ReplayResult:
+    """ Dataclass for the results of a replay with F results and G goals.
+    Probabilities and distances are rounded like in the result dicts of Controller.process_data.
+
+    time: Timestamps of the results (F,).
+    hand_position: Stabilized hand wrist positions (F, 3).
+    goal_ids: IDs of all goals (G,).
+    in_result: True where a goal is part of the result, i.e. active and possible (F, G).
+    probability: Probabilities of the goals in percent (F, G). NaN where the goal is not in the result.
+    distance: Distances from the hand wrist to the goals in meters (F, G). NaN where the goal is not in the result.
+    sample_quantity: Sample quantities of the goals (F, G). -1 where the goal is not in the result.
+    uncat_prob: Probability of uncategorized goal (no goal) in percent (F,).
+    """
+    time: np.ndarray
+    hand_position: np.ndarray
+    goal_ids: np.ndarray
+    in_result: np.ndarray
+    probability: np.ndarray
+    distance: np.ndarray
+    sample_quantity: np.ndarray
+    uncat_prob: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def goal_column(self, goal_id: int) -> int:
+        """ Returns the column of a goal in the (F, G) arrays. """
+        return int(np.flatnonzero(self.goal_ids == goal_id)[0])
+
+
+def replay(df_goals: pd.DataFrame,
+           df_trajectories: pd.DataFrame,
+           df_actions: Optional[pd.DataFrame] = None,
+           params: Optional[dict] = None
+           ) -> ReplayResult:
+    """
+    Processes a recorded trajectory as fast as possible. The frames are the same as the frames of the DataEmitter,
+    but the controller is run directly in a loop without thread, queue or waiting.
+
+    Parameters:
+        df_goals (pandas.DataFrame): DataFrame containing the positions and IDs of the goals.
+        df_trajectories (pandas.DataFrame): DataFrame with the hand wrist positions recorded over time.
+        df_actions (pandas.DataFrame): DataFrame with the actions from the database. None if database is disabled.
+        params (dict): Parameters in the format of main.get_params. Defaults of main.get_params if None.
+
+    Returns:
+        ReplayResult: The results of all frames with a new prediction as arrays.
+    """
+    if params is None:
+        params = get_params(df_trajectories, df_actions is not None)
+
+    use_db = params['DATA_EMITTER_PARAMS'][0]
+    data_emitter = DataEmitter(None, df_trajectories, df_actions, params['DATA_EMITTER_PARAMS'])
+    controller = Controller(df_goals, use_db, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                            params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'], data_emitter.action_timeline,
+                            CULLING_PARAMS=params.get('CULLING_PARAMS'), PRECISION=params.get('PRECISION', 'float64'),
+                            BACKEND=params.get('BACKEND', 'numpy'))
+
+    store = controller.goal_store
+    size = len(store)
+
+    times, hand_positions, in_result, probabilities, distances, sample_quantities, uncat_probs = ([] for _ in range(7))
+    for data in data_emitter.frames():
+        result = controller.process_data_compact(data)
+        if result is None:
+            continue
+
+        columns = [store.row(goal_id) for goal_id in result.goal_ids.tolist()]
+
+        mask = np.zeros(size, dtype=bool)
+        mask[columns] = True
+        probability = np.full(size, np.nan)
+        probability[columns] = result.probability_percent()
+        distance = np.full(size, np.nan)
+        distance[columns] = np.round(result.distance, 2)
+        sample_quantity = np.full(size, -1)
+        sample_quantity[columns] = result.sample_quantity
+
+        times.append(result.time)
+        hand_positions.append(result.hand_position)
+        in_result.append(mask)
+        probabilities.append(probability)
+        distances.append(distance)
+        sample_quantities.append(sample_quantity)
+        uncat_probs.append(result.uncat_prob())
+
+    return ReplayResult(
+        time=np.array(times, dtype=np.int64),
+        hand_position=np.array(hand_positions, dtype=float).reshape(-1, 3),
+        goal_ids=store.num.copy(),
+        in_result=np.array(in_result, dtype=bool).reshape(-1, size),
+        probability=np.array(probabilities, dtype=float).reshape(-1, size),
+        distance=np.array(distances, dtype=float).reshape(-1, size),
+        sample_quantity=np.array(sample_quantities, dtype=int).reshape(-1, size),
+        uncat_prob=np.array(uncat_probs, dtype=float)
+    )
@@ -0,0 +1,130 @@
+"""
+Sinks for the results of a running predictor (see Controller.process_stream and Main.run).
+
+A long live session produces results without end, so the sinks keep a bounded amount of them: a callback, the latest
+results in a deque, a file or every n-th result. ListSink keeps all results and is meant for tests and short runs.
+Results can be dicts of Controller.process_data or FrameResults of Controller.process_data_compact.
+"""
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Optional, TextIO, Union
+
+from data_handler import FrameResult
+
+Result = Union[dict, FrameResult]
+
+
+class Sink(ABC):
+    """ Base class of the sinks. A sink can be used as context manager, which closes it at the end. """
+
+    @abstractmethod
+    def write(self, result: Result) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Sink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CallbackSink(Sink):
+    """ A sink that calls a function with every result, e.g. to send it to a robot controller. """
+
+    def __init__(self, callback: Callable[[Result], None]) -> None:
+        self.callback = callback
+
+    def write(self, result: Result) -> None:
+        self.callback(result)
+
+
+class DequeSink(Sink):
+    """
+    A sink that keeps the latest results, older results are dropped.
+
+    Attributes:
+        results (collections.deque): The latest results, at most maxlen.
+        count (int): Number of all written results.
+    """
+
+    def __init__(self, maxlen: int = 100) -> None:
+        if maxlen < 1:
+            raise ValueError("maxlen must be greater than 0.")
+
+        self.results = deque(maxlen=maxlen)
+        self.count = 0
+
+    def write(self, result: Result) -> None:
+        self.results.append(result)
+        self.count += 1
+
+
+class ListSink(Sink):
+    """
+    A sink that keeps all results. The memory grows with the length of the session, so only use it for tests and
+    recordings of limited length.
+
+    Attributes:
+        results (list): All written results.
+    """
+
+    def __init__(self) -> None:
+        self.results = []
+
+    def write(self, result: Result) -> None:
+        self.results.append(result)
+
+
+class FileSink(Sink):
+    """ A sink that writes every result as one JSON line (FrameResults in the dict format of process_data). """
+
+    def __init__(self, path: str, flush: bool = False) -> None:
+        """
+        Parameters:
+            path (str): Path of the file. An existing file is overwritten.
+            flush (bool): True to flush the file after every result, e.g. for other processes that follow the file.
+        """
+        self.path = path
+        self.flush = flush
+        self.file: Optional[TextIO] = open(path, 'w')
+
+    def write(self, result: Result) -> None:
+        if isinstance(result, FrameResult):
+            result = result.to_dict()
+        self.file.write(json.dumps(result) + '\n')
+        if self.flush:
+            self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class DownsampleSink(Sink):
+    """ A sink that passes every n-th result (the first, the n+1-th, ...) to another sink. """
+
+    def __init__(self, sink: Sink, every: int) -> None:
+        """
+        Parameters:
+            sink (Sink): The sink that receives the results.
+            every (int): Distance between the passed results.
+        """
+        if every < 1:
+            raise ValueError("every must be greater than 0.")
+
+        self.sink = sink
+        self.every = every
+        self.count = 0
+
+    def write(self, result: Result) -> None:
+        if self.count % self.every == 0:
+            self.sink.write(result)
+        self.count += 1
+
+    def close(self) -> None:
+        self.sink.close()
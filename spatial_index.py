@@ -0,0 +1,85 @@
+import itertools
+import numpy as np
+
+
+class GoalGrid:
+    """
+    A class that sorts goal positions into a uniform grid of cubic cells. A ball query only visits the cells that
+    overlap the bounding box of the ball, so its cost depends on the goals near the center and not on all goals.
+    The goals never move, so the grid is built once.
+    """
+
+    def __init__(self, positions: np.ndarray, cell_size: float) -> None:
+        """
+        Parameters:
+            positions (numpy.ndarray): Positions of the goals (G, 3). The rows are returned by the queries.
+            cell_size (float): Edge length of the cells in meters.
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be greater than 0.")
+
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.cell_size = cell_size
+
+        cells = np.floor(self.positions / cell_size).astype(np.int64)
+        keys, inverse = np.unique(cells, axis=0, return_inverse=True)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(keys)))[:-1]
+        self.cells = {tuple(key): rows for key, rows in zip(keys.tolist(), np.split(order, bounds))}
+
+    def query_ball(self, center: np.ndarray, radius: float) -> np.ndarray:
+        """ Returns the rows of the goals within radius around center in ascending order. """
+        low = np.floor((center - radius) / self.cell_size).astype(np.int64)
+        high = np.floor((center + radius) / self.cell_size).astype(np.int64)
+
+        cell_count = np.prod(high - low + 1)
+        if cell_count > len(self.cells):
+            candidates = [rows for key, rows in self.cells.items() if np.all((low <= key) & (key <= high))]
+        else:
+            ranges = (range(low[axis], high[axis] + 1) for axis in range(3))
+            candidates = [self.cells[key] for key in itertools.product(*ranges) if key in self.cells]
+
+        if not candidates:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = np.sort(np.concatenate(candidates))
+        inside = np.sum((self.positions[rows] - center) ** 2, axis=1) <= radius ** 2
+        return rows[inside]
+
+
+class ConeCulling:
+    """
+    A class that selects the goals in front of the hand: within a radius around the hand wrist and inside a cone
+    around the measured direction. Only these goals are evaluated by the prediction model.
+    """
+
+    def __init__(self, positions: np.ndarray, radius: float, cone_angle: float) -> None:
+        """
+        Parameters:
+            positions (numpy.ndarray): Positions of the goals (G, 3).
+            radius (float): Maximum distance of a goal to the hand wrist in meters.
+            cone_angle (float): Maximum angle between the measured direction and the direction to a goal in radians.
+        """
+        if radius <= 0:
+            raise ValueError("radius must be greater than 0.")
+        if cone_angle <= 0 or cone_angle > np.pi:
+            raise ValueError("cone_angle must be between 0 and pi.")
+
+        self.grid = GoalGrid(positions, radius)
+        self.radius = radius
+        self.cos_cone_angle = np.cos(cone_angle)
+
+    def candidates(self, point: np.ndarray, direction: np.ndarray) -> np.ndarray:
+        """
+        Returns the rows of the goals in the cone in ascending order.
+
+        Parameters:
+            point (numpy.ndarray): Hand wrist position, the apex of the cone.
+            direction (numpy.ndarray): Measured direction of the hand, the axis of the cone.
+        """
+        rows = self.grid.query_ball(point, self.radius)
+
+        to_goals = self.grid.positions[rows] - point
+        lengths = np.linalg.norm(to_goals, axis=1) * np.linalg.norm(direction)
+        inside = to_goals @ direction >= self.cos_cone_angle * lengths
+        return rows[inside]
@@ -0,0 +1,243 @@
+"""
+Benchmark of Controller.process_data with synthetic, recorded and study data.
+
+Every case is run once to measure the latency of each frame and once with tracemalloc to measure the peak memory.
+The results can be saved as baseline (JSON) and later runs can be compared against it.
+
+Run from the root folder of the repository:
+    python -m utilities.benchmark --save results.json
+    python -m utilities.benchmark --compare results.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from controller import Controller
+from data_emitter import DataEmitter
+from kernels import BACKENDS
+from main import get_params
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+GOAL_COUNTS = (10, 100, 1000, 10000)
+NOISE_REDUCERS = ((0, 0), (1, 10), (2, 10), (2, 25), (3, 0.3))
+
+# metrics where a higher value is a slowdown, and where a lower value is a slowdown
+LATENCY_METRICS = ('p50_us', 'p90_us', 'p99_us')
+THROUGHPUT_METRICS = ('fps',)
+
+
+@dataclass
+class BenchmarkCase:
+    """ Dataclass for one benchmark case.
+    name: Unique name of the case, used as key in the baseline.
+    df_goals: DataFrame containing the positions and IDs of the goals.
+    df_trajectories: DataFrame with the hand wrist positions recorded over time.
+    df_actions: DataFrame with the actions from the database. None if database is disabled.
+    params: Parameters in the format of main.get_params.
+    """
+    name: str
+    df_goals: pd.DataFrame
+    df_trajectories: pd.DataFrame
+    df_actions: Optional[pd.DataFrame]
+    params: dict
+
+
+def synthetic_goals(count: int, rng: np.random.Generator) -> pd.DataFrame:
+    """ Goals with random positions on the table. """
+    return pd.DataFrame({
+        'ID': np.arange(1, count + 1),
+        'x': rng.uniform(0.1, 0.9, count),
+        'y': rng.uniform(-0.6, 0.6, count),
+        'z': np.full(count, 0.03)
+    })
+
+
+def synthetic_trajectory(target: np.ndarray, frames: int, rng: np.random.Generator) -> pd.DataFrame:
+    """ A curved movement of the hand wrist to a target with tracking noise, one row every 17 ms. """
+    s = np.linspace(0.0, 1.0, frames)[:, np.newaxis]
+    start = np.array([0.0, 0.0, 0.3])
+    control = (start + target) / 2 + np.array([0.0, 0.2, 0.2])
+    points = (1 - s) ** 2 * start + 2 * (1 - s) * s * control + s ** 2 * target
+    points += rng.normal(0.0, 0.002, points.shape)
+    return pd.DataFrame({'time': np.arange(frames) * 17, 'x': points[:, 0], 'y': points[:, 1], 'z': points[:, 2]})
+
+
+def build_cases(goal_counts: tuple = GOAL_COUNTS,
+                noise_reducers: tuple = NOISE_REDUCERS,
+                frames: int = 500,
+                seed: int = 0
+                ) -> list[BenchmarkCase]:
+    """
+    Builds the synthetic cases (all combinations of goal counts and noise reducers) and the cases with recorded data
+    and study data (with and without database).
+    """
+    rng = np.random.default_rng(seed)
+    cases = []
+
+    for count in goal_counts:
+        df_goals = synthetic_goals(count, rng)
+        target = df_goals[['x', 'y', 'z']].to_numpy()[0]
+        df_trajectories = synthetic_trajectory(target, frames, rng)
+        for noise_reducer in noise_reducers:
+            params = get_params(df_trajectories)
+            params['NOISE_REDUCER_PARAMS'] = noise_reducer
+            cases.append(BenchmarkCase(f'synthetic_g{count}_nr{noise_reducer[0]}_{noise_reducer[1]}', df_goals,
+                                       df_trajectories, None, params))
+
+    recorded_folder = os.path.join(DATA_FOLDER, 'test_data_recorded')
+    df_trajectories = pd.read_csv(os.path.join(recorded_folder, 'recorded_trajectories', 'configuration1',
+                                               '10_config1_target2.csv'))
+    cases.append(BenchmarkCase('recorded_config1', pd.read_csv(os.path.join(recorded_folder, 'recorded_goals',
+                                                                            'goal_config1.csv')),
+                               df_trajectories, None, get_params(df_trajectories)))
+
+    study_folder = os.path.join(DATA_FOLDER, 'test_data_study')
+    df_goals = pd.read_csv(os.path.join(study_folder, 'goals.csv'))
+    df_trajectories = pd.read_csv(os.path.join(study_folder, 'assemble_right_hand', '41212_2_168_r.csv'))
+    df_actions = pd.read_csv(os.path.join(study_folder, 'assemble_actions', '41212_2_168.csv'))
+    for use_db in (False, True):
+        cases.append(BenchmarkCase(f'study_41212_2_168_db{int(use_db)}', df_goals, df_trajectories,
+                                   df_actions if use_db else None, get_params(df_trajectories, use_db)))
+
+    return cases
+
+
+def run_frames(case: BenchmarkCase, frames: list, timer) -> list:
+    """ Processes all frames with a new controller and returns the timer value after each frame. """
+    data_emitter = DataEmitter(None, case.df_trajectories, case.df_actions, case.params['DATA_EMITTER_PARAMS'])
+    controller = Controller(case.df_goals, case.df_actions is not None, case.params['NOISE_REDUCER_PARAMS'],
+                            case.params['MODEL_PARAMS'], case.params['PROBABILITY_PARAMS'],
+                            case.params['ACTION_HANDLER_PARAMS'], data_emitter.action_timeline,
+                            CULLING_PARAMS=case.params.get('CULLING_PARAMS'),
+                            PRECISION=case.params.get('PRECISION', 'float64'),
+                            BACKEND=case.params.get('BACKEND', 'numpy'))
+
+    stamps = [timer()]
+    with contextlib.redirect_stdout(io.StringIO()):  # actions are printed
+        for data in frames:
+            try:
+                controller.process_data(data)
+            except SystemExit:  # no goals left
+                break
+            stamps.append(timer())
+    return stamps
+
+
+def run_case(case: BenchmarkCase) -> dict:
+    """
+    Runs a benchmark case.
+
+    Returns:
+        dict: frames, latency percentiles and maximum in microseconds, frames per second and peak memory in KiB.
+    """
+    data_emitter = DataEmitter(None, case.df_trajectories, case.df_actions, case.params['DATA_EMITTER_PARAMS'])
+    frames = list(data_emitter.frames())
+
+    stamps = np.array(run_frames(case, frames, time.perf_counter_ns))
+    latencies = np.diff(stamps) / 1000
+
+    tracemalloc.start()
+    run_frames(case, frames, lambda: 0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = (stamps[-1] - stamps[0]) / 1e9
+    p50, p90, p99 = np.percentile(latencies, (50, 90, 99)) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        'frames': len(latencies),
+        'p50_us': round(float(p50), 1),
+        'p90_us': round(float(p90), 1),
+        'p99_us': round(float(p99), 1),
+        'max_us': round(float(latencies.max()), 1) if len(latencies) else 0.0,
+        'fps': round(len(latencies) / total, 1) if total > 0 else 0.0,
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares results with a baseline.
+
+    Parameters:
+        results (dict): Results of run_case by case name.
+        baseline (dict): Results of a previous run by case name.
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list[str]: A message for every metric that is slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+
+        for metric in LATENCY_METRICS:
+            if reference[metric] > 0 and result[metric] > reference[metric] * (1 + threshold):
+                regressions.append(f'{name}: {metric} {reference[metric]} -> {result[metric]}')
+
+        for metric in THROUGHPUT_METRICS:
+            if result[metric] < reference[metric] / (1 + threshold):
+                regressions.append(f'{name}: {metric} {reference[metric]} -> {result[metric]}')
+
+    return regressions
+
+
+def print_table(results: dict) -> None:
+    header = f"{'case':<36}{'frames':>8}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}{'fps':>10}" \
+             f"{'peak KiB':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<36}{r['frames']:>8}{r['p50_us']:>10}{r['p90_us']:>10}{r['p99_us']:>10}{r['max_us']:>10}"
+              f"{r['fps']:>10}{r['peak_kib']:>11}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of Controller.process_data.")
+    parser.add_argument('--goals', type=int, nargs='+', default=list(GOAL_COUNTS), help="goal counts")
+    parser.add_argument('--frames', type=int, default=500, help="frames of the synthetic trajectories")
+    parser.add_argument('--filter', default='', help="only run cases that contain this string")
+    parser.add_argument('--save', help="save the results as baseline (JSON)")
+    parser.add_argument('--compare', help="compare the results with a baseline (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument('--backend', choices=BACKENDS, default='numpy', help="backend of the goal update")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for case in build_cases(tuple(args.goals), frames=args.frames):
+        if args.filter in case.name:
+            case.params['BACKEND'] = args.backend
+            results[case.name] = run_case(case)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'backend': args.backend,
+                       'cases': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['cases']
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print("SLOWDOWN", message)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+"""
+Parameter sweep over NOISE_REDUCER_PARAMS, MODEL_PARAMS and PROBABILITY_PARAMS.
+
+Every configuration is evaluated on a dataset (generated, recorded or study) with the criteria of the test harness
+(determine_status in UTest/test_generated_ip.py) and the configurations are ranked by their results.
+
+Work that does not depend on all parameters is shared:
+    - the frames and the goals of each frame (actions) are recorded once per trajectory,
+    - each trajectory is smoothed once per noise setting,
+    - the frames that pass MIN_DIST and the prediction model are calculated once per model setting, all probability
+      settings are evaluated on them at once.
+Trajectories and noise settings are distributed to worker processes.
+
+Run from the root folder of the repository:
+    python -m utilities.parameter_sweep --dataset generated --limit 200
+    python -m utilities.parameter_sweep --dataset recorded --random 40 --save sweep.csv
+"""
+import argparse
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from UTest.test_generated_ip import evaluate_replay_result
+from action_handler import ActionHandler
+from controller import is_bad_data, process_goal_df, select_noise_reducer
+from data_emitter import DataEmitter
+from data_handler import DataHandler
+from dataset_cache import read_csv
+from goal_store import GoalStore
+from main import get_params, get_study_actions, get_study_goals, get_study_trajectories
+from prediction_model import calc_prediction_batch, distance, point_direction
+from probability_evaluator import calc_probabilities_masked
+from replay import ReplayResult
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+PARAM_NAMES = ('NOISE_REDUCER_PARAMS', 'MODEL_PARAMS', 'PROBABILITY_PARAMS')
+DEFAULT_SPACE = {
+    'NOISE_REDUCER_PARAMS': [(0, 0), (1, 10), (2, 10), (2, 25), (3, 0.3)],
+    'MODEL_PARAMS': [(0.01, 0.0), (0.01, 0.15), (0.025, 0.0), (0.025, 0.15)],
+    'PROBABILITY_PARAMS': [(0.005, 0.85, 0.25), (0.005, 0.85, 1.0), (0.005, 0.85, 4.0)]
+}
+STATUSES = ('Success', 'Pass1', 'Pass2', 'Failure')
+
+# number of goal trajectories (frames x goals) that are calculated at once by the prediction model
+PREDICTION_CHUNK = 1 << 16
+
+# recording of the last trajectory of a worker process, reused for all of its noise settings
+_recording_cache = {}
+
+
+@dataclass
+class SweepTrial:
+    """ Dataclass for one trajectory of a dataset.
+    name: Name of the trajectory file.
+    path_goals, path_trajectories: Paths of the CSV files.
+    path_actions: Path of the actions of the database. None if database is disabled.
+    target: ID of the target goal. None for study data, where the target is the future action of each frame.
+    is_assemble, hand: Task and tracked hand of study data.
+    """
+    name: str
+    path_goals: str
+    path_trajectories: str
+    path_actions: Optional[str] = None
+    target: Optional[int] = None
+    is_assemble: bool = True
+    hand: str = 'right'
+
+
+@dataclass
+class TrialRecording:
+    """ Dataclass for the frames of a trajectory that do not depend on the parameters (K frames, G goals).
+    time: Timestamps of the frames (K,).
+    points: Hand wrist positions of the frames (K, 3).
+    goal_ids: IDs of the goals (G,).
+    goal_pos: Positions of the goals (G, 3).
+    masks: Distinct masks of the goals that are evaluated and part of the result (M, G).
+    mask_index: Index into masks for each frame (K,).
+    future_target: Target of the future action of each frame, -1 if there is none (K,).
+    """
+    time: np.ndarray
+    points: np.ndarray
+    goal_ids: np.ndarray
+    goal_pos: np.ndarray
+    masks: np.ndarray
+    mask_index: np.ndarray
+    future_target: np.ndarray
+
+
+def grid_search(space: dict) -> list[tuple]:
+    """ Returns all combinations of the search space as (NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS). """
+    return list(itertools.product(*(tuple(map(tuple, space[name])) for name in PARAM_NAMES)))
+
+
+def random_search(space: dict, count: int, seed: int = 0) -> list[tuple]:
+    """ Returns count different combinations of the search space, drawn at random. """
+    configs = grid_search(space)
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(configs), size=min(count, len(configs)), replace=False)
+    return [configs[i] for i in sorted(chosen)]
+
+
+def load_trials(dataset: str, limit: Optional[int] = None, seed: int = 0) -> list[SweepTrial]:
+    """
+    Lists the trajectories of a dataset.
+
+    Parameters:
+        dataset (str): 'generated', 'recorded' (trajectories to a single target) or 'study'.
+        limit (int): Maximum number of trajectories, drawn at random. None for all.
+        seed (int): Seed for drawing the trajectories.
+    """
+    trials = []
+    if dataset == 'generated':
+        folder = os.path.join(DATA_FOLDER, 'test_data_generated')
+        for path in sorted(glob.glob(os.path.join(folder, 'test_trajectory', '*.csv'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            goal_prefix = '_'.join(name.split('_')[:2])
+            trials.append(SweepTrial(name, os.path.join(folder, 'test_goal', f'{goal_prefix}.csv'), path,
+                                     target=int(name.split('_')[2])))
+
+    elif dataset == 'recorded':
+        folder = os.path.join(DATA_FOLDER, 'test_data_recorded')
+        for path in sorted(glob.glob(os.path.join(folder, 'recorded_trajectories', 'configuration*', '*.csv'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            configuration = os.path.basename(os.path.dirname(path)).replace('configuration', '')
+            kind = name.split('_')[-1]
+            if kind.startswith('target'):  # other recordings have no single target
+                path_goals = os.path.join(folder, 'recorded_goals', f'goal_config{configuration}.csv')
+                trials.append(SweepTrial(name, path_goals, path, target=int(kind[len('target'):])))
+
+    elif dataset == 'study':
+        for is_assemble, task in ((True, 'assemble'), (False, 'dismantle')):
+            for path_actions in sorted(glob.glob(os.path.join(DATA_FOLDER, 'test_data_study', f'{task}_actions',
+                                                              '*.csv'))):
+                test_id = os.path.splitext(os.path.basename(path_actions))[0]
+                for hand in ('right', 'left'):
+                    path = os.path.join(DATA_FOLDER, '..', get_study_trajectories(test_id, is_assemble, hand))
+                    if os.path.exists(path):
+                        trials.append(SweepTrial(f'{task}_{test_id}_{hand[0]}',
+                                                 os.path.join(DATA_FOLDER, '..', get_study_goals(test_id, is_assemble)),
+                                                 path, os.path.join(DATA_FOLDER, '..',
+                                                                    get_study_actions(test_id, is_assemble)),
+                                                 is_assemble=is_assemble, hand=hand))
+    else:
+        raise ValueError("dataset must be 'generated', 'recorded' or 'study'.")
+
+    if limit is not None and limit < len(trials):
+        chosen = np.random.default_rng(seed).choice(len(trials), size=limit, replace=False)
+        trials = [trials[i] for i in sorted(chosen)]
+    return trials
+
+
+def record_trial(trial: SweepTrial) -> TrialRecording:
+    """
+    Runs the frames of the DataEmitter through the action handler like Controller.step and records the goals of each
+    frame. The actions do not depend on the parameters, so this is done once per trajectory.
+    """
+    df_trajectories = read_csv(trial.path_trajectories)
+    df_actions = read_csv(trial.path_actions) if trial.path_actions is not None else None
+    use_db = df_actions is not None
+    params = get_params(df_trajectories, use_db, trial.is_assemble, trial.hand)
+
+    data_emitter = DataEmitter(None, df_trajectories, df_actions, params['DATA_EMITTER_PARAMS'])
+    store = GoalStore.from_goal_data(process_goal_df(read_csv(trial.path_goals)))
+    data_handler = DataHandler(store, use_db)
+    action_handler = ActionHandler(data_handler, params['ACTION_HANDLER_PARAMS'], data_emitter.action_timeline)
+
+    times, points, mask_index, future_target = [], [], [], []
+    masks, version = [], None
+    with contextlib.redirect_stdout(io.StringIO()):  # actions are printed
+        for data in data_emitter.frames():
+            if is_bad_data(data):
+                continue
+
+            data_handler.timestamp = data[0]
+            data_handler.actions = []
+            try:
+                for d in data[2:]:
+                    action_handler.handle_action(d)
+            except SystemExit:  # no goals left
+                break
+            if store.count_active() <= 0:
+                break
+
+            if store.version != version:
+                masks.append(store.mask(use_db).copy())
+                version = store.version
+
+            times.append(data[0])
+            points.append(data[1])
+            mask_index.append(len(masks) - 1)
+            future_action = data_handler.future_action
+            future_target.append(future_action['target'] if future_action is not None else -1)
+
+    return TrialRecording(
+        time=np.array(times, dtype=np.int64),
+        points=np.array(points, dtype=float).reshape(-1, 3),
+        goal_ids=store.num.copy(),
+        goal_pos=store.pos.copy(),
+        masks=np.array(masks, dtype=bool).reshape(-1, len(store)),
+        mask_index=np.array(mask_index, dtype=int),
+        future_target=np.array(future_target, dtype=int)
+    )
+
+
+def smooth(points: np.ndarray, NOISE_REDUCER_PARAMS: tuple) -> np.ndarray:
+    """ Returns the stabilized points of Controller.step for a whole trajectory. """
+    noise_reducer = select_noise_reducer(NOISE_REDUCER_PARAMS)
+    return points if noise_reducer is None else noise_reducer.filter(points)
+
+
+def gate_frames(points: np.ndarray, min_distance: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Selects the frames at which PredictionModel.update calculates a prediction.
+
+    Returns:
+        tuple: The indices of the frames (F,) and the hand points and directions before each of them (F, 3) as
+            prev_p, prev_dp. The current points are points[frames].
+    """
+    frames, prev_points, prev_directions = [], [], []
+    if len(points) < 2:
+        return np.zeros(0, dtype=int), np.zeros((0, 3)), np.zeros((0, 3))
+
+    prev_p, curr_p = points[0], points[1]
+    curr_dp = point_direction(prev_p, curr_p)
+    for index in range(2, len(points)):
+        next_p = points[index]
+        if distance(curr_p, next_p) < min_distance:
+            continue
+
+        prev_points.append(curr_p)
+        prev_directions.append(curr_dp)
+        frames.append(index)
+        curr_dp = point_direction(curr_p, next_p)
+        curr_p = next_p
+
+    return (np.array(frames, dtype=int), np.array(prev_points).reshape(-1, 3),
+            np.array(prev_directions).reshape(-1, 3))
+
+
+def predict(points: np.ndarray, frames: np.ndarray, prev_p: np.ndarray, prev_dp: np.ndarray, goal_pos: np.ndarray,
+            min_progression: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculates the prediction model for all gated frames and all goals.
+
+    Returns:
+        tuple: The distances, angles and hand_towards_goal of the goals at each frame (F, G).
+    """
+    curr_p = points[frames]
+    curr_dp = np.array([point_direction(p, c) for p, c in zip(prev_p, curr_p)]).reshape(-1, 3)
+
+    dist = np.empty((len(frames), len(goal_pos)))
+    angle = np.empty((len(frames), len(goal_pos)))
+    hand_towards_goal = np.empty((len(frames), len(goal_pos)), dtype=bool)
+    step = max(1, PREDICTION_CHUNK // max(1, len(goal_pos)))
+    for start in range(0, len(frames), step):
+        chunk = slice(start, start + step)
+        chunk_goal_pos = np.broadcast_to(goal_pos, (len(frames[chunk]),) + goal_pos.shape)
+        batch = calc_prediction_batch(prev_p[chunk], curr_p[chunk], prev_dp[chunk], curr_dp[chunk], chunk_goal_pos,
+                                      min_progression)
+        dist[chunk], angle[chunk], hand_towards_goal[chunk] = batch.dist, batch.angle, batch.hand_towards_goal
+    return dist, angle, hand_towards_goal
+
+
+def evaluate_probability_settings(dist: np.ndarray,
+                                  angle: np.ndarray,
+                                  hand_towards_goal: np.ndarray,
+                                  valid: np.ndarray,
+                                  probability_settings: list[tuple]
+                                  ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Runs ProbabilityEvaluator.update for all probability settings at once. Goals outside the valid mask of a frame
+    keep their values like the goals that are not evaluated by the controller.
+
+    Parameters:
+        dist, angle, hand_towards_goal (numpy.ndarray): Results of the prediction model (F, G).
+        valid (numpy.ndarray): Goals that are evaluated at each frame (F, G).
+        probability_settings (list[tuple]): PROBABILITY_PARAMS of each setting (P).
+
+    Returns:
+        tuple: Probabilities and sample quantities after each frame (P, F, G).
+    """
+    settings = np.array(probability_settings, dtype=float).reshape(-1, 3)
+    min_variance, max_variance, omega = (settings[:, i:i + 1] for i in range(3))
+
+    shape = (len(settings), dist.shape[1])
+    prob, sq = np.zeros(shape), np.zeros(shape, dtype=int)
+    probabilities = np.empty((len(settings),) + dist.shape)
+    sample_quantities = np.empty((len(settings),) + dist.shape, dtype=int)
+    for frame in range(len(dist)):
+        new_prob, new_sq = calc_probabilities_masked(angle[frame], hand_towards_goal[frame], dist[frame], prob, sq,
+                                                     valid[frame], min_variance, max_variance, omega)
+        prob = np.where(valid[frame], new_prob, prob)
+        sq = np.where(valid[frame], new_sq, sq)
+        probabilities[:, frame], sample_quantities[:, frame] = prob, sq
+
+    return probabilities, sample_quantities
+
+
+def to_replay_result(recording: TrialRecording, frames: np.ndarray, points: np.ndarray, dist: np.ndarray,
+                     valid: np.ndarray, probabilities: np.ndarray, sample_quantities: np.ndarray) -> ReplayResult:
+    """ Packages the results of one setting like replay.replay. """
+    probability = np.round(probabilities * 100, 2)
+    total = np.cumsum(np.where(valid, probability, 0.0), axis=1)[:, -1] if valid.shape[1] else np.zeros(len(valid))
+    return ReplayResult(
+        time=recording.time[frames],
+        hand_position=points[frames],
+        goal_ids=recording.goal_ids,
+        in_result=valid,
+        probability=np.where(valid, probability, np.nan),
+        distance=np.where(valid, np.round(dist, 2), np.nan),
+        sample_quantity=np.where(valid, sample_quantities, -1),
+        uncat_prob=np.maximum(0, np.round(100 - total, 2))
+    )
+
+
+def evaluate_trial(trial: SweepTrial, recording: TrialRecording, frames: np.ndarray, result: ReplayResult) -> list:
+    """
+    Evaluates a result with the criteria of the test harness. Study data is split into segments with the same
+    future target, each segment is evaluated on its own.
+
+    Returns:
+        list[tuple]: The evaluation of evaluate_probabilities for the target of the trial or of every segment.
+    """
+    if trial.target is not None:
+        return [evaluate_replay_result(result, trial.target - 1)]
+
+    evaluations = []
+    targets = recording.future_target[frames]
+    boundaries = np.flatnonzero(np.diff(targets)) + 1
+    for segment in np.split(np.arange(len(frames)), boundaries):
+        if len(segment) == 0 or targets[segment[0]] not in result.goal_ids:
+            continue
+        segment_result = ReplayResult(result.time[segment], result.hand_position[segment], result.goal_ids,
+                                      result.in_result[segment], result.probability[segment],
+                                      result.distance[segment], result.sample_quantity[segment],
+                                      result.uncat_prob[segment])
+        evaluations.append(evaluate_replay_result(segment_result, int(targets[segment[0]]) - 1))
+    return evaluations
+
+
+def run_unit(trial: SweepTrial, NOISE_REDUCER_PARAMS: tuple, model_settings: list[tuple],
+             probability_settings: list[tuple]) -> dict:
+    """
+    Evaluates all configurations of one trajectory and one noise setting. Runs in a worker process.
+
+    Returns:
+        dict: The evaluations of each (MODEL_PARAMS, PROBABILITY_PARAMS).
+    """
+    recording = _recording_cache.get(trial.name)
+    if recording is None:
+        _recording_cache.clear()
+        recording = _recording_cache[trial.name] = record_trial(trial)
+
+    points = smooth(recording.points, NOISE_REDUCER_PARAMS)
+    evaluations = {}
+    gated = {}
+    for MODEL_PARAMS in model_settings:
+        min_distance, min_progression = MODEL_PARAMS
+        if min_distance not in gated:
+            gated[min_distance] = gate_frames(points, min_distance)
+        frames, prev_p, prev_dp = gated[min_distance]
+
+        dist, angle, hand_towards_goal = predict(points, frames, prev_p, prev_dp, recording.goal_pos, min_progression)
+        valid = recording.masks[recording.mask_index[frames]]
+        probabilities, sample_quantities = evaluate_probability_settings(dist, angle, hand_towards_goal, valid,
+                                                                         probability_settings)
+
+        for index, PROBABILITY_PARAMS in enumerate(probability_settings):
+            result = to_replay_result(recording, frames, points, dist, valid, probabilities[index],
+                                      sample_quantities[index])
+            evaluations[(MODEL_PARAMS, PROBABILITY_PARAMS)] = evaluate_trial(trial, recording, frames, result)
+
+    return evaluations
+
+
+def sweep(trials: list[SweepTrial], configs: list[tuple], workers: int = 1) -> pd.DataFrame:
+    """
+    Evaluates configurations on trajectories.
+
+    Parameters:
+        trials (list[SweepTrial]): The trajectories of a dataset.
+        configs (list[tuple]): Configurations as (NOISE_REDUCER_PARAMS, MODEL_PARAMS, PROBABILITY_PARAMS).
+        workers (int): Number of worker processes. 1 runs everything in this process.
+
+    Returns:
+        pandas.DataFrame: One row per configuration with the amount of each status, ranked from best to worst.
+    """
+    # configurations grouped by noise setting; model and probability settings of a noise setting are combined
+    groups = {}
+    for noise, model, probability in configs:
+        models, probabilities = groups.setdefault(tuple(noise), ({}, {}))
+        models[tuple(model)] = None
+        probabilities[tuple(probability)] = None
+
+    units = [(trial, noise, list(models), list(probabilities))
+             for trial in trials for noise, (models, probabilities) in groups.items()]
+
+    if workers > 1:
+        chunksize = max(1, len(units) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_unit, *zip(*units), chunksize=chunksize))
+    else:
+        results = [run_unit(*unit) for unit in units]
+
+    evaluations = {tuple(map(tuple, config)): [] for config in configs}
+    for (_, noise, _, _), unit_result in zip(units, results):
+        for (model, probability), trial_evaluations in unit_result.items():
+            config = (noise, model, probability)
+            if config in evaluations:
+                evaluations[config] += trial_evaluations
+
+    return rank(evaluations)
+
+
+def rank(evaluations: dict) -> pd.DataFrame:
+    """
+    Ranks the configurations by the amount of Success, Pass1 and Pass2, then by the mean distance at which the target
+    reached 60% (earlier is better).
+    """
+    rows = []
+    for (noise, model, probability), results in evaluations.items():
+        statuses = [status for _, _, _, _, status, _ in results]
+        distances_60 = [distance_60 for _, _, _, distance_60, _, _ in results if distance_60 is not None]
+        row = {'NOISE_REDUCER_PARAMS': noise, 'MODEL_PARAMS': model, 'PROBABILITY_PARAMS': probability}
+        row.update({status: statuses.count(status) for status in STATUSES})
+        row['tests'] = len(results)
+        row['mean_distance_60'] = round(float(np.mean(distances_60)), 3) if distances_60 else 0.0
+        rows.append(row)
+
+    table = pd.DataFrame(rows, columns=list(PARAM_NAMES) + list(STATUSES) + ['tests', 'mean_distance_60'])
+    table = table.sort_values(['Success', 'Pass1', 'Pass2', 'mean_distance_60'], ascending=False, kind='stable')
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parameter sweep with the criteria of the test harness.")
+    parser.add_argument('--dataset', choices=('generated', 'recorded', 'study'), default='recorded')
+    parser.add_argument('--space', help="search space (JSON) with lists of tuples for " + ", ".join(PARAM_NAMES))
+    parser.add_argument('--random', type=int, help="evaluate this many random configurations instead of the grid")
+    parser.add_argument('--limit', type=int, help="maximum number of trajectories, drawn at random")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--top', type=int, default=20, help="number of printed configurations")
+    parser.add_argument('--save', help="save the ranked table (CSV)")
+    args = parser.parse_args(argv)
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as file:
+            space = json.load(file)
+
+    configs = random_search(space, args.random, args.seed) if args.random else grid_search(space)
+    trials = load_trials(args.dataset, args.limit, args.seed)
+    print(f"{len(configs)} configurations on {len(trials)} trajectories ({args.dataset})")
+
+    table = sweep(trials, configs, args.workers)
+    print(table.head(args.top).to_string(index=False))
+
+    if args.save:
+        table.to_csv(args.save, index=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
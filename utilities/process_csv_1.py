@@ -1,80 +1,310 @@
-import pandas as pd
+"""
+Cleans raw hand tracking exports (rows of time, source, hand, x, y, z and sometimes more fields) into one trajectory
+per hand with the columns time, x, y, z sorted by time.
+
+The export is read in chunks of a fixed number of rows and validated with array operations. Each chunk is split by
+hand, sorted and spilled to a temporary run file. The runs are merged block by block into the outputs, so the memory
+does not depend on the size of the export. Bad rows (time no unsigned integer, position no finite float32 or hand
+neither right nor left) are removed and counted in a report. Times are converted to integers without float, so
+timestamps above 2**53 are exact.
+
+Run from the root folder of the repository:
+    python -m utilities.process_csv_1 data/test_data_recorded/hand_tracking.csv --format csv
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from decimal import Decimal
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
 import numpy as np
-import csv
-
-#select trajectory number
-path = r'../data/test_data_recorded/hand_tracking.csv'
-# correcting parse error (more data than columns)
-# function to get max field number
-def max_fields(path):
-    max_fields = 0
-    with open(path, 'r', newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            # save max field
-            if len(row) > max_fields:
-                max_fields = len(row)
-    return max_fields
-
-
-#new column names to
-columns = ['time', 'source', 'hand', 'x', 'y', 'z']
-for x in range(max_fields(path) - 4):
-    columns.append(str(x))
-
-df = pd.read_csv(path, header=None, names=columns)
-
-# Keep only the first five columns
-df = df.iloc[:, [0, 2, 3, 4, 5]]
-
-### remove possible mistakes
-def is_convertible_to_uint(value):
-    try:
-        np.uint(value)
-        return True
-    except (ValueError, OverflowError):
-        return False
-
-
-def is_convertible_to_float32(value):
-    try:
-        np.float32(value)
-        return True
-    except (ValueError, OverflowError):
-        return False
-
-df_length=len(df.index)
-
-df = df[df['time'].apply(is_convertible_to_uint)]
-df = df[df['x'].apply(is_convertible_to_float32)]
-df = df[df['y'].apply(is_convertible_to_float32)]
-df = df[df['z'].apply(is_convertible_to_float32)]
-df = df[df['hand'].isin(['right', 'left'])]
-###
-
-df['time'] = df['time'].astype(np.uint)
-df['hand'] = df['hand'].astype(str)
-df['x'] = df['x'].astype(np.float32)
-df['y'] = df['y'].astype(np.float32)
-df['z'] = df['z'].astype(np.float32)
-
-df_right = df[df['hand'] == 'right']
-df_left = df[df['hand'] == 'left']
-
-df_right = df_right.drop('hand', axis=1)
-df_left = df_left.drop('hand', axis=1)
-
-# Sort DataFrame by 'time' in ascending order
-df_right = df_right.sort_values(by='time', ascending=True)
-df_left = df_left.sort_values(by='time', ascending=True)
-
-print('-----> '+ str(df_length - (len(df_right.index) + len(df_left.index) )) + ' bad lines have been deleted' )
-#print(df_right)
-#print(df_left)
-
-df_right.to_csv(r'../data/test_data_recorded/processed_tracking' + '.csv', index=False)
-
-# Save the filtered DataFrames to new CSV files
-#df_right.to_csv(r'data_csv\right_hand\right_' + str(number) + '.csv', index=False)
-#df_left.to_csv(r'data_csv\left_hand\left_' + str(number) + '.csv', index=False)
+import pandas as pd
+
+HANDS = ('right', 'left')
+FORMATS = ('csv', 'npy')
+BAD_REASONS = ('time', 'position', 'hand')
+
+# fields of the export: time, source, hand, x, y, z; the source and further fields are dropped
+FIELDS = 6
+USE_COLUMNS = [0, 2, 3, 4, 5]
+RECORD_DTYPE = np.dtype([('time', '<u8'), ('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+
+CHUNK_SIZE = 500_000  # rows of the export in memory at once
+MERGE_RECORDS = 4_000_000  # records of all runs in memory at once while merging
+MAX_EXAMPLES = 20  # bad rows listed in the report
+MAX_EXACT_FLOAT = 2 ** 53  # larger integers are rounded by float64
+
+
+@dataclass
+class CleaningReport:
+    """ Dataclass for the report of a cleaned export.
+    rows: Rows of the export (without empty lines).
+    kept: Rows kept for each hand.
+    bad: Removed rows for each reason, a row is counted for its first bad field (time, position, hand).
+    examples: Row number (starting at 1) and reason of the first removed rows.
+    outputs: Path of the output of each hand.
+    """
+    rows: int = 0
+    kept: dict[str, int] = field(default_factory=lambda: dict.fromkeys(HANDS, 0))
+    bad: dict[str, int] = field(default_factory=lambda: dict.fromkeys(BAD_REASONS, 0))
+    examples: list[tuple[int, str]] = field(default_factory=list)
+    outputs: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def bad_rows(self) -> int:
+        return sum(self.bad.values())
+
+    def __str__(self) -> str:
+        lines = [f'-----> {self.bad_rows} bad lines of {self.rows} have been deleted '
+                 f'({", ".join(f"{reason}: {count}" for reason, count in self.bad.items())})']
+        lines += [f'{hand}: {self.kept[hand]} rows -> {path}' for hand, path in self.outputs.items()]
+        if self.examples:
+            lines.append('first bad rows: ' + ', '.join(f'{row} ({reason})' for row, reason in self.examples))
+        return '\n'.join(lines)
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Reads the export in chunks. Fields after z are ignored, missing fields are NaN. Columns with text in a chunk are
+    read as text (the parser only falls back to text for these chunks). The index is the row number starting at 0.
+
+    The parser reads the times of a chunk with an empty or decimal time as float, which rounds integers above 2**53.
+    The times of such chunks are taken from a second reader of the time column as text, which is only created at the
+    first rounded chunk because it parses the export again.
+    """
+    reader = pd.read_csv(path, header=None, names=range(FIELDS), usecols=USE_COLUMNS, index_col=False,
+                         dtype={2: str}, low_memory=False, chunksize=chunk_size)
+    texts = None
+    for number, chunk in enumerate(reader):
+        rounded = chunk[0].dtype.kind == 'f' and bool((chunk[0].abs() >= MAX_EXACT_FLOAT).any())
+        if rounded and texts is None:
+            texts = pd.read_csv(path, header=None, names=range(FIELDS), usecols=[0], index_col=False, dtype=str,
+                                chunksize=chunk_size)
+            for _ in range(number):
+                next(texts)
+        if texts is not None:
+            text = next(texts)[0]
+            if rounded:
+                chunk[0] = text.to_numpy()
+        yield chunk
+
+
+def parse_time(column: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts the time column of a chunk into unsigned integers. Float is only used to detect the bad rows, the
+    timestamps themselves are converted as int64/uint64, so they are not rounded above 2**53.
+
+    Parameters:
+        column (pandas.Series): The time column of read_chunks (integers, text or float below 2**53).
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: The timestamps (uint64, 0 for bad rows) and True where the time is an
+            unsigned integer.
+    """
+    time = np.zeros(len(column), dtype=np.uint64)
+    numbers = pd.to_numeric(column, errors='coerce')
+    if numbers.dtype.kind in 'iu':
+        values = numbers.to_numpy()
+        valid = values >= 0
+        time[valid] = values[valid]
+        return time, valid
+
+    # bad rows or times like 1.0 turn the column into float64, the valid rows are converted again without them
+    approx = numbers.to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        valid = np.isfinite(approx) & (approx >= 0) & (approx == np.floor(approx)) & (approx <= 2.0 ** 64)
+    exact = pd.to_numeric(column[valid], errors='coerce')
+    if exact.dtype.kind in 'iu':
+        time[valid] = exact.to_numpy()
+        return time, valid
+
+    # times like 1.0 are exact as float below 2**53, larger ones are converted from their text
+    time[valid] = np.minimum(approx[valid], MAX_EXACT_FLOAT)
+    for position in np.flatnonzero(valid & (approx >= MAX_EXACT_FLOAT)):
+        value = int(Decimal(column.iloc[position]))
+        valid[position] = value <= np.iinfo(np.uint64).max
+        time[position] = value if valid[position] else 0
+    return time, valid
+
+
+def clean_chunk(chunk: pd.DataFrame, report: CleaningReport) -> dict[str, np.ndarray]:
+    """
+    Validates a chunk of read_chunks and splits it by hand.
+
+    Parameters:
+        chunk (pandas.DataFrame): The columns of the export.
+        report (CleaningReport): The report to update.
+
+    Returns:
+        dict[str, numpy.ndarray]: The valid records (RECORD_DTYPE) of each hand in the order of the export.
+    """
+    time, valid_time = parse_time(chunk[0])
+    positions = np.column_stack([pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+                                 for column in (3, 4, 5)])
+    hands = chunk[2]
+
+    with np.errstate(invalid='ignore'):
+        valid_position = np.all(np.isfinite(positions) & (np.abs(positions) <= np.finfo(np.float32).max), axis=1)
+    valid_hand = hands.isin(HANDS).to_numpy()
+
+    # first bad field of each row, -1 for valid rows
+    reasons = np.select([~valid_time, ~valid_position, ~valid_hand], [0, 1, 2], -1)
+    report.rows += len(chunk)
+    for number, count in enumerate(np.bincount(reasons[reasons >= 0], minlength=len(BAD_REASONS))):
+        report.bad[BAD_REASONS[number]] += int(count)
+    for position in np.flatnonzero(reasons >= 0)[:MAX_EXAMPLES - len(report.examples)]:
+        report.examples.append((int(chunk.index[position]) + 1, BAD_REASONS[reasons[position]]))
+
+    records = {}
+    for hand in HANDS:
+        keep = (reasons < 0) & (hands == hand).to_numpy()
+        hand_records = np.empty(np.count_nonzero(keep), dtype=RECORD_DTYPE)
+        hand_records['time'] = time[keep]
+        for axis, name in enumerate(('x', 'y', 'z')):
+            hand_records[name] = positions[keep, axis]
+        records[hand] = hand_records
+        report.kept[hand] += len(hand_records)
+    return records
+
+
+def merge_runs(runs: list[np.ndarray], block_size: int) -> Iterator[np.ndarray]:
+    """
+    Merges runs sorted by time into blocks sorted by time. At most block_size records of each run are in a block.
+
+    Parameters:
+        runs (list[numpy.ndarray]): Records (RECORD_DTYPE) sorted by time, e.g. memory-mapped.
+        block_size (int): Records taken from each run at once.
+
+    Yields:
+        numpy.ndarray: The next records of all runs sorted by time.
+    """
+    cursors = [0] * len(runs)
+    while True:
+        active = [i for i, run in enumerate(runs) if cursors[i] < len(run)]
+        if not active:
+            return
+
+        # no run has a record before this time left after the block
+        threshold = min(runs[i]['time'][min(cursors[i] + block_size, len(runs[i])) - 1] for i in active)
+
+        parts = []
+        for i in active:
+            window = runs[i][cursors[i]:cursors[i] + block_size]
+            end = int(np.searchsorted(window['time'], threshold, side='right'))
+            parts.append(np.asarray(window[:end]))
+            cursors[i] += end
+
+        block = np.concatenate(parts)
+        yield block[np.argsort(block['time'], kind='stable')]
+
+
+def write_csv(path: str, blocks: Iterator[np.ndarray]) -> None:
+    """ Writes the blocks into one CSV file with the columns time, x, y, z. """
+    header = True
+    with open(path, 'w', newline='') as file:
+        for block in blocks:
+            pd.DataFrame(block).to_csv(file, header=header, index=False)
+            header = False
+        if header:
+            file.write(','.join(RECORD_DTYPE.names) + '\n')
+
+
+def write_npy(folder: str, blocks: Iterator[np.ndarray], size: int) -> None:
+    """
+    Writes the blocks as one .npy file per column in the format of the dataset cache (see dataset_cache.load_cache).
+
+    Parameters:
+        size (int): Total records of all blocks.
+    """
+    os.makedirs(folder, exist_ok=True)
+    columns = [np.lib.format.open_memmap(os.path.join(folder, f'{i}.npy'), mode='w+', dtype=RECORD_DTYPE[name],
+                                         shape=(size,)) for i, name in enumerate(RECORD_DTYPE.names)]
+    position = 0
+    for block in blocks:
+        for column, name in zip(columns, RECORD_DTYPE.names):
+            column[position:position + len(block)] = block[name]
+        position += len(block)
+    for column in columns:
+        column.flush()
+    del columns
+
+    with open(os.path.join(folder, 'columns.json'), 'w') as file:
+        json.dump([{'name': name, 'dtype': str(RECORD_DTYPE[name]), 'file': f'{i}.npy'}
+                   for i, name in enumerate(RECORD_DTYPE.names)], file)
+
+
+def clean_tracking(path: str, output: str, fmt: str = 'csv', chunk_size: int = CHUNK_SIZE,
+                   merge_records: int = MERGE_RECORDS) -> CleaningReport:
+    """
+    Cleans a raw hand tracking export into one trajectory per hand.
+
+    Parameters:
+        path (str): The file path of the export.
+        output (str): Path of the outputs without extension, '_right' and '_left' are appended.
+        fmt (str): 'csv' for CSV files or 'npy' for folders of the dataset cache format.
+        chunk_size (int): Rows of the export in memory at once.
+        merge_records (int): Records of all runs in memory at once while merging.
+
+    Returns:
+        CleaningReport: Counts of kept and removed rows.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'fmt must be one of {FORMATS}.')
+    if chunk_size < 1 or merge_records < 1:
+        raise ValueError('chunk_size and merge_records must be positive.')
+
+    report = CleaningReport()
+    output_folder = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(dir=output_folder) as temp_folder:
+        run_paths = {hand: [] for hand in HANDS}
+        for number, chunk in enumerate(read_chunks(path, chunk_size)):
+            for hand, records in clean_chunk(chunk, report).items():
+                if len(records):
+                    run_path = os.path.join(temp_folder, f'{hand}_{number}.npy')
+                    np.save(run_path, records[np.argsort(records['time'], kind='stable')])
+                    run_paths[hand].append(run_path)
+
+        for hand in HANDS:
+            runs = [np.load(run_path, mmap_mode='r') for run_path in run_paths[hand]]
+            blocks = merge_runs(runs, max(1, merge_records // max(len(runs), 1)))
+            if fmt == 'csv':
+                report.outputs[hand] = f'{output}_{hand}.csv'
+                write_csv(report.outputs[hand], blocks)
+            else:
+                report.outputs[hand] = f'{output}_{hand}'
+                write_npy(report.outputs[hand], blocks, report.kept[hand])
+            del runs, blocks
+
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cleans a raw hand tracking export into one trajectory per hand.")
+    parser.add_argument('path', nargs='?', default=os.path.join('data', 'test_data_recorded', 'hand_tracking.csv'))
+    parser.add_argument('--output', help="path of the outputs without extension (default: processed_tracking next "
+                                         "to the export)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows of the export in memory at once")
+    parser.add_argument('--report', help="save the report (JSON)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print("Export not found:", args.path)
+        return 1
+
+    output = args.output or os.path.join(os.path.dirname(args.path), 'processed_tracking')
+    report = clean_tracking(args.path, output, args.format, args.chunk_size)
+    print(report)
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump({'rows': report.rows, 'kept': report.kept, 'bad': report.bad, 'examples': report.examples,
+                       'outputs': report.outputs}, file, indent=2)
+
+    return 0
+
 
+if __name__ == "__main__":
+    sys.exit(main())
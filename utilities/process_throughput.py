@@ -0,0 +1,125 @@
+"""
+Throughput of the threads mode and the processes mode (see process_pipeline.py) with several sessions at once.
+
+Every session has its own synthetic goals and trajectory. In the threads mode every session runs a producer thread
+(data emitter into a FrameRingBuffer) and a consumer thread (Controller.process_view) in this interpreter, in the
+processes mode this process feeds all sessions and every session has its own worker process. The frames are emitted
+without waiting, so the throughput is limited by the prediction.
+
+Run from the root folder of the repository:
+    python -m utilities.process_throughput --sessions 1 2 4 --goals 100 --save throughput.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Iterable, Optional
+import numpy as np
+
+from controller import Controller
+from data_emitter import DataEmitter
+from frame_buffer import FrameRingBuffer
+from main import get_params
+from process_pipeline import run_sessions
+from utilities.benchmark import synthetic_goals, synthetic_trajectory
+
+MODES = ('threads', 'processes')
+
+
+def build_sessions(count: int, goals: int, frames: int, seed: int = 0) -> tuple[list, dict]:
+    """ Returns the goals and the data emitter of each session and the parameters (the same for all sessions). """
+    rng = np.random.default_rng(seed)
+    sessions = []
+    params = None
+    for _ in range(count):
+        df_goals = synthetic_goals(goals, rng)
+        df_trajectories = synthetic_trajectory(df_goals[['x', 'y', 'z']].to_numpy()[0], frames, rng)
+        params = get_params(df_trajectories)
+        sessions.append((df_goals, DataEmitter(None, df_trajectories, None, params['DATA_EMITTER_PARAMS'])))
+    return sessions, params
+
+
+def feed(frames: Iterable[list], frame_buffer: FrameRingBuffer) -> None:
+    """ Producer thread of the threads mode. """
+    for data in frames:
+        while not frame_buffer.write(data[0], data[1], data[2:]):
+            time.sleep(0.0005)
+    frame_buffer.close()
+
+
+def consume(controller: Controller, frame_buffer: FrameRingBuffer, counts: list, i: int) -> None:
+    """ Consumer thread of the threads mode, counts the results of session i. """
+    for view in frame_buffer.batches():
+        counts[i] += len(controller.process_view(view, compact=True))
+
+
+def run_threads(sessions: list, params: dict) -> int:
+    """ Runs all sessions in threads of this interpreter and returns the number of results. """
+    counts = [0] * len(sessions)
+    threads = []
+    for i, (df_goals, data_emitter) in enumerate(sessions):
+        controller = Controller(df_goals, False, params['NOISE_REDUCER_PARAMS'], params['MODEL_PARAMS'],
+                                params['PROBABILITY_PARAMS'], params['ACTION_HANDLER_PARAMS'])
+        frame_buffer = FrameRingBuffer()
+        threads.append(threading.Thread(target=feed, args=(data_emitter.frames(), frame_buffer)))
+        threads.append(threading.Thread(target=consume, args=(controller, frame_buffer, counts, i)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def measure(mode: str, sessions: int, goals: int, frames: int) -> dict:
+    """
+    Measures the wall time of all sessions in a mode.
+
+    Returns:
+        dict: Frames and results of all sessions, wall time in seconds and frames per second.
+    """
+    session_list, params = build_sessions(sessions, goals, frames)
+    start = time.perf_counter()
+    if mode == 'threads':
+        results = run_threads(session_list, params)
+    else:
+        results = sum(1 for _ in run_sessions([(df_goals, data_emitter.frames())
+                                               for df_goals, data_emitter in session_list], params))
+    seconds = time.perf_counter() - start
+
+    return {
+        'frames': sessions * frames,
+        'results': results,
+        'seconds': round(seconds, 3),
+        'fps': round(sessions * frames / seconds, 1)
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput of the threads mode and the processes mode.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4], help="numbers of parallel sessions")
+    parser.add_argument('--goals', type=int, default=100, help="goals of each session")
+    parser.add_argument('--frames', type=int, default=2000, help="frames of each session")
+    parser.add_argument('--save', help="save the results (JSON)")
+    args = parser.parse_args(argv)
+
+    results = {f'{mode}_s{sessions}': measure(mode, sessions, args.goals, args.frames)
+               for sessions in args.sessions for mode in MODES}
+
+    print(f"{'case':<16}{'frames':>8}{'results':>9}{'seconds':>9}{'fps':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['frames']:>8}{result['results']:>9}{result['seconds']:>9}{result['fps']:>10}")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': sys.version.split()[0], 'machine': platform.machine(), 'cpus': os.cpu_count(),
+                       'goals': args.goals, 'cases': results}, file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
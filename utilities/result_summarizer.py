@@ -0,0 +1,183 @@
+"""
+Structured results of the tests and their summary.
+
+TestIntentionRecognition writes one JSON line per test with ResultSink. The summary groups the results with array
+operations (no parsing of log lines), e.g. by goal configuration, curvature or start side of generated trajectories.
+
+Run from the root folder of the repository:
+    python -m utilities.result_summarizer data/test_data_generated/result_g/results.jsonl --by curvature start_side
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Optional, TextIO
+import numpy as np
+import pandas as pd
+
+STATUSES = ('Success', 'Pass1', 'Pass2', 'Failure')
+
+# metadata encoded in the file names of generated trajectories: {goal_config}_{target}_{curvature}{start_side}
+CURVATURES = {'0': 'linear', '1': 'moderate', '2': 'max'}
+START_SIDES = {'0': 'middle', '1': 'left', '2': 'right'}
+GROUP_COLUMNS = ('goal_config', 'target', 'curvature', 'start_side')
+
+# time at 60% in quarters of the time range of a test
+TIME_BUCKETS = ('time_q1', 'time_q2', 'time_q3', 'time_q4')
+
+
+def parse_test_id(test_id: str) -> dict:
+    """ Returns the goal configuration, target, curvature and start side of a generated trajectory, None if unknown. """
+    parts = test_id.split('_')
+    if len(parts) != 4 or len(parts[3]) != 2:
+        return dict.fromkeys(GROUP_COLUMNS)
+
+    return {
+        'goal_config': f'{parts[0]}_{parts[1]}',
+        'target': int(parts[2]) if parts[2].isdigit() else None,
+        'curvature': CURVATURES.get(parts[3][0]),
+        'start_side': START_SIDES.get(parts[3][1])
+    }
+
+
+def make_record(test_id: str, highest_probability: float, time_60: Optional[int], sample_size_60: Optional[int],
+                distance_60: Optional[float], status: str, time_range: Optional[tuple[int, int]] = None) -> dict:
+    """
+    Builds the record of a test from the evaluation of evaluate_probabilities.
+
+    Parameters:
+        time_range (tuple): First and last timestamp with a result. None if there was no result.
+    """
+    record = {'test_id': test_id, **parse_test_id(test_id), 'status': status,
+              'highest_probability': float(highest_probability), 'time_60': time_60, 'sample_size_60': sample_size_60,
+              'distance_60': distance_60}
+    record['time_first'], record['time_last'] = (int(t) for t in time_range) if time_range else (None, None)
+    return record
+
+
+class ResultSink:
+    """ A class that writes the results of tests as JSON Lines, one object per test (see make_record). """
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters:
+            path (str): Path of the file. An existing file is overwritten.
+        """
+        self.path = path
+        self.file: Optional[TextIO] = open(path, 'w')
+
+    def write(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + '\n')
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_results(path: str) -> pd.DataFrame:
+    """ Reads the results of a ResultSink as table with one column per field. """
+    with open(path) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    columns = ['test_id', *GROUP_COLUMNS, 'status', 'highest_probability', 'time_60', 'sample_size_60', 'distance_60',
+               'time_first', 'time_last']
+    results = pd.DataFrame.from_records(records, columns=columns)
+    results['target'] = results['target'].astype('Int64')
+    return results
+
+
+def summarize(results: pd.DataFrame, by: tuple = ()) -> pd.DataFrame:
+    """
+    Summarizes the results for every combination of the group columns and status.
+
+    Parameters:
+        results (pandas.DataFrame): Results in the format of load_results.
+        by (tuple[str]): Columns to group by, e.g. ('curvature', 'start_side'). Empty for one group.
+
+    Returns:
+        pandas.DataFrame: For each group and status: the count, its share of the group in percent, the mean highest
+            probability, the mean sample size and distance at 60% (of tests that reached 60%) and the amount of tests
+            that reached 60% in each quarter of their time range.
+    """
+    size = len(results)
+
+    # one integer code for each group, the groups are sorted by their values
+    group_codes, group_values = np.zeros(size, dtype=np.int64), []
+    for column in by:
+        codes, uniques = pd.factorize(results[column], sort=True, use_na_sentinel=False)
+        group_codes = group_codes * len(uniques) + codes
+        group_values.append(np.asarray(uniques, dtype=object))
+    groups, group_codes = np.unique(group_codes, return_inverse=True)
+
+    status_codes = pd.Categorical(results['status'], categories=STATUSES).codes
+    keep = status_codes >= 0
+    cells = len(groups) * len(STATUSES)
+    index = (group_codes * len(STATUSES) + status_codes)[keep]
+
+    def total(values: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=values[keep], minlength=cells)
+
+    def mean(column: str) -> np.ndarray:
+        values = pd.to_numeric(results[column]).to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.nan_to_num(total(np.where(valid, values, 0.0)) / total(valid.astype(float)))
+
+    count = total(np.ones(size))
+    group_count = count.reshape(-1, len(STATUSES)).sum(axis=1).repeat(len(STATUSES))
+
+    summary = {}
+    for position, column in enumerate(by):
+        codes = groups.copy()
+        for later in group_values[position + 1:]:
+            codes //= len(later)
+        summary[column] = group_values[position][codes % len(group_values[position])].repeat(len(STATUSES))
+
+    summary['status'] = np.tile(STATUSES, len(groups))
+    summary['count'] = count.astype(int)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary['share'] = np.round(np.nan_to_num(count / group_count * 100), 2)
+    summary['highest_probability'] = np.round(mean('highest_probability'), 2)
+    summary['sample_size_60'] = np.round(mean('sample_size_60'), 2)
+    summary['distance_60'] = np.round(mean('distance_60'), 2)
+
+    # position of the time at 60% in the time range of each test
+    time_60, first, last = (pd.to_numeric(results[column]).to_numpy(dtype=float)
+                            for column in ('time_60', 'time_first', 'time_last'))
+    position = (time_60 - first) / np.maximum(last - first, 1)
+    reached = ~np.isnan(position)
+    bucket = np.clip(np.floor(np.where(reached, position, 0.0) * len(TIME_BUCKETS)), 0, len(TIME_BUCKETS) - 1)
+    for number, name in enumerate(TIME_BUCKETS):
+        summary[name] = total((reached & (bucket == number)).astype(float)).astype(int)
+
+    return pd.DataFrame(summary)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summary of the structured test results.")
+    parser.add_argument('results', help="JSON Lines file of ResultSink")
+    parser.add_argument('--by', nargs='*', default=[], choices=GROUP_COLUMNS, help="columns to group by")
+    parser.add_argument('--output', help="save the summary (CSV)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.results):
+        print("No results found:", args.results)
+        return 1
+
+    summary = summarize(load_results(args.results), tuple(args.by))
+    print(summary.to_string(index=False))
+
+    if args.output:
+        summary.to_csv(args.output, index=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Cold start time of the predictor.
+
+Every command runs in a new interpreter, so the time includes the start of the interpreter, all imports and reading
+the data. A separate run with -X importtime lists the heavy modules (pandas, matplotlib, scipy, numba) that were
+imported.
+
+Run from the root folder of the repository:
+    python -m utilities.startup_time --save startup.json
+    python -m utilities.startup_time --compare startup.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+import numpy as np
+
+ROOT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY_MODULES = ('pandas', 'matplotlib', 'scipy', 'numba')
+
+GOALS = os.path.join('data', 'test_data_recorded', 'recorded_goals', 'goal_config1.csv')
+TRAJECTORY = os.path.join('data', 'test_data_recorded', 'recorded_trajectories', 'configuration1',
+                          '23_config1_all2.csv')
+
+# interpreter arguments of each case
+CASES = {
+    'import core': ['-c', 'import core'],
+    'import main': ['-c', 'import main'],
+    'core first result': ['core.py', GOALS, TRAJECTORY, '--first', '--quiet'],
+}
+
+
+def run(arguments: list[str], *options: str) -> subprocess.CompletedProcess:
+    """ Runs a new interpreter in the root folder. """
+    return subprocess.run([sys.executable, *options, *arguments], cwd=ROOT_FOLDER, capture_output=True, text=True,
+                          check=True)
+
+
+def imported_modules(arguments: list[str]) -> list[str]:
+    """ Returns the heavy modules that are imported by a command. """
+    names = {line.rsplit('|', 1)[-1].strip() for line in run(arguments, '-X', 'importtime').stderr.splitlines()}
+    return [module for module in HEAVY_MODULES if module in names]
+
+
+def measure(arguments: list[str], runs: int) -> dict:
+    """
+    Measures the wall time of a command.
+
+    Returns:
+        dict: Median and minimum in milliseconds over the runs and the imported heavy modules.
+    """
+    run(arguments)  # warm up the file system cache and the dataset cache
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(arguments)
+        times.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'median_ms': round(float(np.median(times)), 1),
+        'min_ms': round(float(np.min(times)), 1),
+        'heavy_modules': imported_modules(arguments)
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start time of the predictor.")
+    parser.add_argument('--runs', type=int, default=5, help="runs of each case")
+    parser.add_argument('--save', help="save the results as baseline (JSON)")
+    parser.add_argument('--compare', help="compare the results with a baseline (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = {name: measure(arguments, args.runs) for name, arguments in CASES.items()}
+
+    print(f"{'case':<24}{'median ms':>11}{'min ms':>10}  heavy modules")
+    for name, result in results.items():
+        print(f"{name:<24}{result['median_ms']:>11}{result['min_ms']:>10}  {', '.join(result['heavy_modules'])}")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': sys.version.split()[0], 'cases': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['cases']
+        slower = [f"{name}: median_ms {baseline[name]['median_ms']} -> {result['median_ms']}"
+                  for name, result in results.items()
+                  if name in baseline and result['median_ms'] > baseline[name]['median_ms'] * (1 + args.threshold)]
+        for message in slower:
+            print("SLOWDOWN", message)
+        if slower:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
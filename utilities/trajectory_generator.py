@@ -1,12 +1,24 @@
+import argparse
 import os
+from dataclasses import dataclass
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 
+MAX_DEVIATION = 0.7  # Maximum deviation in y-direction for maximum curvature
+
+# start points of the hand: middle, left, right (index is the last digit of the trajectory file names)
+START_COORDS = np.array([[1.0, 0.0, 1.0], [1.0, -1.0, 1.0], [1.0, 1.0, 1.0]])
+
+# dtype of the index of a packed dataset, one entry per trajectory
+INDEX_DTYPE = np.dtype([('layout', '<i4'), ('target', '<i4'), ('curvature', '<f8'), ('start', '<i4')])
+
+CHUNK_BYTES = 64 * 2 ** 20  # trajectories of a packed dataset are calculated in chunks of this size (float64)
+
 
 def get_control_point(start, end, curvature):
-    max_deviation = 0.7  # Maximum deviation in y-direction for maximum curvature
-    deviation = curvature * max_deviation
+    deviation = curvature * MAX_DEVIATION
 
     midpoint = (start + end) / 2  # control point is set at midpoint
     direction_vector = end - start
@@ -57,18 +69,17 @@ def generate_trajectories_bezier(input_folder, output_folder, start_coords, hand
             file_path = os.path.join(input_folder, filename)
             df = pd.read_csv(file_path)
 
-            for _, row in df.iterrows():
-                # Get the goal ID and coordinates
-                target_id = int(row['ID'])
-                target_coords = row[['x', 'y', 'z']].to_numpy()
+            # Calculate quadratic Bezier curves of all targets at once without z component
+            target_ids = df['ID'].to_numpy(dtype=int)
+            ends = df[['x', 'y']].to_numpy(dtype=float)
+            starts = np.broadcast_to(start_coords[:2], ends.shape)
+            curves_2d = calculate_quadratic_bezier_curves(starts, ends, np.full(len(ends), curvature), steps)
 
-                # Calculate quadratic Bezier curve without z component
-                start = start_coords[:2]
-                end = target_coords[:2]
-                curve_2d = calculate_quadratic_bezier_curve(start, end, curvature, steps)
-                if curve_2d is None:
-                    break
+            # stop at the first target without a curve (target at the start point)
+            invalid = np.flatnonzero(np.isnan(curves_2d[:, 0, 0]))
+            count = invalid[0] if len(invalid) else len(ends)
 
+            for target_id, curve_2d in zip(target_ids[:count], curves_2d[:count]):
                 # Add z component with 1.0
                 trajectory = np.hstack((curve_2d, np.ones((steps, 1))))
                 trajectory_df = pd.DataFrame(trajectory, columns=['x', 'y', 'z'])
@@ -80,32 +91,269 @@ def generate_trajectories_bezier(input_folder, output_folder, start_coords, hand
                 trajectory_df.to_csv(output_path, index=False)
 
 
-input_folder = r'../data/test_data_generated/test_goal'
-output_folder = r'../data/test_data_generated/test_trajectory'
-
-print('Middle:')
-start_coords = np.array([1.0, 0.0, 1.0])
-print('generating test curves LINEAR')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 0)
-print('generating test curves MODERATE')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 0.5)
-print('generating test curves MAX')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 1)
-
-print('left:')
-start_coords = np.array([1.0, -1.0, 1.0])
-print('generating test curves LINEAR')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 0)
-print('generating test curves MODERATE')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 0.5)
-print('generating test curves MAX')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 1)
-
-print('right:')
-start_coords = np.array([1.0, 1.0, 1.0])
-print('generating test curves LINEAR')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 0)
-print('generating test curves MODERATE')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 0.5)
-print('generating test curves MAX')
-generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 1)
+def get_control_points(starts: np.ndarray, ends: np.ndarray, curvatures: np.ndarray) -> np.ndarray:
+    """
+    Calculates the control points of many curves at once like get_control_point.
+
+    Parameters:
+        starts, ends (numpy.ndarray): Start and end points in the x-y plane (N, 2).
+        curvatures (numpy.ndarray): Curvature of each curve between 0 (linear) and 1 (maximum) (N,).
+
+    Returns:
+        numpy.ndarray: The control points (N, 2). NaN where start and end point are the same.
+    """
+    direction_vectors = ends - starts
+
+    # direction of curvature depending on y-axis: end point right side -> left curve, otherwise right curve
+    left_curve = (ends[:, 1] > starts[:, 1])[:, np.newaxis]
+    orthogonal_vectors = np.where(left_curve, np.stack((-direction_vectors[:, 1], direction_vectors[:, 0]), axis=1),
+                                  np.stack((direction_vectors[:, 1], -direction_vectors[:, 0]), axis=1))
+
+    norms = np.sqrt(orthogonal_vectors[:, 0] ** 2 + orthogonal_vectors[:, 1] ** 2)[:, np.newaxis]
+    valid = norms >= 1e-6
+    orthogonal_vectors = orthogonal_vectors / np.where(valid, norms, 1.0)
+
+    controls = (starts + ends) / 2 + (curvatures * MAX_DEVIATION)[:, np.newaxis] * orthogonal_vectors
+    return np.where(valid, controls, np.nan)
+
+
+def calculate_quadratic_bezier_curves(starts: np.ndarray, ends: np.ndarray, curvatures: np.ndarray,
+                                      num_points: int = 1000, profile: str = 'uniform') -> np.ndarray:
+    """
+    Calculates many quadratic Bezier curves at once like calculate_quadratic_bezier_curve.
+
+    Parameters:
+        starts, ends (numpy.ndarray): Start and end points in the x-y plane (N, 2).
+        curvatures (numpy.ndarray): Curvature of each curve (N,).
+        num_points (int): Points of each curve.
+        profile (str): Velocity profile, see bezier_basis.
+
+    Returns:
+        numpy.ndarray: The curves (N, num_points, 2). NaN for curves without control point.
+    """
+    controls = get_control_points(starts, ends, curvatures)
+    basis = bezier_basis(num_points, profile)[np.newaxis, :, :, np.newaxis]
+
+    return basis[:, :, 0] * starts[:, np.newaxis] + basis[:, :, 1] * controls[:, np.newaxis] + \
+        basis[:, :, 2] * ends[:, np.newaxis]
+
+
+def bezier_basis(num_points: int, profile: str = 'uniform') -> np.ndarray:
+    """
+    Returns the weights of start, control and end point of a quadratic Bezier curve for each point (num_points, 3).
+
+    Parameters:
+        profile (str): 'uniform' for constant steps of the curve parameter or 'min_jerk' for the bell-shaped velocity
+            profile of a human reaching movement (slow start and end).
+    """
+    t = np.linspace(0, 1, num_points)
+    if profile == 'min_jerk':
+        t = 10 * t ** 3 - 15 * t ** 4 + 6 * t ** 5
+    elif profile != 'uniform':
+        raise ValueError("profile must be 'uniform' or 'min_jerk'.")
+
+    return np.stack(((1 - t) ** 2, 2 * (1 - t) * t, t ** 2), axis=1)
+
+
+def generate_goal_layouts(count: int, size: int, rng: np.random.Generator, x_range: tuple = (0.0, 0.5),
+                          y_range: tuple = (-1.0, 1.0), z: float = 1.0) -> np.ndarray:
+    """
+    Generates random goal layouts on the table in front of the start points.
+
+    Parameters:
+        count (int): Number of layouts.
+        size (int): Goals of each layout.
+        rng (numpy.random.Generator): Random number generator.
+        x_range, y_range (tuple): Bounds of the goal positions.
+        z (float): Height of the goals.
+
+    Returns:
+        numpy.ndarray: Positions of the goals (count, size, 3). The goal IDs are 1 to size.
+    """
+    goals = np.full((count, size, 3), z)
+    goals[..., 0] = rng.uniform(x_range[0], x_range[1], (count, size))
+    goals[..., 1] = rng.uniform(y_range[0], y_range[1], (count, size))
+    return goals
+
+
+@dataclass
+class PackedDataset:
+    """ Dataclass for many goal layouts and trajectories in one file (L layouts, M goals, N trajectories, T points).
+    goal_positions: Positions of the goals of each layout (L, M, 3). The goal IDs are 1 to M.
+    starts: Start points of the hand (S, 3).
+    time: Timestamps of the points (T,).
+    trajectories: Hand wrist positions (N, T, 3).
+    index: Layout, target ID, curvature and start point of each trajectory (N,) with INDEX_DTYPE.
+    """
+    goal_positions: np.ndarray
+    starts: np.ndarray
+    time: np.ndarray
+    trajectories: np.ndarray
+    index: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def goals_df(self, layout: int) -> pd.DataFrame:
+        """ Returns a goal layout in the format of the goal CSV files. """
+        positions = self.goal_positions[layout]
+        return pd.DataFrame({'ID': np.arange(1, len(positions) + 1), 'x': positions[:, 0], 'y': positions[:, 1],
+                             'z': positions[:, 2]})
+
+    def trajectory_df(self, number: int) -> pd.DataFrame:
+        """ Returns a trajectory in the format of the trajectory CSV files. """
+        trajectory = self.trajectories[number]
+        return pd.DataFrame({'time': self.time, 'x': trajectory[:, 0], 'y': trajectory[:, 1], 'z': trajectory[:, 2]})
+
+
+def generate_dataset(goal_positions: np.ndarray, curvatures: tuple = (0.0, 0.5, 1.0), starts: np.ndarray = START_COORDS,
+                     steps: int = 1000, profile: str = 'uniform', noise_sd: float = 0.0,
+                     rng: Optional[np.random.Generator] = None, dtype: str = 'float64',
+                     trajectories_path: Optional[str] = None) -> PackedDataset:
+    """
+    Generates a trajectory from every start point to every goal of every layout for every curvature. The trajectories
+    are calculated in chunks of CHUNK_BYTES, so besides the output only one chunk is in memory.
+
+    Parameters:
+        goal_positions (numpy.ndarray): Goal layouts (L, M, 3), see generate_goal_layouts.
+        curvatures (tuple): Curvatures between 0 (linear) and 1 (maximum).
+        starts (numpy.ndarray): Start points of the hand (S, 3).
+        steps (int): Points of each trajectory, one per millisecond starting at 1.
+        profile (str): Velocity profile, see bezier_basis.
+        noise_sd (float): Standard deviation of the Gaussian noise added to the points (tracking noise).
+        rng (numpy.random.Generator): Random number generator for the noise.
+        dtype (str): 'float64' or 'float32' (half the size) for the positions of the trajectories.
+        trajectories_path (str): Path of a .npy file that receives the trajectories as memory map, so large datasets
+            do not have to fit into memory. None keeps the trajectories in memory.
+
+    Returns:
+        PackedDataset: The L * M * len(curvatures) * S trajectories. Trajectories from a start point to a goal at the
+            same x-y position are left out.
+    """
+    if dtype not in ('float64', 'float32'):
+        raise ValueError("dtype must be 'float64' or 'float32'.")
+
+    goal_positions = np.asarray(goal_positions, dtype=float)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    layouts, size = goal_positions.shape[:2]
+
+    # all combinations of layout, target, curvature and start
+    grid = np.stack(np.meshgrid(np.arange(layouts), np.arange(size), np.arange(len(curvatures)), np.arange(len(starts)),
+                                indexing='ij'), axis=-1).reshape(-1, 4)
+    ends = goal_positions[grid[:, 0], grid[:, 1]]
+    controls = get_control_points(starts[grid[:, 3], :2], ends[:, :2], np.asarray(curvatures, dtype=float)[grid[:, 2]])
+    valid = ~np.isnan(controls[:, 0])
+    grid, ends = grid[valid], ends[valid]
+
+    # start, control and end point of each curve, the height moves with the same profile from the start to the goal
+    points = np.empty((len(grid), 3, 3))
+    points[:, 0] = starts[grid[:, 3]]
+    points[:, 1, :2] = controls[valid]
+    points[:, 1, 2] = (points[:, 0, 2] + ends[:, 2]) / 2
+    points[:, 2] = ends
+
+    shape = (len(grid), steps, 3)
+    if trajectories_path is not None:
+        trajectories = np.lib.format.open_memmap(trajectories_path, mode='w+', dtype=dtype, shape=shape)
+    else:
+        trajectories = np.empty(shape, dtype=dtype)
+
+    # the noise is drawn in the order of the trajectories, so it does not depend on the chunk size
+    basis = bezier_basis(steps, profile)
+    rng = np.random.default_rng() if rng is None and noise_sd > 0 else rng
+    chunk = max(1, CHUNK_BYTES // (steps * 3 * 8))
+    for first in range(0, len(grid), chunk):
+        curves = np.matmul(basis, points[first:first + chunk])
+        if noise_sd > 0:
+            curves += rng.normal(0.0, noise_sd, curves.shape)
+        trajectories[first:first + chunk] = curves
+    if trajectories_path is not None:
+        trajectories.flush()
+
+    index = np.empty(len(grid), dtype=INDEX_DTYPE)
+    index['layout'] = grid[:, 0]
+    index['target'] = grid[:, 1] + 1
+    index['curvature'] = np.asarray(curvatures, dtype=float)[grid[:, 2]]
+    index['start'] = grid[:, 3]
+
+    return PackedDataset(goal_positions, starts, np.arange(1, steps + 1), trajectories, index)
+
+
+def write_packed_dataset(path: str, dataset: PackedDataset) -> None:
+    """ Writes a dataset into one uncompressed .npz file. Memory-mapped trajectories are copied in chunks. """
+    np.savez(path, goal_positions=dataset.goal_positions, starts=dataset.starts, time=dataset.time,
+             trajectories=dataset.trajectories, index=dataset.index)
+
+
+def load_packed_dataset(path: str) -> PackedDataset:
+    """ Reads a dataset of write_packed_dataset. """
+    with np.load(path) as data:
+        return PackedDataset(data['goal_positions'], data['starts'], data['time'], data['trajectories'], data['index'])
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generates test trajectories. Without --packed the CSV files of "
+                                                 "the generated test data are written.")
+    parser.add_argument('--packed', help="write random goal layouts and their trajectories into one .npz file")
+    parser.add_argument('--layouts', type=int, default=100, help="number of goal layouts")
+    parser.add_argument('--goals', type=int, default=10, help="goals of each layout")
+    parser.add_argument('--curvatures', type=float, nargs='+', default=[0.0, 0.5, 1.0])
+    parser.add_argument('--steps', type=int, default=1000, help="points of each trajectory")
+    parser.add_argument('--profile', choices=('uniform', 'min_jerk'), default='uniform', help="velocity profile")
+    parser.add_argument('--noise', type=float, default=0.0, help="standard deviation of the noise")
+    parser.add_argument('--dtype', choices=('float64', 'float32'), default='float64',
+                        help="precision of the trajectories, float32 halves the size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.packed:
+        rng = np.random.default_rng(args.seed)
+        goal_positions = generate_goal_layouts(args.layouts, args.goals, rng)
+        # the trajectories are generated into a temporary memory map next to the file instead of into memory
+        trajectories_path = args.packed + '.trajectories.npy'
+        try:
+            dataset = generate_dataset(goal_positions, tuple(args.curvatures), steps=args.steps,
+                                       profile=args.profile, noise_sd=args.noise, rng=rng, dtype=args.dtype,
+                                       trajectories_path=trajectories_path)
+            write_packed_dataset(args.packed, dataset)
+            count = len(dataset)
+            del dataset  # closes the memory map
+        finally:
+            if os.path.exists(trajectories_path):
+                os.remove(trajectories_path)
+        print(f'{count} trajectories written to {args.packed}')
+        return
+
+    input_folder = r'../data/test_data_generated/test_goal'
+    output_folder = r'../data/test_data_generated/test_trajectory'
+
+    print('Middle:')
+    start_coords = np.array([1.0, 0.0, 1.0])
+    print('generating test curves LINEAR')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 0)
+    print('generating test curves MODERATE')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 0.5)
+    print('generating test curves MAX')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '0', 1)
+
+    print('left:')
+    start_coords = np.array([1.0, -1.0, 1.0])
+    print('generating test curves LINEAR')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 0)
+    print('generating test curves MODERATE')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 0.5)
+    print('generating test curves MAX')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '1', 1)
+
+    print('right:')
+    start_coords = np.array([1.0, 1.0, 1.0])
+    print('generating test curves LINEAR')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 0)
+    print('generating test curves MODERATE')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 0.5)
+    print('generating test curves MAX')
+    generate_trajectories_bezier(input_folder, output_folder, start_coords, '2', 1)
+
+
+if __name__ == "__main__":
+    main()